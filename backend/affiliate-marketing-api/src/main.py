@@ -16,59 +16,92 @@ from src.routes.user import user_bp
 from src.routes.content import content_bp
 from src.routes.social_media import social_media_bp
 from src.routes.subscription import subscription_bp
+from src.services.analytics_collector import start_analytics_refresh
+from src.services.billing_service import init_billing
+from src.services.credential_vault import credential_vault, start_credential_refresh
+from src.services.database import engine_options
+from src.services.posting_times import start_posting_time_model
+from src.services.trending_hashtags import start_trending_hashtags
+from src.services.publish_dispatcher import publish_dispatcher
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+def create_app():
+    """Build the app, create its tables and start its background jobs
 
-# Enable CORS for all routes
-CORS(app, origins="*")
+    Nothing here runs at import time: the password hashing pool's processes
+    import this module as __mp_main__ and must not open a database pool or
+    start jobs of their own.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
 
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api/users')
-app.register_blueprint(content_bp, url_prefix='/api/content')
-app.register_blueprint(social_media_bp, url_prefix='/api/social')
-app.register_blueprint(subscription_bp, url_prefix='/api/subscription')
+    # Enable CORS for all routes
+    CORS(app, origins="*")
 
-# Database configuration - use PostgreSQL from environment
-database_url = os.getenv('DATABASE_URL')
-if database_url:
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-else:
-    # Fallback to SQLite for development
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    # Register blueprints
+    app.register_blueprint(user_bp, url_prefix='/api/users')
+    app.register_blueprint(content_bp, url_prefix='/api/content')
+    app.register_blueprint(social_media_bp, url_prefix='/api/social')
+    app.register_blueprint(subscription_bp, url_prefix='/api/subscription')
+
+    # Database configuration - use PostgreSQL from environment
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    else:
+        # Fallback to SQLite for development
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
     
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    db.init_app(app)
 
-# Create all database tables
-with app.app_context():
-    db.create_all()
+    # Create all database tables
+    with app.app_context():
+        db.create_all()
+        # create_all() skips existing tables, so add indexes declared since they were created
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return {
-        'status': 'healthy',
-        'service': 'Affiliate Marketing SaaS API',
-        'version': '1.0.0'
-    }
+    # Billing is built on the app's engine by get_billing_service() when first used
+    init_billing(app)
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
+    # Background jobs (disable with ENABLE_BACKGROUND_JOBS=False, e.g. in one-off scripts)
+    if os.getenv('ENABLE_BACKGROUND_JOBS', 'True').lower() == 'true':
+        start_posting_time_model(app)
+        start_trending_hashtags(app)
+        start_credential_refresh(app)
+        start_analytics_refresh(app, credential_vault.get)
+        publish_dispatcher.workers = int(os.getenv('PUBLISH_WORKERS', '8'))
+        publish_dispatcher.start(app)
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        """Health check endpoint"""
+        return {
+            'status': 'healthy',
+            'service': 'Affiliate Marketing SaaS API',
+            'version': '1.0.0'
+        }
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+                return "Static folder not configured", 404
+
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
+
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
     app.run(host='0.0.0.0', port=5000, debug=True)
-
@@ -5,7 +5,7 @@ import json
 import random
 from datetime import datetime
 from src.models.content import db, GeneratedContent, ContentType, ContentStatus
-from src.models.subscription import Subscription
+from src.services.usage import reserve_usage
 
 content_bp = Blueprint('content', __name__)
 
@@ -20,9 +20,9 @@ def generate_content():
         data = request.get_json()
         user_id = data.get('user_id')
         
-        # Check subscription limits
-        subscription = Subscription.query.filter_by(user_id=user_id).first()
-        if not subscription or not subscription.can_use_feature('content_generated'):
+        # Check and count subscription usage in one conditional UPDATE, before the slow AI call
+        reservation = reserve_usage(user_id, 'content_generated')
+        if reservation is None:
             return jsonify({
                 'error': 'Content generation limit reached for your subscription tier',
                 'upgrade_required': True
@@ -38,40 +38,42 @@ def generate_content():
         affiliate_products = data.get('affiliate_products', [])
         tone = data.get('tone', 'professional')
         
-        # Generate content using AI
-        generated_data = _generate_ai_content(
-            content_type, niche, topic, target_audience, 
-            word_count, keywords, affiliate_products, tone
-        )
-        
-        # Save to database
-        content = GeneratedContent(
-            user_id=user_id,
-            title=generated_data['title'],
-            content=generated_data['content'],
-            content_type=ContentType(content_type),
-            niche=niche,
-            target_audience=target_audience,
-            word_count=len(generated_data['content'].split()),
-            meta_description=generated_data['meta_description'],
-            email_subject=generated_data['email_subject']
-        )
-        
-        content.set_keywords_list(keywords)
-        content.set_social_posts_list(generated_data['social_media_posts'])
-        content.set_affiliate_links_dict(generated_data['affiliate_links'])
-        
-        db.session.add(content)
-        db.session.commit()
-        
-        # Update subscription usage
-        subscription.increment_usage('content_generated')
+        try:
+            # Generate content using AI
+            generated_data = _generate_ai_content(
+                content_type, niche, topic, target_audience, 
+                word_count, keywords, affiliate_products, tone
+            )
+            
+            # Save to database
+            content = GeneratedContent(
+                user_id=user_id,
+                title=generated_data['title'],
+                content=generated_data['content'],
+                content_type=ContentType(content_type),
+                niche=niche,
+                target_audience=target_audience,
+                word_count=len(generated_data['content'].split()),
+                meta_description=generated_data['meta_description'],
+                email_subject=generated_data['email_subject']
+            )
+            
+            content.set_keywords_list(keywords)
+            content.set_social_posts_list(generated_data['social_media_posts'])
+            content.set_affiliate_links_dict(generated_data['affiliate_links'])
+            
+            db.session.add(content)
+            db.session.commit()
+        except Exception:
+            # Nothing was generated, so it must not count against the limit
+            reservation.release()
+            raise
         
         return jsonify({
             'success': True,
             'content': content.to_dict(),
             'usage': {
-                'remaining': subscription.get_limits()['content_per_month'] - subscription.content_generated_count
+                'remaining': reservation.remaining
             }
         })
         
@@ -1,65 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, url_for
 from flask_cors import cross_origin
 import json
+import queue
 import random
 from datetime import datetime, timedelta
 from src.models.content import db, SocialMediaPost
-from src.models.subscription import Subscription
+from src.services.post_analytics import platform_totals, top_posts
+from src.services.posting_times import posting_time_model
+from src.services.bulk_posts import MAX_BULK_POSTS, PostBatch
+from src.services.credential_vault import credential_vault
+from src.services.hashtags import hashtag_engine
+from src.services.idempotency import idempotency_store, publish_key
+from src.services.platform_rules import PLATFORM_CONFIGS, optimize_for_platforms
+from src.services.publish_dispatcher import IN_FLIGHT_STATUSES, publish_dispatcher
+from src.services.slot_allocator import NoSlotAvailable, SlotAllocator, SlotRequest, schedule_posts
+from src.services.tenant_context import current_tenant
+from src.services.trending_hashtags import trending_hashtags
+from src.services.usage import UsageLimitExceeded, reserve_usage
 
 social_media_bp = Blueprint('social_media', __name__)
 
-# Platform configurations
-PLATFORM_CONFIGS = {
-    'instagram': {
-        'max_length': 2200,
-        'hashtag_limit': 30,
-        'optimal_times': ['09:00', '15:00', '19:00'],
-        'supported_media': ['image', 'video'],
-        'features': ['posts', 'stories', 'reels']
-    },
-    'tiktok': {
-        'max_length': 300,
-        'hashtag_limit': 20,
-        'optimal_times': ['12:00', '18:00', '21:00'],
-        'supported_media': ['video'],
-        'features': ['videos']
-    },
-    'facebook': {
-        'max_length': 63206,
-        'hashtag_limit': 10,
-        'optimal_times': ['08:00', '14:00', '20:00'],
-        'supported_media': ['image', 'video', 'link'],
-        'features': ['posts', 'stories']
-    },
-    'pinterest': {
-        'max_length': 500,
-        'hashtag_limit': 20,
-        'optimal_times': ['11:00', '16:00', '22:00'],
-        'supported_media': ['image'],
-        'features': ['pins', 'boards']
-    },
-    'youtube': {
-        'max_length': 5000,
-        'hashtag_limit': 15,
-        'optimal_times': ['10:00'],
-        'supported_media': ['video'],
-        'features': ['videos', 'shorts', 'community']
-    },
-    'linkedin': {
-        'max_length': 3000,
-        'hashtag_limit': 5,
-        'optimal_times': ['09:00', '12:00', '17:00'],
-        'supported_media': ['image', 'video', 'document'],
-        'features': ['posts', 'articles']
-    },
-    'twitter': {
-        'max_length': 280,
-        'hashtag_limit': 2,
-        'optimal_times': ['09:00', '12:00', '15:00', '18:00'],
-        'supported_media': ['image', 'video', 'gif'],
-        'features': ['tweets', 'threads']
-    }
-}
+SSE_HEARTBEAT_SECONDS = 15
 
 @social_media_bp.route('/platforms', methods=['GET'])
 @cross_origin()
@@ -70,6 +31,56 @@ def get_platforms():
         'platforms': PLATFORM_CONFIGS
     })
 
+@social_media_bp.route('/accounts', methods=['GET'])
+@cross_origin()
+def get_connected_accounts():
+    """List the platform accounts a user has connected (without credentials)"""
+    try:
+        user_id = request.args.get('user_id')
+        return jsonify({'accounts': credential_vault.connected_accounts(user_id)})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@social_media_bp.route('/accounts/<platform>', methods=['POST'])
+@cross_origin()
+def connect_account(platform):
+    """Store a user's credentials for a platform, encrypted at rest"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        credentials = data.get('credentials')
+        
+        if platform not in PLATFORM_CONFIGS:
+            return jsonify({'error': 'Invalid platform'}), 400
+        if not user_id or not isinstance(credentials, dict) or not credentials:
+            return jsonify({'error': 'user_id and credentials are required'}), 400
+        
+        expires_at = None
+        if data.get('expires_in'):
+            expires_at = datetime.utcnow() + timedelta(seconds=int(data['expires_in']))
+        
+        record = credential_vault.save(user_id, platform, credentials, expires_at=expires_at)
+        
+        return jsonify({'success': True, 'account': record.to_dict()}), 201
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@social_media_bp.route('/accounts/<platform>', methods=['DELETE'])
+@cross_origin()
+def disconnect_account(platform):
+    """Remove a user's stored credentials for a platform"""
+    try:
+        user_id = request.args.get('user_id')
+        if not credential_vault.delete(user_id, platform):
+            return jsonify({'error': 'Account not connected'}), 404
+        
+        return jsonify({'success': True, 'message': f'{platform} account disconnected'})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @social_media_bp.route('/create-post', methods=['POST'])
 @cross_origin()
 def create_social_post():
@@ -78,14 +89,6 @@ def create_social_post():
         data = request.get_json()
         user_id = data.get('user_id')
         
-        # Check subscription limits
-        subscription = Subscription.query.filter_by(user_id=user_id).first()
-        if not subscription or not subscription.can_use_feature('social_posts'):
-            return jsonify({
-                'error': 'Social media posting limit reached for your subscription tier',
-                'upgrade_required': True
-            }), 403
-        
         platform = data.get('platform')
         content = data.get('content', '')
         hashtags = data.get('hashtags', [])
@@ -97,37 +100,47 @@ def create_social_post():
         if platform not in PLATFORM_CONFIGS:
             return jsonify({'error': f'Unsupported platform: {platform}'}), 400
         
-        # Optimize content for platform
-        optimized_content = _optimize_content_for_platform(content, platform, hashtags)
-        
-        # Create social media post
-        post = SocialMediaPost(
-            user_id=user_id,
-            content_id=content_id,
-            platform=platform,
-            content=optimized_content['content']
-        )
-        
-        post.set_hashtags_list(optimized_content['hashtags'])
-        post.set_media_urls_list(media_urls)
-        
-        if scheduled_time:
-            post.scheduled_time = datetime.fromisoformat(scheduled_time)
-            post.status = 'scheduled'
-        else:
-            post.status = 'draft'
-        
-        db.session.add(post)
-        db.session.commit()
+        # Check and count subscription usage in one conditional UPDATE
+        reservation = reserve_usage(user_id, 'social_posts')
+        if reservation is None:
+            return jsonify({
+                'error': 'Social media posting limit reached for your subscription tier',
+                'upgrade_required': True
+            }), 403
         
-        # Update subscription usage
-        subscription.increment_usage('social_posts')
+        try:
+            # Optimize content for platform
+            optimized_content = _optimize_content_for_platforms(content, [platform], hashtags)[platform]
+            
+            # Create social media post
+            post = SocialMediaPost(
+                user_id=user_id,
+                content_id=content_id,
+                platform=platform,
+                content=optimized_content['content']
+            )
+            
+            post.set_hashtags_list(optimized_content['hashtags'])
+            post.set_media_urls_list(media_urls)
+            
+            if scheduled_time:
+                post.scheduled_time = datetime.fromisoformat(scheduled_time)
+                post.status = 'scheduled'
+            else:
+                post.status = 'draft'
+            
+            db.session.add(post)
+            db.session.commit()
+        except Exception:
+            # The post was not created, so it must not count against the limit
+            reservation.release()
+            raise
         
         return jsonify({
             'success': True,
             'post': post.to_dict(),
             'usage': {
-                'remaining': subscription.get_limits()['social_posts_per_month'] - subscription.social_posts_count
+                'remaining': reservation.remaining
             }
         })
         
@@ -143,8 +156,8 @@ def create_cross_platform_posts():
         user_id = data.get('user_id')
         
         # Check subscription limits
-        subscription = Subscription.query.filter_by(user_id=user_id).first()
-        if not subscription:
+        tenant = current_tenant(user_id)
+        if not tenant:
             return jsonify({'error': 'Subscription not found'}), 404
         
         content = data.get('content', '')
@@ -154,62 +167,146 @@ def create_cross_platform_posts():
         scheduled_time = data.get('scheduled_time')
         content_id = data.get('content_id')
         
-        # Check if user can create posts for all platforms
-        if not subscription.can_use_feature('social_posts', len(platforms)):
+        # Get user's allowed platforms
+        allowed_platforms = tenant.allowed_platforms
+        platforms = [p for p in platforms if p in allowed_platforms and p in PLATFORM_CONFIGS]
+        
+        # Check and count subscription usage for every post in one conditional UPDATE
+        reservation = reserve_usage(user_id, 'social_posts', len(platforms))
+        if reservation is None:
             return jsonify({
                 'error': 'Social media posting limit reached for your subscription tier',
                 'upgrade_required': True
             }), 403
         
-        # Get user's allowed platforms
-        allowed_platforms = subscription.get_limits()['platforms']
-        platforms = [p for p in platforms if p in allowed_platforms]
-        
-        created_posts = []
-        
-        for platform in platforms:
-            if platform not in PLATFORM_CONFIGS:
-                continue
-            
-            # Optimize content for each platform
-            optimized_content = _optimize_content_for_platform(content, platform, hashtags)
+        try:
+            # Spread scheduled posts over free publishing slots at or shortly after the requested time
+            scheduled_times = {}
+            if scheduled_time:
+                base_time = datetime.fromisoformat(scheduled_time)
+                scheduled_times = SlotAllocator().allocate([
+                    SlotRequest(platform, user_id, platform, base_time, allow_earlier=False)
+                    for platform in platforms
+                ])
             
-            # Create post
-            post = SocialMediaPost(
-                user_id=user_id,
-                content_id=content_id,
-                platform=platform,
-                content=optimized_content['content']
-            )
+            # Optimize content for all platforms in one pass
+            optimized_contents = _optimize_content_for_platforms(content, platforms, hashtags)
             
-            post.set_hashtags_list(optimized_content['hashtags'])
-            post.set_media_urls_list(media_urls)
+            created_posts = []
             
-            if scheduled_time:
-                # Stagger posts across platforms
-                base_time = datetime.fromisoformat(scheduled_time)
-                platform_delay = len(created_posts) * 15  # 15 minutes between platforms
-                post.scheduled_time = base_time + timedelta(minutes=platform_delay)
-                post.status = 'scheduled'
-            else:
-                post.status = 'draft'
+            for platform in platforms:
+                optimized_content = optimized_contents[platform]
+                
+                # Create post
+                post = SocialMediaPost(
+                    user_id=user_id,
+                    content_id=content_id,
+                    platform=platform,
+                    content=optimized_content['content']
+                )
+                
+                post.set_hashtags_list(optimized_content['hashtags'])
+                post.set_media_urls_list(media_urls)
+                
+                if scheduled_time:
+                    post.scheduled_time = scheduled_times[platform]
+                    post.status = 'scheduled'
+                else:
+                    post.status = 'draft'
+                
+                db.session.add(post)
+                created_posts.append(post)
             
-            db.session.add(post)
-            created_posts.append(post)
+            db.session.commit()
+        except Exception:
+            # No posts were created, so none may count against the limit
+            reservation.release()
+            raise
         
-        db.session.commit()
+        return jsonify({
+            'success': True,
+            'posts': [post.to_dict() for post in created_posts],
+            'usage': {
+                'remaining': reservation.remaining
+            }
+        })
+        
+    except NoSlotAvailable as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@social_media_bp.route('/bulk-create', methods=['POST'])
+@cross_origin()
+def bulk_create_posts():
+    """Create posts for many pieces of content across their platforms in one transaction"""
+    try:
+        data = request.get_json()
+        user_id = data.get('user_id')
+        items = data.get('posts', [])
+        default_platforms = data.get('platforms', [])
         
-        # Update subscription usage
-        subscription.increment_usage('social_posts', len(created_posts))
+        tenant = current_tenant(user_id)
+        if not tenant:
+            return jsonify({'error': 'Subscription not found'}), 404
+        
+        allowed_platforms = tenant.allowed_platforms
+        
+        # Expand content x platforms, keeping only platforms the tier allows
+        combinations = []
+        for index, item in enumerate(items):
+            platforms = item.get('platforms', default_platforms)
+            platforms = [p for p in dict.fromkeys(platforms) if p in allowed_platforms and p in PLATFORM_CONFIGS]
+            combinations.append((index, item, platforms))
+        
+        total_posts = sum(len(platforms) for _, _, platforms in combinations)
+        if total_posts == 0:
+            return jsonify({'error': 'No posts to create for the allowed platforms'}), 400
+        if total_posts > MAX_BULK_POSTS:
+            return jsonify({'error': f'At most {MAX_BULK_POSTS} posts can be created per request'}), 400
+        
+        # Spread every scheduled post over free publishing slots in one allocation
+        slot_requests = [
+            SlotRequest((index, platform), user_id, platform, datetime.fromisoformat(item['scheduled_time']), allow_earlier=False)
+            for index, item, platforms in combinations if item.get('scheduled_time')
+            for platform in platforms
+        ]
+        scheduled_times = SlotAllocator().allocate(slot_requests) if slot_requests else {}
+        
+        batch = PostBatch(user_id)
+        for index, item, platforms in combinations:
+            if not platforms:
+                continue
+            optimized_contents = _optimize_content_for_platforms(item.get('content', ''), platforms, item.get('hashtags', []))
+            for platform in platforms:
+                batch.add(
+                    platform,
+                    optimized_contents[platform]['content'],
+                    optimized_contents[platform]['hashtags'],
+                    item.get('media_urls', []),
+                    content_id=item.get('content_id'),
+                    scheduled_time=scheduled_times.get((index, platform))
+                )
+        
+        # One INSERT ... RETURNING for all posts, charged to usage in the same transaction
+        post_ids = batch.insert()
         
         return jsonify({
             'success': True,
-            'posts': [post.to_dict() for post in created_posts],
+            'created': len(post_ids),
+            'posts': batch.serialize(post_ids),
             'usage': {
-                'remaining': subscription.get_limits()['social_posts_per_month'] - subscription.social_posts_count
+                'remaining': batch.remaining
             }
         })
         
+    except UsageLimitExceeded as e:
+        return jsonify({
+            'error': str(e),
+            'upgrade_required': True
+        }), 403
+    except NoSlotAvailable as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -307,32 +404,81 @@ def delete_post(post_id):
 @social_media_bp.route('/publish/<int:post_id>', methods=['POST'])
 @cross_origin()
 def publish_post(post_id):
-    """Publish a social media post immediately"""
+    """Queue a social media post for immediate publishing"""
     try:
         post = SocialMediaPost.query.get_or_404(post_id)
         
-        # Simulate publishing to platform
-        success = _publish_to_platform(post)
+        # Already queued, publishing or published posts are not queued again, so
+        # client retries return the current state instead of posting twice
+        queued = publish_dispatcher.enqueue(post)
         
-        if success:
-            post.status = 'published'
-            post.published_time = datetime.utcnow()
-            post.platform_post_id = f"{post.platform}_{random.randint(100000, 999999)}"
-            post.platform_url = f"https://{post.platform}.com/post/{post.platform_post_id}"
-        else:
-            post.status = 'failed'
+        return jsonify({
+            'success': post.status != 'failed',
+            'queued': queued,
+            'post': post.to_dict(),
+            'status_url': url_for('social_media.get_publish_status', post_id=post.id),
+            'message': 'Post queued for publishing' if queued else f'Post is already {post.status}'
+        }), 202 if post.status in IN_FLIGHT_STATUSES else 200
         
-        db.session.commit()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@social_media_bp.route('/publish/<int:post_id>/status', methods=['GET'])
+@cross_origin()
+def get_publish_status(post_id):
+    """Get the publishing status of a post"""
+    try:
+        post = SocialMediaPost.query.get_or_404(post_id)
+        attempt = idempotency_store.get(publish_key(post.id, post.platform))
         
         return jsonify({
-            'success': success,
-            'post': post.to_dict(),
-            'message': 'Post published successfully' if success else 'Failed to publish post'
+            'post_id': post.id,
+            'status': post.status,
+            'platform_post_id': post.platform_post_id,
+            'platform_url': post.platform_url,
+            'attempt': attempt.to_dict() if attempt else None
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@social_media_bp.route('/publish/stream', methods=['GET'])
+@cross_origin()
+def stream_publish_status():
+    """Stream a user's post status changes as server-sent events"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    
+    broker = publish_dispatcher.broker
+    subscriber = broker.subscribe(user_id)
+    
+    def events():
+        try:
+            while True:
+                try:
+                    event = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Keeps proxies from closing an idle connection
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"event: status\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(user_id, subscriber)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@social_media_bp.route('/publish/metrics', methods=['GET'])
+@cross_origin()
+def get_publish_queue_metrics():
+    """Get publish queue depth and latency per tenant"""
+    try:
+        return jsonify(publish_dispatcher.metrics(request.args.get('user_id')))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @social_media_bp.route('/schedule-optimal', methods=['POST'])
 @cross_origin()
 def schedule_optimal_times():
@@ -342,30 +488,23 @@ def schedule_optimal_times():
         user_id = data.get('user_id')
         post_ids = data.get('post_ids', [])
         
-        posts = SocialMediaPost.query.filter(
+        rows = db.session.query(SocialMediaPost.id, SocialMediaPost.platform).filter(
             SocialMediaPost.id.in_(post_ids),
             SocialMediaPost.user_id == user_id
         ).all()
         
-        for post in posts:
-            platform_config = PLATFORM_CONFIGS.get(post.platform, {})
-            optimal_times = platform_config.get('optimal_times', ['12:00'])
-            
-            # Choose random optimal time
-            optimal_time = random.choice(optimal_times)
-            hour, minute = map(int, optimal_time.split(':'))
-            
-            # Schedule for next occurrence of optimal time
-            now = datetime.utcnow()
-            scheduled_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            
-            if scheduled_time <= now:
-                scheduled_time += timedelta(days=1)
-            
-            post.scheduled_time = scheduled_time
-            post.status = 'scheduled'
+        now = datetime.utcnow()
+        slot_requests = []
+        for post_id, platform in rows:
+            # Next occurrence of one of the best slots learned from engagement history,
+            # or of a default optimal time while the platform has no history
+            target = posting_time_model.next_optimal_time(user_id, platform, now) or _default_optimal_time(platform, now)
+            slot_requests.append(SlotRequest(post_id, user_id, platform, target))
         
-        db.session.commit()
+        # Spread the batch over free slots near the targets and apply it with one UPDATE
+        schedule_posts(slot_requests, now=now)
+        
+        posts = SocialMediaPost.query.filter(SocialMediaPost.id.in_([post_id for post_id, _ in rows])).all()
         
         return jsonify({
             'success': True,
@@ -373,6 +512,8 @@ def schedule_optimal_times():
             'posts': [post.to_dict() for post in posts]
         })
         
+    except NoSlotAvailable as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -385,52 +526,30 @@ def get_social_analytics():
         days = int(request.args.get('days', 30))
         platform = request.args.get('platform')
         
-        from datetime import timedelta
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        query = SocialMediaPost.query.filter(
-            SocialMediaPost.user_id == user_id,
-            SocialMediaPost.created_at >= start_date
+        # Per-platform sums are computed in SQL; only one row per platform comes back
+        posts_by_platform = platform_totals(
+            user_id, start_date, platform=platform, time_column=SocialMediaPost.created_at
         )
         
-        if platform:
-            query = query.filter_by(platform=platform)
-        
-        posts = query.all()
-        
-        # Calculate analytics
-        total_posts = len(posts)
-        total_likes = sum(post.likes for post in posts)
-        total_comments = sum(post.comments for post in posts)
-        total_shares = sum(post.shares for post in posts)
-        total_clicks = sum(post.clicks for post in posts)
-        total_reach = sum(post.reach for post in posts)
-        total_impressions = sum(post.impressions for post in posts)
-        
-        # Posts by platform
-        posts_by_platform = {}
-        for post in posts:
-            if post.platform not in posts_by_platform:
-                posts_by_platform[post.platform] = {
-                    'count': 0,
-                    'likes': 0,
-                    'comments': 0,
-                    'shares': 0,
-                    'clicks': 0,
-                    'reach': 0,
-                    'impressions': 0
-                }
-            
-            posts_by_platform[post.platform]['count'] += 1
-            posts_by_platform[post.platform]['likes'] += post.likes
-            posts_by_platform[post.platform]['comments'] += post.comments
-            posts_by_platform[post.platform]['shares'] += post.shares
-            posts_by_platform[post.platform]['clicks'] += post.clicks
-            posts_by_platform[post.platform]['reach'] += post.reach
-            posts_by_platform[post.platform]['impressions'] += post.impressions
-        
-        # Top performing posts
-        top_posts = sorted(posts, key=lambda p: p.likes + p.comments + p.shares, reverse=True)[:5]
+        totals = {'count': 0, 'likes': 0, 'comments': 0, 'shares': 0, 'clicks': 0, 'reach': 0, 'impressions': 0}
+        for platform_row in posts_by_platform.values():
+            for metric, value in platform_row.items():
+                totals[metric] += value
+        
+        total_posts = totals['count']
+        total_likes = totals['likes']
+        total_comments = totals['comments']
+        total_shares = totals['shares']
+        total_clicks = totals['clicks']
+        total_reach = totals['reach']
+        total_impressions = totals['impressions']
+        
+        # Top performing posts (ORDER BY engagement DESC LIMIT 5)
+        top_performing = top_posts(
+            user_id, start_date, platform=platform, time_column=SocialMediaPost.created_at, limit=5
+        )
         
         return jsonify({
             'success': True,
@@ -446,7 +565,7 @@ def get_social_analytics():
                 'engagement_rate': (total_likes + total_comments + total_shares) / total_impressions * 100 if total_impressions > 0 else 0,
                 'click_through_rate': total_clicks / total_impressions * 100 if total_impressions > 0 else 0,
                 'posts_by_platform': posts_by_platform,
-                'top_posts': [post.to_dict() for post in top_posts]
+                'top_posts': [post.to_dict() for post in top_performing]
             }
         })
         
@@ -459,62 +578,73 @@ def get_hashtag_suggestions():
     """Get hashtag suggestions for content"""
     try:
         data = request.get_json()
+        
+        # Batch form: {"posts": [{"content", "platform", "niche"}, ...]}
+        if 'posts' in data:
+            return jsonify({
+                'success': True,
+                'results': hashtag_engine.suggest_batch(data['posts'], trending_hashtags.hashtags)
+            })
+        
         content = data.get('content', '')
         platform = data.get('platform', 'instagram')
         niche = data.get('niche', 'general')
         
-        # Generate hashtag suggestions based on content and niche
-        suggestions = _generate_hashtag_suggestions(content, platform, niche)
+        # Generate hashtag suggestions based on content, niche and what performs well lately
+        trending = trending_hashtags.top(niche, platform)
+        suggestions = hashtag_engine.suggest(content, platform, niche, trending_hashtags.hashtags(niche, platform))
         
         return jsonify({
             'success': True,
-            'hashtags': suggestions
+            'hashtags': suggestions,
+            'trending': trending
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def _optimize_content_for_platform(content, platform, hashtags):
-    """Optimize content for specific platform"""
+def _optimize_content_for_platforms(content, platforms, hashtags):
+    """Optimize content for each platform, tokenizing it once for all of them"""
+    variants = optimize_for_platforms({'text': content, 'hashtags': hashtags}, platforms,
+                                      call_to_action=True, twitter_threads=False)
+    return {
+        platform: {'content': variant['text'], 'hashtags': variant['hashtags']}
+        for platform, variant in variants.items()
+    }
+
+def _default_optimal_time(platform, now):
+    """Next occurrence of a random default optimal time for the platform"""
     platform_config = PLATFORM_CONFIGS.get(platform, {})
-    max_length = platform_config.get('max_length', 1000)
-    hashtag_limit = platform_config.get('hashtag_limit', 10)
+    optimal_times = platform_config.get('optimal_times', ['12:00'])
+    hour, minute = map(int, random.choice(optimal_times).split(':'))
     
-    # Truncate content if needed
-    if len(content) > max_length:
-        content = content[:max_length-3] + "..."
+    scheduled_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if scheduled_time <= now:
+        scheduled_time += timedelta(days=1)
     
-    # Limit hashtags
-    hashtags = hashtags[:hashtag_limit]
+    return scheduled_time
+
+async def _publish_post_async(post):
+    """Dispatcher publish function; stages the post's new state for the idempotency store to commit"""
+    success = _publish_to_platform(post)
     
-    # Platform-specific optimizations
-    if platform == 'instagram':
-        content += "\n\n💡 Save this post for later!"
-        content += "\n👥 Tag someone who needs to see this!"
-    elif platform == 'tiktok':
-        content += "\n\n🔥 Follow for more tips!"
-        content += "\n💬 Comment your thoughts below!"
-    elif platform == 'facebook':
-        if not content.startswith(("🔥", "💡", "🚀", "⚡")):
-            content = "💡 " + content
-    elif platform == 'pinterest':
-        content += "\n\n📌 Save to your board!"
-        content += "\n🔗 Click for full guide!"
-    elif platform == 'youtube':
-        content += "\n\n📺 Subscribe for more content like this!"
-        content += "\n👍 Like this video if it helped you!"
-    elif platform == 'linkedin':
-        content += "\n\n💼 What's your experience with this?"
-        content += "\n🔗 Connect with me for more insights!"
-    elif platform == 'twitter':
-        content += "\n\n🧵 Thread below 👇"
-        content += "\n🔄 RT if you found this helpful!"
+    if success:
+        post.status = 'published'
+        post.published_time = datetime.utcnow()
+        post.platform_post_id = f"{post.platform}_{random.randint(100000, 999999)}"
+        post.platform_url = f"https://{post.platform}.com/post/{post.platform_post_id}"
+    else:
+        post.status = 'failed'
     
     return {
-        'content': content,
-        'hashtags': hashtags
+        'success': success,
+        'platform_post_id': post.platform_post_id,
+        'platform_url': post.platform_url
     }
 
+# Publishing runs on the dispatcher workers (or inline when they are not started)
+publish_dispatcher.publish_func = _publish_post_async
+
 def _publish_to_platform(post):
     """Simulate publishing to social media platform"""
     # In a real implementation, this would use platform APIs
@@ -534,56 +664,3 @@ def _publish_to_platform(post):
     
     return success
 
-def _generate_hashtag_suggestions(content, platform, niche):
-    """Generate hashtag suggestions based on content and niche"""
-    
-    # Base hashtags by niche
-    niche_hashtags = {
-        'travel': ['#travel', '#wanderlust', '#explore', '#adventure', '#vacation', '#travelgram', '#instatravel', '#traveling', '#travelphotography', '#backpacking'],
-        'productivity': ['#productivity', '#entrepreneur', '#business', '#success', '#motivation', '#goals', '#hustle', '#mindset', '#leadership', '#growth'],
-        'lifestyle': ['#lifestyle', '#inspiration', '#wellness', '#selfcare', '#mindfulness', '#happiness', '#positivity', '#life', '#daily', '#routine'],
-        'food': ['#food', '#foodie', '#delicious', '#yummy', '#cooking', '#recipe', '#foodporn', '#instafood', '#chef', '#kitchen'],
-        'fitness': ['#fitness', '#workout', '#gym', '#health', '#fit', '#training', '#exercise', '#motivation', '#strength', '#cardio'],
-        'fashion': ['#fashion', '#style', '#outfit', '#ootd', '#fashionista', '#trendy', '#stylish', '#look', '#clothing', '#accessories']
-    }
-    
-    # Platform-specific hashtags
-    platform_hashtags = {
-        'instagram': ['#instagood', '#photooftheday', '#instadaily', '#follow', '#like4like'],
-        'tiktok': ['#fyp', '#foryou', '#viral', '#trending', '#tiktok'],
-        'facebook': ['#facebook', '#social', '#community', '#share'],
-        'pinterest': ['#pinterest', '#pinit', '#inspiration', '#ideas'],
-        'youtube': ['#youtube', '#subscribe', '#video', '#content'],
-        'linkedin': ['#linkedin', '#professional', '#networking', '#career'],
-        'twitter': ['#twitter', '#tweet', '#follow', '#retweet']
-    }
-    
-    # Content-based hashtags (extract keywords from content)
-    content_words = content.lower().split()
-    content_hashtags = []
-    
-    # Common keywords that make good hashtags
-    good_hashtag_words = [
-        'tips', 'guide', 'how', 'best', 'top', 'amazing', 'awesome', 'great', 'new', 'free',
-        'easy', 'simple', 'quick', 'fast', 'effective', 'powerful', 'ultimate', 'complete',
-        'beginner', 'advanced', 'pro', 'expert', 'secret', 'hack', 'trick', 'method'
-    ]
-    
-    for word in content_words:
-        if word in good_hashtag_words and len(word) > 3:
-            content_hashtags.append(f'#{word}')
-    
-    # Combine all hashtags
-    all_hashtags = []
-    all_hashtags.extend(niche_hashtags.get(niche, []))
-    all_hashtags.extend(platform_hashtags.get(platform, []))
-    all_hashtags.extend(content_hashtags[:5])  # Limit content hashtags
-    
-    # Remove duplicates and limit based on platform
-    platform_config = PLATFORM_CONFIGS.get(platform, {})
-    hashtag_limit = platform_config.get('hashtag_limit', 10)
-    
-    unique_hashtags = list(dict.fromkeys(all_hashtags))  # Remove duplicates while preserving order
-    
-    return unique_hashtags[:hashtag_limit]
-
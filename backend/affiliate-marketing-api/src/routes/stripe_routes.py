@@ -5,9 +5,10 @@ Handles all payment-related API endpoints
 
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import asyncio
+import concurrent.futures
 import logging
-from ..services.stripe_service import stripe_service, SubscriptionTier
+import uuid
+from ..services.stripe_service import stripe_service, SubscriptionTier, STRIPE_OPERATION_TIMEOUT
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,6 +16,31 @@ logger = logging.getLogger(__name__)
 # Create Blueprint
 stripe_bp = Blueprint('stripe', __name__, url_prefix='/api/stripe')
 
+def _idempotency_key():
+    """The client's Idempotency-Key header, or a new key for this request
+
+    Routes prefix it with the user's ID before it reaches Stripe, so one
+    user's key can never replay another user's result.
+    """
+    return request.headers.get('Idempotency-Key') or str(uuid.uuid4())
+
+def _timed_out(action, idempotency_key=None):
+    """504 for a Stripe operation that was still running when the route stopped waiting
+
+    The operation is not cancelled and may still complete. For writes the
+    response carries the idempotency key, so a retry sending it back in the
+    Idempotency-Key header gets that write's result instead of a second write.
+    """
+    logger.error(f"Timed out after {STRIPE_OPERATION_TIMEOUT}s waiting for Stripe to {action}")
+    body = {
+        'success': False,
+        'error': f'Stripe did not respond within {STRIPE_OPERATION_TIMEOUT:g} seconds while trying to {action}'
+    }
+    if idempotency_key:
+        body['error'] += '; it may still complete, so retry with the same Idempotency-Key header'
+        body['idempotency_key'] = idempotency_key
+    return jsonify(body), 504
+
 @stripe_bp.route('/pricing', methods=['GET'])
 def get_pricing_plans():
     """Get all available pricing plans"""
@@ -38,6 +64,7 @@ def create_customer():
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
+        idempotency_key = _idempotency_key()
         
         email = data.get('email')
         name = data.get('name')
@@ -48,14 +75,15 @@ def create_customer():
                 'error': 'Email is required'
             }), 400
         
-        # Run async function
-        result = asyncio.run(stripe_service.create_customer(user_id, email, name))
+        result = stripe_service.run(stripe_service.create_customer(user_id, email, name, idempotency_key=f"{user_id}:{idempotency_key}"))
         
         if result['success']:
             return jsonify(result), 200
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('create the customer', idempotency_key)
     except Exception as e:
         logger.error(f"Error creating customer: {str(e)}")
         return jsonify({
@@ -70,6 +98,7 @@ def create_checkout_session():
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
+        idempotency_key = _idempotency_key()
         
         customer_id = data.get('customer_id')
         tier = data.get('tier')
@@ -91,8 +120,8 @@ def create_checkout_session():
                 'error': 'Invalid subscription tier'
             }), 400
         
-        result = asyncio.run(stripe_service.create_checkout_session(
-            customer_id, subscription_tier, billing_cycle, success_url, cancel_url
+        result = stripe_service.run(stripe_service.create_checkout_session(
+            customer_id, subscription_tier, billing_cycle, success_url, cancel_url, idempotency_key=f"{user_id}:{idempotency_key}"
         ))
         
         if result['success']:
@@ -100,6 +129,8 @@ def create_checkout_session():
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('create the checkout session', idempotency_key)
     except Exception as e:
         logger.error(f"Error creating checkout session: {str(e)}")
         return jsonify({
@@ -114,6 +145,7 @@ def create_subscription():
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
+        idempotency_key = _idempotency_key()
         
         customer_id = data.get('customer_id')
         tier = data.get('tier')
@@ -133,8 +165,8 @@ def create_subscription():
                 'error': 'Invalid subscription tier'
             }), 400
         
-        result = asyncio.run(stripe_service.create_subscription(
-            customer_id, subscription_tier, billing_cycle
+        result = stripe_service.run(stripe_service.create_subscription(
+            customer_id, subscription_tier, billing_cycle, idempotency_key=f"{user_id}:{idempotency_key}"
         ))
         
         if result['success']:
@@ -142,6 +174,8 @@ def create_subscription():
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('create the subscription', idempotency_key)
     except Exception as e:
         logger.error(f"Error creating subscription: {str(e)}")
         return jsonify({
@@ -156,6 +190,7 @@ def update_subscription():
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
+        idempotency_key = _idempotency_key()
         
         subscription_id = data.get('subscription_id')
         new_tier = data.get('new_tier')
@@ -175,8 +210,8 @@ def update_subscription():
                 'error': 'Invalid subscription tier'
             }), 400
         
-        result = asyncio.run(stripe_service.update_subscription(
-            subscription_id, subscription_tier, billing_cycle
+        result = stripe_service.run(stripe_service.update_subscription(
+            subscription_id, subscription_tier, billing_cycle, idempotency_key=f"{user_id}:{idempotency_key}"
         ))
         
         if result['success']:
@@ -184,6 +219,8 @@ def update_subscription():
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('update the subscription', idempotency_key)
     except Exception as e:
         logger.error(f"Error updating subscription: {str(e)}")
         return jsonify({
@@ -198,6 +235,7 @@ def cancel_subscription():
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
+        idempotency_key = _idempotency_key()
         
         subscription_id = data.get('subscription_id')
         at_period_end = data.get('at_period_end', True)
@@ -208,8 +246,8 @@ def cancel_subscription():
                 'error': 'subscription_id is required'
             }), 400
         
-        result = asyncio.run(stripe_service.cancel_subscription(
-            subscription_id, at_period_end
+        result = stripe_service.run(stripe_service.cancel_subscription(
+            subscription_id, at_period_end, idempotency_key=f"{user_id}:{idempotency_key}"
         ))
         
         if result['success']:
@@ -217,6 +255,8 @@ def cancel_subscription():
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('cancel the subscription', idempotency_key)
     except Exception as e:
         logger.error(f"Error cancelling subscription: {str(e)}")
         return jsonify({
@@ -231,13 +271,15 @@ def get_subscription_status(subscription_id):
     try:
         user_id = get_jwt_identity()
         
-        result = asyncio.run(stripe_service.get_subscription_status(subscription_id))
+        result = stripe_service.run(stripe_service.get_subscription_status(subscription_id))
         
         if result['success']:
             return jsonify(result), 200
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('get the subscription status')
     except Exception as e:
         logger.error(f"Error getting subscription status: {str(e)}")
         return jsonify({
@@ -252,6 +294,7 @@ def create_billing_portal():
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
+        idempotency_key = _idempotency_key()
         
         customer_id = data.get('customer_id')
         return_url = data.get('return_url')
@@ -262,8 +305,8 @@ def create_billing_portal():
                 'error': 'customer_id is required'
             }), 400
         
-        result = asyncio.run(stripe_service.create_billing_portal_session(
-            customer_id, return_url
+        result = stripe_service.run(stripe_service.create_billing_portal_session(
+            customer_id, return_url, idempotency_key=f"{user_id}:{idempotency_key}"
         ))
         
         if result['success']:
@@ -271,6 +314,8 @@ def create_billing_portal():
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('create the billing portal session', idempotency_key)
     except Exception as e:
         logger.error(f"Error creating billing portal: {str(e)}")
         return jsonify({
@@ -285,13 +330,15 @@ def get_usage_and_billing(customer_id):
     try:
         user_id = get_jwt_identity()
         
-        result = asyncio.run(stripe_service.get_usage_and_billing(customer_id))
+        result = stripe_service.run(stripe_service.get_usage_and_billing(customer_id))
         
         if result['success']:
             return jsonify(result), 200
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('get usage and billing')
     except Exception as e:
         logger.error(f"Error getting usage and billing: {str(e)}")
         return jsonify({
@@ -312,13 +359,15 @@ def stripe_webhook():
                 'error': 'Missing Stripe signature'
             }), 400
         
-        result = asyncio.run(stripe_service.handle_webhook(payload, sig_header))
+        result = stripe_service.run(stripe_service.handle_webhook(payload, sig_header))
         
         if result['success']:
             return jsonify(result), 200
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('handle the webhook')
     except Exception as e:
         logger.error(f"Error handling webhook: {str(e)}")
         return jsonify({
@@ -337,13 +386,15 @@ def create_test_products():
                 'error': 'Not available in production'
             }), 403
         
-        result = asyncio.run(stripe_service.create_test_data())
+        result = stripe_service.run(stripe_service.create_test_data())
         
         if result['success']:
             return jsonify(result), 200
         else:
             return jsonify(result), 400
             
+    except concurrent.futures.TimeoutError:
+        return _timed_out('create the test products')
     except Exception as e:
         logger.error(f"Error creating test products: {str(e)}")
         return jsonify({
@@ -0,0 +1,234 @@
+"""
+Social Media Analytics Collector for AffiliateFlow SaaS Platform
+Refreshes engagement metrics of published posts in batches, concurrently per platform.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, or_, update
+
+from src.models.content import db, SocialMediaPost
+from src.services.credential_vault import PlatformCredential
+from src.services.jobs import PeriodicJob
+from src.services.leases import LeaderLease
+from src.services.post_analytics import METRIC_COLUMNS, analytics_cache
+from src.services.social_media_service import SocialMediaService
+
+logger = logging.getLogger(__name__)
+
+# (maximum post age, refresh interval) tiers. Young posts are refreshed often,
+# older posts less and less, and posts older than the last tier are never
+# refreshed again, so the cost of a run tracks recent posting volume only.
+REFRESH_SCHEDULE = (
+    (timedelta(hours=6), timedelta(minutes=30)),
+    (timedelta(days=1), timedelta(hours=2)),
+    (timedelta(days=7), timedelta(hours=12)),
+    (timedelta(days=30), timedelta(days=2)),
+    (timedelta(days=90), timedelta(days=7)),
+)
+
+# Per-platform API budgets: concurrent requests and minimum seconds between requests
+PLATFORM_RATE_LIMITS = {
+    'facebook': {'concurrency': 4, 'min_interval': 0.2},
+    'instagram': {'concurrency': 4, 'min_interval': 0.2},
+    'twitter': {'concurrency': 2, 'min_interval': 1.0},
+    'linkedin': {'concurrency': 2, 'min_interval': 0.5},
+    'pinterest': {'concurrency': 2, 'min_interval': 0.5},
+}
+DEFAULT_RATE_LIMIT = {'concurrency': 1, 'min_interval': 1.0}
+
+class _PlatformRateLimiter:
+    """Bounds concurrency and request spacing for one platform"""
+
+    def __init__(self, concurrency: int, min_interval: float):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._min_interval = min_interval
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+class AnalyticsCollector:
+    """Collects post engagement from platform APIs and writes it back in bulk"""
+
+    def __init__(
+        self,
+        credentials_provider: Callable[[str, str], Optional[Dict]],
+        service: SocialMediaService = None,
+        max_posts_per_run: int = 5000
+    ):
+        self.credentials_provider = credentials_provider
+        self.service = service or SocialMediaService()
+        self.max_posts_per_run = max_posts_per_run
+        self._analytics_platforms: Optional[List[str]] = None
+
+    @property
+    def analytics_platforms(self) -> List[str]:
+        """Platforms whose poster can fetch analytics"""
+        if self._analytics_platforms is None:
+            self._analytics_platforms = [
+                platform for platform, poster in self.service.platforms.items() if poster.supports_analytics
+            ]
+        return self._analytics_platforms
+
+    def collect_due(self, now: datetime = None) -> Dict:
+        """Refresh metrics for every published post that is due; returns run statistics"""
+        now = now or datetime.utcnow()
+        groups = self._load_due_groups(now)
+        if not groups:
+            return {'groups': 0, 'posts_due': 0, 'posts_updated': 0, 'failed_batches': 0}
+
+        stats = asyncio.run(self._collect_groups(groups, now))
+        stats['groups'] = len(groups)
+        stats['posts_due'] = sum(len(posts) for posts in groups.values())
+
+        logger.info(
+            f"Analytics refresh: {stats['posts_updated']}/{stats['posts_due']} posts updated "
+            f"across {stats['groups']} accounts ({stats['failed_batches']} failed batches)"
+        )
+        return stats
+
+    def _load_due_groups(self, now: datetime) -> Dict[Tuple[str, str], List[Tuple[int, str]]]:
+        """Select due posts and group them by (platform, account)
+
+        Only posts that can actually be refreshed are selected: on platforms with
+        an analytics API, from accounts with stored credentials. Nothing marks
+        the others as refreshed, so they would stay due and crowd out the rest.
+        """
+        rows = db.session.query(
+            SocialMediaPost.id,
+            SocialMediaPost.user_id,
+            SocialMediaPost.platform,
+            SocialMediaPost.platform_post_id
+        ).filter(
+            SocialMediaPost.status == 'published',
+            SocialMediaPost.platform_post_id.isnot(None),
+            SocialMediaPost.platform.in_(self.analytics_platforms),
+            exists().where(
+                PlatformCredential.user_id == SocialMediaPost.user_id,
+                PlatformCredential.platform == SocialMediaPost.platform
+            ),
+            _due_for_refresh(now)
+        ).order_by(
+            SocialMediaPost.published_time.desc()
+        ).limit(self.max_posts_per_run).all()
+
+        groups = {}
+        for post_id, user_id, platform, platform_post_id in rows:
+            groups.setdefault((platform, user_id), []).append((post_id, platform_post_id))
+        return groups
+
+    async def _collect_groups(self, groups: Dict[Tuple[str, str], List[Tuple[int, str]]], now: datetime) -> Dict:
+        limiters = {}
+        for platform, _ in groups:
+            if platform not in limiters:
+                limits = PLATFORM_RATE_LIMITS.get(platform, DEFAULT_RATE_LIMIT)
+                limiters[platform] = _PlatformRateLimiter(limits['concurrency'], limits['min_interval'])
+
+        stats = {'posts_updated': 0, 'failed_batches': 0}
+        tasks = [
+            self._collect_group(platform, user_id, posts, limiters[platform], now, stats)
+            for (platform, user_id), posts in groups.items()
+        ]
+        await asyncio.gather(*tasks)
+        return stats
+
+    async def _collect_group(
+        self,
+        platform: str,
+        user_id: str,
+        posts: List[Tuple[int, str]],
+        limiter: _PlatformRateLimiter,
+        now: datetime,
+        stats: Dict
+    ):
+        poster = self.service.platforms.get(platform)
+        credentials = self.credentials_provider(user_id, platform)
+        if not poster or not credentials:
+            return
+
+        batch_size = poster.analytics_batch_size
+        updated = 0
+        for start in range(0, len(posts), batch_size):
+            batch = posts[start:start + batch_size]
+            platform_ids = [platform_post_id for _, platform_post_id in batch]
+
+            try:
+                async with limiter:
+                    metrics = await asyncio.to_thread(poster.get_analytics_batch, platform_ids, credentials)
+            except NotImplementedError:
+                # Platform has no analytics API yet; nothing else in this group can succeed
+                break
+            except Exception as e:
+                logger.error(f"Analytics batch failed for {platform} account {user_id}: {str(e)}")
+                stats['failed_batches'] += 1
+                continue
+
+            updated += self._write_batch(batch, metrics, now)
+
+        if updated:
+            stats['posts_updated'] += updated
+            analytics_cache.invalidate_user(user_id)
+
+    def _write_batch(self, batch: List[Tuple[int, str]], metrics: Dict[str, Dict], now: datetime) -> int:
+        """Write one batch of metrics with a single executemany UPDATE"""
+        rows = []
+        for post_id, platform_post_id in batch:
+            post_metrics = metrics.get(platform_post_id)
+            if not post_metrics:
+                continue
+
+            row = {column: post_metrics[column] for column in METRIC_COLUMNS if column in post_metrics}
+            row['id'] = post_id
+            row['updated_at'] = now
+            rows.append(row)
+
+        if not rows:
+            return 0
+
+        try:
+            db.session.execute(update(SocialMediaPost), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to write analytics batch: {str(e)}")
+            return 0
+
+        return len(rows)
+
+def _due_for_refresh(now: datetime):
+    """SQL condition selecting posts whose refresh interval (by age tier) has elapsed"""
+    clauses = []
+    newest = now
+    for max_age, interval in REFRESH_SCHEDULE:
+        clauses.append(and_(
+            SocialMediaPost.published_time <= newest,
+            SocialMediaPost.published_time > now - max_age,
+            SocialMediaPost.updated_at <= now - interval
+        ))
+        newest = now - max_age
+    return or_(*clauses)
+
+def start_analytics_refresh(app, credentials_provider: Callable[[str, str], Optional[Dict]], interval_seconds: int = 300) -> PeriodicJob:
+    """Start a background job that refreshes due post metrics every interval_seconds
+
+    Every worker process starts the job, but a lease lets only one of them run it.
+    """
+    collector = AnalyticsCollector(credentials_provider)
+    lease = LeaderLease('analytics-refresh', timedelta(seconds=interval_seconds * 3))
+    return PeriodicJob('analytics-refresh', interval_seconds, collector.collect_due, app=app, lease=lease).start()
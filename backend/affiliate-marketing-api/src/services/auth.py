@@ -0,0 +1,203 @@
+"""
+Authentication Helpers for AffiliateFlow SaaS Platform
+Password hashing in a bounded process pool, per-client login concurrency
+limits, and a cache of verified JWTs.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Optional, Sequence
+
+import bcrypt
+import jwt
+
+from src.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor of new hashes; existing hashes keep the cost they were made with
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+
+# Hashing processes, one per core by default
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '0')) or os.cpu_count() or 1
+
+# Hashes that may wait for a free worker; further ones are turned away instead of queueing
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', str(PASSWORD_HASH_WORKERS * 4)))
+
+# Logins that may be checked at once from one client IP and for one account
+LOGIN_CONCURRENCY_PER_IP = int(os.getenv('LOGIN_CONCURRENCY_PER_IP', '4'))
+LOGIN_CONCURRENCY_PER_ACCOUNT = int(os.getenv('LOGIN_CONCURRENCY_PER_ACCOUNT', '2'))
+
+# Longest a verified token is trusted from memory; never past its own exp
+JWT_CACHE_TTL = 300
+
+class AuthBusy(Exception):
+    """Too many password checks in flight, for this client or overall; retry later"""
+
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+def _check_password(password: bytes, password_hash: bytes) -> bool:
+    return bcrypt.checkpw(password, password_hash)
+
+class PasswordHasher:
+    """bcrypt in a bounded pool of worker processes
+
+    Request threads only wait on the result, so hashing CPU never competes with
+    the web workers' interpreter. At most workers + queue_size hashes are in
+    flight, counting ones whose caller gave up waiting; past that, calls fail
+    fast with AuthBusy.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE,
+                 rounds: int = BCRYPT_ROUNDS, timeout: float = 30):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # The pool starts lazily, after the server's threads, so forking this
+                    # process is unsafe. A forkserver forks workers from a clean process
+                    # that preloads only this module and bcrypt, not the app's __main__
+                    # (workers still import that as __mp_main__, as with spawn).
+                    context = None
+                    if 'forkserver' in multiprocessing.get_all_start_methods():
+                        context = multiprocessing.get_context('forkserver')
+                        context.set_forkserver_preload([__name__, 'bcrypt'])
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._pool
+
+    def _release_slot(self, future: Future):
+        self._slots.release()
+
+    def _run(self, func: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            raise AuthBusy('Too many password checks in progress')
+        try:
+            future = self._executor().submit(func, *args)
+        except BaseException as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._reset_pool()
+            raise
+        # The slot is freed when the hash finishes, not when the caller stops waiting
+        future.add_done_callback(self._release_slot)
+
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            # Drop it if it has not started; a running hash keeps its slot until done
+            future.cancel()
+            raise
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise
+
+    def _reset_pool(self):
+        # A worker died; start a fresh pool for the next call
+        with self._pool_lock:
+            self._pool = None
+
+    def hash(self, password: str) -> str:
+        """bcrypt hash of a password at the configured cost factor"""
+        return self._run(_hash_password, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Whether a password matches a bcrypt hash"""
+        return self._run(_check_password, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+class ConcurrencyLimiter:
+    """Caps how many operations run at once per key, e.g. per client IP and per account"""
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, limits: Dict[Hashable, int]):
+        """Take a slot under every key, or raise AuthBusy without taking any"""
+        with self._lock:
+            for key, limit in limits.items():
+                if self._in_flight.get(key, 0) >= limit:
+                    raise AuthBusy(f"Too many concurrent attempts for {key[0] if isinstance(key, tuple) else key}")
+            for key in limits:
+                self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for key in limits:
+                    remaining = self._in_flight[key] - 1
+                    if remaining:
+                        self._in_flight[key] = remaining
+                    else:
+                        del self._in_flight[key]
+
+    def in_flight(self, key: Hashable) -> int:
+        return self._in_flight.get(key, 0)
+
+class TokenVerifier:
+    """Decodes JWTs, remembering verified payloads by token hash until they expire
+
+    Only successfully verified tokens are cached, so a forged or expired
+    token always goes through a full signature check.
+    """
+
+    def __init__(self, secret: str, algorithms: Sequence[str] = ('HS256',), ttl: float = JWT_CACHE_TTL,
+                 maxsize: int = 10000):
+        self.secret = secret
+        self.algorithms = list(algorithms)
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def decode(self, token: str) -> Dict:
+        """Verified claims of a token; raises jwt.InvalidTokenError like jwt.decode"""
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        payload = self._cache.get(key)
+        if payload is not None and payload.get('exp', now + 1) > now:
+            return dict(payload)
+
+        payload = jwt.decode(token, self.secret, algorithms=self.algorithms)
+        exp = payload.get('exp')
+        ttl = self.ttl if exp is None else min(self.ttl, exp - now)
+        if ttl > 0:
+            self._cache.set(key, dict(payload), ttl)
+        return payload
+
+    def invalidate(self, token: str = None):
+        """Forget one token, or every token when none is given"""
+        if token is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(hashlib.sha256(token.encode('utf-8')).digest())
+
+# Global instances; the hashing pool starts with the first hash
+password_hasher = PasswordHasher()
+login_limiter = ConcurrencyLimiter()
+
+def login_limits(email: str, client_ip: Optional[str] = None) -> Dict[Hashable, int]:
+    """Concurrency limits that apply to one login attempt"""
+    limits: Dict[Hashable, int] = {('account', (email or '').strip().lower()): LOGIN_CONCURRENCY_PER_ACCOUNT}
+    if client_ip:
+        limits[('ip', client_ip)] = LOGIN_CONCURRENCY_PER_IP
+    return limits
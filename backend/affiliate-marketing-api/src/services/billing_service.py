@@ -1,23 +1,54 @@
 import stripe
 import jwt
-import bcrypt
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, and_, cast, delete, func, inspect, literal, null, select, union_all, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, scoped_session, sessionmaker, relationship
 import uuid
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+import re
+import hashlib
+import hmac
+import threading
+import atexit
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 import smtplib
 import logging
 
+from flask import current_app
+
+from src.services.auth import AuthBusy, ConcurrencyLimiter, TokenVerifier, login_limiter, login_limits, password_hasher
+from src.services.cache import TTLCache
+from src.services.database import get_engine
+from src.services.jobs import PeriodicJob
+
 # Configure Stripe
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY', 'sk_test_...')
 
 Base = declarative_base()
 
+# Resources whose limits are reported alongside usage analytics
+ANALYTICS_RESOURCES = ['monthly_content', 'monthly_social_posts', 'monthly_emails', 'affiliate_links']
+
+# API keys are "ak_live_" + 32 hex chars; this many leading chars are stored in clear for lookup
+API_KEY_PREFIX_LENGTH = 16
+# Keys created before the prefix index only stored "ak_live_"
+LEGACY_API_KEY_PREFIX_LENGTH = 8
+# Only well-formed keys are checked against the unindexed legacy bcrypt hashes
+LEGACY_API_KEY_PATTERN = re.compile(r'ak_live_[0-9a-f]{32}')
+# Legacy bcrypt checks that may run at once in this process; further lookups are refused
+API_KEY_LEGACY_CONCURRENCY = int(os.getenv('API_KEY_LEGACY_CONCURRENCY', '2'))
+
+# Seconds a validated key is served from memory; a revoked key stops working at once in this process
+API_KEY_CACHE_TTL = 60
+# Seconds an unknown key is remembered as invalid, so retrying it costs no queries or bcrypt checks
+API_KEY_MISS_TTL = 60
+# Seconds between batched last_used writes
+API_KEY_LAST_USED_INTERVAL = 30
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -72,6 +103,16 @@ class UsageRecord(Base):
     # Relationships
     user = relationship("User", back_populates="usage_records")
 
+class UsageCounter(Base):
+    """Per-period usage totals, kept in step with UsageRecord so limit checks are one key lookup"""
+    __tablename__ = 'usage_counters'
+    
+    user_id = Column(String, ForeignKey('users.id'), primary_key=True)
+    resource_type = Column(String, primary_key=True)
+    billing_period = Column(String, primary_key=True)  # YYYY-MM format
+    quantity = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class ApiKey(Base):
     __tablename__ = 'api_keys'
     
@@ -79,7 +120,7 @@ class ApiKey(Base):
     user_id = Column(String, ForeignKey('users.id'), nullable=False)
     name = Column(String, nullable=False)
     key_hash = Column(String, nullable=False)
-    key_prefix = Column(String, nullable=False)  # First 8 chars for display
+    key_prefix = Column(String, nullable=False, index=True)  # First 16 chars, for lookup and display
     is_active = Column(Boolean, default=True)
     last_used = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -87,15 +128,125 @@ class ApiKey(Base):
     # Relationships
     user = relationship("User", back_populates="api_keys")
 
+class ApiKeyUsageTracker:
+    """Collects API key last_used times in memory and writes them in one batch per interval
+    
+    One instance serves every BillingService in the process; times are kept
+    per engine, so services on different databases share the flusher thread.
+    """
+    
+    def __init__(self, interval_seconds: float = API_KEY_LAST_USED_INTERVAL):
+        self._pending: Dict[Engine, Dict[str, datetime]] = {}
+        self._lock = threading.Lock()
+        self._job = PeriodicJob('api-key-last-used', interval_seconds, self.flush, run_on_start=False)
+        atexit.register(self.flush)
+    
+    def touch(self, engine: Engine, key_id: str, used_at: datetime = None):
+        """Note a key's use; the flusher thread starts with the first one"""
+        with self._lock:
+            self._pending.setdefault(engine, {})[key_id] = used_at or datetime.utcnow()
+        self._job.start()
+    
+    def flush(self) -> int:
+        """Write pending last_used times with one executemany UPDATE per engine; returns keys written"""
+        with self._lock:
+            pending_by_engine, self._pending = self._pending, {}
+        
+        written = 0
+        for engine, pending in pending_by_engine.items():
+            session = Session(bind=engine)
+            try:
+                session.execute(
+                    update(ApiKey),
+                    [{'id': key_id, 'last_used': used_at} for key_id, used_at in pending.items()]
+                )
+                session.commit()
+                written += len(pending)
+            except Exception as e:
+                session.rollback()
+                # Keep the times for the next flush, unless the key was used again since
+                with self._lock:
+                    retry = self._pending.setdefault(engine, {})
+                    for key_id, used_at in pending.items():
+                        retry.setdefault(key_id, used_at)
+                logging.error(f"Error writing API key last_used times: {e}")
+            finally:
+                session.close()
+        return written
+
+# Process-wide last_used tracker and legacy key check limiter, shared by all BillingService instances
+api_key_usage = ApiKeyUsageTracker()
+legacy_api_key_limiter = ConcurrencyLimiter()
+
+_prepared_engines = set()
+_prepare_lock = threading.Lock()
+
+def _usage_counter_rebuild(billing_period: str = None):
+    """Statements that replace the usage counters with totals of the usage records"""
+    clear = delete(UsageCounter)
+    totals = select(
+        UsageRecord.user_id,
+        UsageRecord.resource_type,
+        UsageRecord.billing_period,
+        func.sum(func.coalesce(UsageRecord.quantity, 1)),
+        func.max(UsageRecord.created_at)
+    ).where(UsageRecord.billing_period.isnot(None))
+    if billing_period:
+        clear = clear.where(UsageCounter.billing_period == billing_period)
+        totals = totals.where(UsageRecord.billing_period == billing_period)
+    totals = totals.group_by(UsageRecord.user_id, UsageRecord.resource_type, UsageRecord.billing_period)
+    fill = UsageCounter.__table__.insert().from_select(
+        ['user_id', 'resource_type', 'billing_period', 'quantity', 'updated_at'],
+        totals
+    )
+    return clear, fill
+
+def _prepare_schema(engine: Engine):
+    """Create the billing tables and indexes once per engine
+    
+    When the usage counters table is new, it is filled from the existing usage
+    records before anything reads it, so limits keep counting this period's usage.
+    """
+    with _prepare_lock:
+        if engine in _prepared_engines:
+            return
+        counters_exist = inspect(engine).has_table(UsageCounter.__tablename__)
+        Base.metadata.create_all(engine)
+        # create_all() skips existing tables, so add indexes declared since they were created
+        for index in ApiKey.__table__.indexes:
+            index.create(engine, checkfirst=True)
+        if not counters_exist:
+            with engine.begin() as connection:
+                for statement in _usage_counter_rebuild():
+                    result = connection.execute(statement)
+            logging.info(f"Backfilled {result.rowcount} usage counters from usage records")
+        _prepared_engines.add(engine)
+
 class BillingService:
-    """Comprehensive billing and subscription management service"""
+    """Comprehensive billing and subscription management service
+    
+    self.session is a scoped session: each thread, and so each request under
+    a threaded server, gets its own. Call init_app() to close it when the
+    request ends.
+    """
     
-    def __init__(self, database_url: str = None):
+    def __init__(self, database_url: str = None, engine: Engine = None):
         self.database_url = database_url or os.getenv('DATABASE_URL', 'sqlite:///affiliate_saas.db')
-        self.engine = create_engine(self.database_url)
-        Base.metadata.create_all(self.engine)
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        # Share the process-wide engine (and its connection pool) unless one is given, e.g. the app's db.engine
+        self.engine = engine or get_engine(self.database_url)
+        _prepare_schema(self.engine)
+        self.session = scoped_session(sessionmaker(bind=self.engine))
+        
+        # API keys are stored as HMAC-SHA256 digests keyed with a server-side pepper
+        self.api_key_pepper = os.getenv('API_KEY_PEPPER', 'your-api-key-pepper').encode('utf-8')
+        # Accept bcrypt-hashed keys from before the prefix index (and rehash them on first use).
+        # Only for the migration window after upgrading; see .env.example
+        self.allow_legacy_api_keys = os.getenv('API_KEY_ALLOW_LEGACY', 'False').lower() == 'true'
+        self._api_key_cache = TTLCache(maxsize=10000, ttl=API_KEY_CACHE_TTL)
+        self._api_key_misses = TTLCache(maxsize=10000, ttl=API_KEY_MISS_TTL)
+        
+        self.jwt_secret = os.getenv('JWT_SECRET', 'your-secret-key')
+        self.token_verifier = TokenVerifier(self.jwt_secret)
         
         # Plan configurations
         self.plans = {
@@ -178,6 +329,12 @@ class BillingService:
             }
         }
     
+    def init_app(self, app):
+        """Remove the request's session when each Flask app context ends"""
+        @app.teardown_appcontext
+        def remove_billing_session(exception=None):
+            self.session.remove()
+    
     def create_user(self, email: str, password: str, name: str) -> Dict:
         """Create a new user account"""
         try:
@@ -187,7 +344,7 @@ class BillingService:
                 raise ValueError("User with this email already exists")
             
             # Hash password
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            password_hash = password_hasher.hash(password)
             
             # Create Stripe customer
             stripe_customer = stripe.Customer.create(
@@ -235,28 +392,40 @@ class BillingService:
             self.session.rollback()
             raise e
     
-    def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
-        """Authenticate user login"""
-        user = self.session.query(User).filter_by(email=email, is_active=True).first()
+    def authenticate_user(self, email: str, password: str, client_ip: str = None) -> Optional[Dict]:
+        """Authenticate user login
         
-        if user and bcrypt.checkpw(password.encode('utf-8'), user.password_hash.encode('utf-8')):
-            # Generate JWT token
-            token = jwt.encode({
-                'user_id': user.id,
-                'email': user.email,
-                'exp': datetime.utcnow() + timedelta(days=7)
-            }, os.getenv('JWT_SECRET', 'your-secret-key'), algorithm='HS256')
+        Raises AuthBusy when too many logins are already being checked for the
+        account or client IP, or the password hashing pool is saturated.
+        """
+        with login_limiter.hold(login_limits(email, client_ip)):
+            user = self.session.query(User).filter_by(email=email, is_active=True).first()
             
-            return {
-                'user_id': user.id,
-                'email': user.email,
-                'name': user.name,
-                'token': token,
-                'subscription': self._get_user_subscription_info(user.id)
-            }
+            if user and password_hasher.verify(password, user.password_hash):
+                # Generate JWT token
+                token = jwt.encode({
+                    'user_id': user.id,
+                    'email': user.email,
+                    'exp': datetime.utcnow() + timedelta(days=7)
+                }, self.jwt_secret, algorithm='HS256')
+                
+                return {
+                    'user_id': user.id,
+                    'email': user.email,
+                    'name': user.name,
+                    'token': token,
+                    'subscription': self._get_user_subscription_info(user.id)
+                }
         
         return None
     
+    def verify_token(self, token: str) -> Optional[Dict]:
+        """Claims of a valid JWT, or None; verified tokens are cached until they expire"""
+        try:
+            return self.token_verifier.decode(token)
+        except jwt.InvalidTokenError:
+            return None
+    
     def create_subscription(self, user_id: str, plan_id: str, payment_method_id: str = None) -> Dict:
         """Create or upgrade a subscription"""
         try:
@@ -357,25 +526,36 @@ class BillingService:
             self.session.rollback()
             raise e
     
+    def _usage_limit_column(self, resource_type: str):
+        """Subscription column holding the limit of a resource type, or a constant 0 if there is none"""
+        column = getattr(Subscription, f"{resource_type}_limit", None)
+        return column if column is not None else literal(0)
+    
+    def _counter_key(self, user_id: str, resource_type: str, billing_period: str):
+        return and_(
+            UsageCounter.user_id == user_id,
+            UsageCounter.resource_type == resource_type,
+            UsageCounter.billing_period == billing_period
+        )
+    
     def check_usage_limits(self, user_id: str, resource_type: str) -> Dict:
         """Check if user has exceeded usage limits"""
-        subscription = self.session.query(Subscription).filter_by(user_id=user_id).first()
-        if not subscription:
-            return {'allowed': False, 'reason': 'No subscription found'}
-        
         # Get current billing period
         current_period = datetime.utcnow().strftime('%Y-%m')
         
-        # Get usage for current period
-        usage_count = self.session.query(UsageRecord).filter_by(
-            user_id=user_id,
-            resource_type=resource_type,
-            billing_period=current_period
-        ).count()
+        # Limit and usage so far in one query: the counter is a primary key lookup
+        row = self.session.query(
+            self._usage_limit_column(resource_type),
+            func.coalesce(UsageCounter.quantity, 0)
+        ).select_from(Subscription).outerjoin(
+            UsageCounter, self._counter_key(user_id, resource_type, current_period)
+        ).filter(Subscription.user_id == user_id).first()
+        
+        if row is None:
+            return {'allowed': False, 'reason': 'No subscription found'}
         
-        # Get limit for resource type
-        limit_attr = f"{resource_type}_limit"
-        limit = getattr(subscription, limit_attr, 0)
+        limit, usage_count = row
+        limit = limit or 0
         
         # -1 means unlimited
         if limit == -1:
@@ -390,15 +570,26 @@ class BillingService:
         }
     
     def record_usage(self, user_id: str, resource_type: str, quantity: int = 1) -> bool:
-        """Record usage for billing purposes"""
+        """Record usage for billing purposes
+        
+        The period counter is checked and incremented by a single conditional
+        upsert, so concurrent calls cannot push usage past the limit.
+        """
         try:
-            # Check limits first
-            limit_check = self.check_usage_limits(user_id, resource_type)
-            if not limit_check['allowed']:
+            limit = self.session.query(self._usage_limit_column(resource_type)).filter(
+                Subscription.user_id == user_id
+            ).scalar()
+            if limit is None:
                 return False
             
-            # Record usage
+            # Count usage against the limit and log it in the same transaction
             current_period = datetime.utcnow().strftime('%Y-%m')
+            if limit != -1 and quantity > limit:
+                return False
+            if not self._increment_usage_counter(user_id, resource_type, current_period, quantity, limit):
+                self.session.rollback()
+                return False
+            
             usage_record = UsageRecord(
                 user_id=user_id,
                 resource_type=resource_type,
@@ -415,46 +606,158 @@ class BillingService:
             logging.error(f"Error recording usage: {e}")
             return False
     
+    def _increment_usage_counter(self, user_id: str, resource_type: str, billing_period: str,
+                                 quantity: int, limit: int) -> bool:
+        """Add quantity to a period counter unless it would go over limit; returns whether it did"""
+        now = datetime.utcnow()
+        new_quantity = UsageCounter.quantity + quantity
+        within_limit = new_quantity <= limit if limit != -1 else None
+        
+        dialect = self.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            
+            statement = insert(UsageCounter).values(
+                user_id=user_id,
+                resource_type=resource_type,
+                billing_period=billing_period,
+                quantity=quantity,
+                updated_at=now
+            ).on_conflict_do_update(
+                index_elements=[UsageCounter.user_id, UsageCounter.resource_type, UsageCounter.billing_period],
+                set_={'quantity': new_quantity, 'updated_at': now},
+                where=within_limit
+            ).returning(UsageCounter.quantity)
+            return self.session.execute(statement).first() is not None
+        
+        # Other databases: conditional UPDATE, then INSERT for the period's first usage
+        key = self._counter_key(user_id, resource_type, billing_period)
+        statement = update(UsageCounter).where(key).values(quantity=new_quantity, updated_at=now)
+        if within_limit is not None:
+            statement = statement.where(within_limit)
+        if self.session.execute(statement.execution_options(synchronize_session=False)).rowcount:
+            return True
+        if self.session.query(UsageCounter.quantity).filter(key).first() is not None:
+            return False
+        self.session.add(UsageCounter(
+            user_id=user_id,
+            resource_type=resource_type,
+            billing_period=billing_period,
+            quantity=quantity,
+            updated_at=now
+        ))
+        self.session.flush()
+        return True
+    
+    def backfill_usage_counters(self, billing_period: str = None) -> int:
+        """Rebuild usage counters from the raw usage records, for one period or all of them
+        
+        Runs automatically when the counters table is created; call it again to
+        repair counters that drifted from the records. Returns the number of
+        counters written.
+        """
+        try:
+            clear, fill = _usage_counter_rebuild(billing_period)
+            self.session.execute(clear)
+            result = self.session.execute(fill)
+            self.session.commit()
+            return result.rowcount
+            
+        except Exception as e:
+            self.session.rollback()
+            logging.error(f"Error backfilling usage counters: {e}")
+            raise e
+    
     def get_usage_analytics(self, user_id: str, period: str = None) -> Dict:
         """Get usage analytics for a user"""
         if not period:
             period = datetime.utcnow().strftime('%Y-%m')
         
-        usage_records = self.session.query(UsageRecord).filter_by(
-            user_id=user_id,
-            billing_period=period
-        ).all()
+        usage_by_period, limits, plan_id = self._usage_with_limits(user_id, [period])
         
-        # Aggregate usage by resource type
-        usage_summary = {}
-        for record in usage_records:
-            resource_type = record.resource_type
-            if resource_type not in usage_summary:
-                usage_summary[resource_type] = 0
-            usage_summary[resource_type] += record.quantity
+        return {
+            'period': period,
+            'usage': usage_by_period.get(period, {}),
+            'limits': limits,
+            'subscription_plan': plan_id
+        }
+    
+    def get_usage_history(self, user_id: str, months: int = 12) -> Dict:
+        """Get usage per billing period for the last months periods, oldest first"""
+        year, month = datetime.utcnow().year, datetime.utcnow().month
+        periods = []
+        for offset in range(months - 1, -1, -1):
+            index = year * 12 + month - 1 - offset
+            periods.append(f"{index // 12:04d}-{index % 12 + 1:02d}")
         
-        # Get subscription limits
-        subscription = self.session.query(Subscription).filter_by(user_id=user_id).first()
-        limits = {}
-        if subscription:
-            for resource_type in ['monthly_content', 'monthly_social_posts', 'monthly_emails', 'affiliate_links']:
-                limit_attr = f"{resource_type}_limit"
-                limits[resource_type] = getattr(subscription, limit_attr, 0)
+        usage_by_period, limits, plan_id = self._usage_with_limits(user_id, periods)
         
         return {
-            'period': period,
-            'usage': usage_summary,
+            'periods': [
+                {'period': period, 'usage': usage_by_period.get(period, {})}
+                for period in periods
+            ],
             'limits': limits,
-            'subscription_plan': subscription.plan_id if subscription else 'free'
+            'subscription_plan': plan_id
         }
     
+    def _usage_with_limits(self, user_id: str, periods: List[str]) -> Tuple[Dict[str, Dict[str, int]], Dict, str]:
+        """Usage totals by period and resource type, plus the subscription limits and plan
+        
+        Both come back from one UNION ALL query: the grouped usage sums, and a
+        single row for the subscription.
+        """
+        limit_columns = [getattr(Subscription, f"{resource_type}_limit") for resource_type in ANALYTICS_RESOURCES]
+        
+        usage = select(
+            literal('usage').label('row_type'),
+            UsageRecord.billing_period,
+            UsageRecord.resource_type,
+            func.sum(func.coalesce(UsageRecord.quantity, 1)).label('quantity'),
+            cast(null(), String).label('plan_id'),
+            *[cast(null(), Integer).label(column.key) for column in limit_columns]
+        ).where(
+            UsageRecord.user_id == user_id,
+            UsageRecord.billing_period.in_(periods)
+        ).group_by(UsageRecord.billing_period, UsageRecord.resource_type)
+        
+        plan = select(
+            literal('plan').label('row_type'),
+            cast(null(), String),
+            cast(null(), String),
+            cast(null(), Integer),
+            Subscription.plan_id,
+            *limit_columns
+        ).where(Subscription.user_id == user_id)
+        
+        usage_by_period = {}
+        subscription = None
+        for row in self.session.execute(union_all(usage, plan)):
+            if row.row_type == 'plan':
+                subscription = subscription or row
+            else:
+                usage_by_period.setdefault(row.billing_period, {})[row.resource_type] = int(row.quantity)
+        
+        limits = {}
+        if subscription:
+            for resource_type, column in zip(ANALYTICS_RESOURCES, limit_columns):
+                limits[resource_type] = subscription._mapping[column.key]
+        
+        return usage_by_period, limits, subscription.plan_id if subscription else 'free'
+    
+    def _hash_api_key(self, api_key: str) -> str:
+        return hmac.new(self.api_key_pepper, api_key.encode('utf-8'), hashlib.sha256).hexdigest()
+    
     def create_api_key(self, user_id: str, name: str) -> Dict:
         """Create a new API key for a user"""
         try:
             # Generate API key
             api_key = f"ak_live_{uuid.uuid4().hex}"
-            key_hash = bcrypt.hashpw(api_key.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            key_prefix = api_key[:8]
+            key_hash = self._hash_api_key(api_key)
+            key_prefix = api_key[:API_KEY_PREFIX_LENGTH]
             
             # Store API key
             api_key_record = ApiKey(
@@ -479,18 +782,92 @@ class BillingService:
             raise e
     
     def validate_api_key(self, api_key: str) -> Optional[str]:
-        """Validate an API key and return user_id if valid"""
-        api_key_records = self.session.query(ApiKey).filter_by(is_active=True).all()
+        """Validate an API key and return user_id if valid
+        
+        The key is looked up by its indexed prefix and checked with one
+        constant-time HMAC comparison. Legacy bcrypt keys are rehashed the
+        first time they validate. Unknown keys are remembered briefly, so
+        retrying one does not repeat the lookup.
+        """
+        if not api_key:
+            return None
+        
+        key_hash = self._hash_api_key(api_key)
+        cached = self._api_key_cache.get(key_hash)
+        if cached is not None:
+            key_id, user_id = cached
+            api_key_usage.touch(self.engine, key_id)
+            return user_id
+        if self._api_key_misses.get(key_hash):
+            return None
+        
+        api_key_records = self.session.query(ApiKey).filter_by(
+            key_prefix=api_key[:API_KEY_PREFIX_LENGTH],
+            is_active=True
+        ).all()
         
         for record in api_key_records:
-            if bcrypt.checkpw(api_key.encode('utf-8'), record.key_hash.encode('utf-8')):
-                # Update last used timestamp
-                record.last_used = datetime.utcnow()
-                self.session.commit()
-                return record.user_id
+            if hmac.compare_digest(record.key_hash, key_hash):
+                return self._accept_api_key(record, key_hash)
+        
+        if self.allow_legacy_api_keys and LEGACY_API_KEY_PATTERN.fullmatch(api_key):
+            try:
+                with legacy_api_key_limiter.hold({'legacy-api-key': API_KEY_LEGACY_CONCURRENCY}):
+                    user_id = self._validate_legacy_api_key(api_key, key_hash)
+            except AuthBusy:
+                # Not a verdict on the key, so it is not remembered as a miss
+                logging.warning("Legacy API key check refused: too many in progress")
+                return None
+            if user_id is not None:
+                return user_id
         
+        self._api_key_misses.set(key_hash, True)
         return None
     
+    def _validate_legacy_api_key(self, api_key: str, key_hash: str) -> Optional[str]:
+        """Check a key against the bcrypt hashes left from before the prefix index, migrating a match"""
+        legacy_records = self.session.query(ApiKey).filter(
+            ApiKey.key_prefix == api_key[:LEGACY_API_KEY_PREFIX_LENGTH],
+            ApiKey.key_hash.like('$2%'),
+            ApiKey.is_active == True
+        ).all()
+        
+        for record in legacy_records:
+            # In the hashing pool, which also bounds the bcrypt work across all callers
+            if password_hasher.verify(api_key, record.key_hash):
+                try:
+                    record.key_hash = key_hash
+                    record.key_prefix = api_key[:API_KEY_PREFIX_LENGTH]
+                    self.session.commit()
+                except Exception as e:
+                    self.session.rollback()
+                    logging.error(f"Error migrating legacy API key {record.id}: {e}")
+                return self._accept_api_key(record, key_hash)
+        
+        return None
+    
+    def _accept_api_key(self, record: ApiKey, key_hash: str) -> str:
+        self._api_key_cache.set(key_hash, (record.id, record.user_id))
+        api_key_usage.touch(self.engine, record.id)
+        return record.user_id
+    
+    def revoke_api_key(self, user_id: str, key_id: str) -> bool:
+        """Deactivate one of a user's API keys"""
+        try:
+            record = self.session.query(ApiKey).filter_by(id=key_id, user_id=user_id).first()
+            if not record:
+                return False
+            
+            record.is_active = False
+            self.session.commit()
+            self._api_key_cache.pop(record.key_hash)
+            return True
+            
+        except Exception as e:
+            self.session.rollback()
+            logging.error(f"Error revoking API key: {e}")
+            return False
+    
     def process_webhook(self, event_type: str, event_data: Dict) -> bool:
         """Process Stripe webhook events"""
         try:
@@ -623,17 +1000,19 @@ class UserManagementService:
                 return False
             
             # Verify current password
-            if not bcrypt.checkpw(current_password.encode('utf-8'), user.password_hash.encode('utf-8')):
+            if not password_hasher.verify(current_password, user.password_hash):
                 return False
             
             # Hash new password
-            new_password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            new_password_hash = password_hasher.hash(new_password)
             user.password_hash = new_password_hash
             user.updated_at = datetime.utcnow()
             
             self.session.commit()
             return True
             
+        except AuthBusy:
+            raise
         except Exception as e:
             self.session.rollback()
             return False
@@ -689,3 +1068,29 @@ class UserManagementService:
             'account_status': 'active' if user.is_active else 'inactive'
         }
 
+_app_services_lock = threading.Lock()
+
+def init_billing(app):
+    """Remove the app's billing session at the end of each app context
+
+    Building the service (and preparing its tables) is left to the first
+    get_billing_service() call, so starting the app does neither.
+    """
+    app.extensions.setdefault('billing_service', None)
+    
+    @app.teardown_appcontext
+    def remove_billing_session(exception=None):
+        service = app.extensions.get('billing_service')
+        if service is not None:
+            service.session.remove()
+
+def get_billing_service() -> BillingService:
+    """The current app's BillingService, created on first use on the app's engine and connection pool"""
+    app = current_app._get_current_object()
+    service = app.extensions.get('billing_service')
+    if service is None:
+        with _app_services_lock:
+            service = app.extensions.get('billing_service')
+            if service is None:
+                service = app.extensions['billing_service'] = BillingService(engine=app.extensions['sqlalchemy'].engine)
+    return service
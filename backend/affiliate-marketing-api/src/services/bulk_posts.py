@@ -0,0 +1,109 @@
+"""
+Bulk Post Creation for AffiliateFlow SaaS Platform
+Inserts many social media posts and their usage charge in a single transaction.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from src.models.content import db, SocialMediaPost
+from src.services.post_analytics import METRIC_COLUMNS
+from src.services.usage import UNLIMITED, UsageLimitExceeded, reserve_statement
+
+# Posts a single bulk request may create
+MAX_BULK_POSTS = 1000
+
+class PostBatch:
+    """Rows for a bulk insert, JSON-encoded once per distinct hashtag/media list"""
+
+    def __init__(self, user_id: str, now: datetime = None):
+        self.user_id = user_id
+        self.now = now or datetime.utcnow()
+        self.rows: List[Dict] = []
+        self.remaining: Optional[int] = None
+        self._encoded: Dict[tuple, str] = {}
+        self._decoded: Dict[str, List[str]] = {}
+
+    def _encode(self, values: List[str]) -> str:
+        key = tuple(values)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = self._encoded[key] = json.dumps(values)
+            self._decoded[encoded] = list(values)
+        return encoded
+
+    def add(self, platform: str, content: str, hashtags: List[str], media_urls: List[str],
+            content_id: Optional[int] = None, scheduled_time: Optional[datetime] = None):
+        self.rows.append({
+            'user_id': self.user_id,
+            'content_id': content_id,
+            'platform': platform,
+            'content': content,
+            'hashtags': self._encode(hashtags),
+            'media_urls': self._encode(media_urls),
+            'scheduled_time': scheduled_time,
+            'status': 'scheduled' if scheduled_time else 'draft',
+            'created_at': self.now,
+            'updated_at': self.now
+        })
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def insert(self) -> List[int]:
+        """Charge the posts to the user's usage and insert every row with one multi-row
+        INSERT ... RETURNING, in a single transaction; returns the new IDs in row order
+
+        Raises UsageLimitExceeded, inserting nothing, if the posts do not fit in
+        the tier limit. Afterwards, remaining holds the posts left this period.
+        """
+        if not self.rows:
+            return []
+
+        try:
+            usage = db.session.execute(reserve_statement(self.user_id, 'social_posts', len(self.rows))).first()
+            if usage is None:
+                raise UsageLimitExceeded('Social media posting limit reached for your subscription tier')
+            post_ids = db.session.execute(
+                insert(SocialMediaPost).returning(SocialMediaPost.id, sort_by_parameter_order=True),
+                self.rows
+            ).scalars().all()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        used, limit = usage
+        self.remaining = UNLIMITED if limit == UNLIMITED else limit - used
+        return post_ids
+
+    def serialize(self, post_ids: List[int]) -> List[Dict]:
+        """Response dicts built from the inserted rows, without loading them back
+
+        Same keys as SocialMediaPost.to_dict(); columns a new post does not set
+        yet get their column defaults.
+        """
+        decoded = self._decoded
+        return [
+            {
+                'id': post_id,
+                'user_id': row['user_id'],
+                'content_id': row['content_id'],
+                'platform': row['platform'],
+                'content': row['content'],
+                'hashtags': decoded[row['hashtags']],
+                'media_urls': decoded[row['media_urls']],
+                'scheduled_time': row['scheduled_time'].isoformat() if row['scheduled_time'] else None,
+                'published_time': None,
+                'status': row['status'],
+                'platform_post_id': None,
+                'platform_url': None,
+                **{column: 0 for column in METRIC_COLUMNS},
+                'created_at': row['created_at'].isoformat(),
+                'updated_at': row['updated_at'].isoformat()
+            }
+            for post_id, row in zip(post_ids, self.rows)
+        ]
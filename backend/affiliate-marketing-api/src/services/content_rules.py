@@ -0,0 +1,108 @@
+"""
+Content Rewrite Rules for AffiliateFlow SaaS Platform
+Per-platform word/phrase rewrite rules, compiled once and applied in a single pass.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# Casual -> platform-appropriate wording, per platform
+PLATFORM_TONE_RULES: Dict[str, Dict[str, str]] = {
+    'linkedin': {
+        'awesome': 'excellent',
+        'cool': 'impressive',
+        'guys': 'everyone',
+        'hey': 'hello'
+    }
+}
+
+_BREAK = re.compile(r'\s')
+
+def _match_case(source: str, replacement: str) -> str:
+    """Give the replacement the capitalization style of the matched text"""
+    if source.isupper() and len(source) > 1:
+        return replacement.upper()
+    if source[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+class RewriteRules:
+    """A set of whole-word, case-insensitive replacements applied in one pass
+
+    All rule words are compiled into one alternation regex, so a text is
+    scanned once however many rules there are; each match's replacement
+    comes from a lookup keyed by the matched spelling.
+    """
+
+    def __init__(self, replacements: Dict[str, str]):
+        self.replacements = {source.lower(): target for source, target in replacements.items()}
+        self.longest_source = max(map(len, self.replacements), default=0)
+        self.never_shortens = all(len(target) >= len(source) for source, target in self.replacements.items())
+        # Exact-case lookups for the common spellings, so most matches skip _match_case
+        self._variants = {}
+        for source, target in self.replacements.items():
+            self._variants[source] = target
+            self._variants[source[:1].upper() + source[1:]] = target[:1].upper() + target[1:]
+            self._variants[source.upper()] = target.upper()
+        # Longest first so phrases win over words they start with
+        alternatives = sorted(self.replacements, key=len, reverse=True)
+        self._pattern = re.compile(
+            r'\b(?:' + '|'.join(re.escape(source) for source in alternatives) + r')\b',
+            re.IGNORECASE
+        ) if alternatives else None
+
+    def _replace(self, match: re.Match) -> str:
+        source = match.group(0)
+        target = self._variants.get(source)
+        if target is None:
+            target = _match_case(source, self.replacements[source.lower()])
+        return target
+
+    def apply(self, text: str) -> str:
+        """Rewrite every whole-word match, leaving substrings of other words alone"""
+        if self._pattern is None or not text:
+            return text
+        return self._pattern.sub(self._replace, text)
+
+    def apply_within(self, text: str, limit: int) -> str:
+        """Rewrite only as much of text as can survive being cut to limit characters
+
+        The result is apply(text), or a longer-than-limit rewrite of a prefix
+        that agrees with apply(text) on its first limit characters. Skipping
+        the tail is only safe when no rule shortens the text; otherwise the
+        whole text is rewritten.
+        """
+        horizon = limit + self.longest_source
+        if self.never_shortens and len(text) > horizon:
+            boundary = _BREAK.search(text, horizon)
+            if boundary:
+                return self.apply(text[:boundary.start()])
+        return self.apply(text)
+
+    def apply_batch(self, texts: Iterable[str]) -> List[str]:
+        return [self.apply(text) for text in texts]
+
+_rules: Dict[str, RewriteRules] = {platform: RewriteRules(rules) for platform, rules in PLATFORM_TONE_RULES.items()}
+_rules_lock = threading.Lock()
+
+def register_tone_rules(platform: str, replacements: Dict[str, str], extend: bool = True):
+    """Add (or replace, with extend=False) a platform's rewrite rules and recompile them"""
+    with _rules_lock:
+        merged = dict(_rules[platform].replacements) if extend and platform in _rules else {}
+        merged.update(replacements)
+        _rules[platform] = RewriteRules(merged)
+
+def get_tone_rules(platform: str) -> Optional[RewriteRules]:
+    return _rules.get(platform)
+
+def apply_tone(platform: str, text: str, limit: Optional[int] = None) -> str:
+    """Apply a platform's tone rules; text is returned unchanged for platforms without rules
+
+    With limit, only the part of the text that can survive a cut to limit
+    characters is guaranteed to be rewritten (see RewriteRules.apply_within).
+    """
+    rules = _rules.get(platform)
+    if rules is None:
+        return text
+    return rules.apply(text) if limit is None else rules.apply_within(text, limit)
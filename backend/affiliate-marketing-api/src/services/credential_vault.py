@@ -0,0 +1,235 @@
+"""
+Platform Credential Vault for AffiliateFlow SaaS Platform
+Stores social platform credentials encrypted at rest, serves them from a
+decrypted in-memory cache, and refreshes expiring OAuth tokens in the background.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import requests
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+
+from src.models.content import db
+from src.services.cache import TTLCache
+from src.services.jobs import PeriodicJob
+from src.services.leases import LeaderLease
+
+logger = logging.getLogger(__name__)
+
+# Refresh tokens this long before they expire, so no publish waits on a refresh
+REFRESH_AHEAD = {
+    'facebook': timedelta(days=7),
+    'linkedin': timedelta(days=7)
+}
+
+class PlatformCredential(db.Model):
+    """One user's credentials for one platform, encrypted with Fernet"""
+    __tablename__ = 'platform_credentials'
+    __table_args__ = (db.UniqueConstraint('user_id', 'platform', name='uq_platform_credentials_user_platform'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(255), nullable=False, index=True)
+    platform = db.Column(db.String(50), nullable=False)
+    encrypted_credentials = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.DateTime, index=True)  # access token expiry, if the platform has one
+    last_refreshed_at = db.Column(db.DateTime)
+    refresh_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self) -> Dict:
+        """Connection metadata only; credentials are never serialized"""
+        return {
+            'platform': self.platform,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'last_refreshed_at': self.last_refreshed_at.isoformat() if self.last_refreshed_at else None,
+            'refresh_error': self.refresh_error,
+            'connected_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+def _refresh_facebook(credentials: Dict) -> Dict:
+    """Exchange the long-lived Facebook token for a fresh one"""
+    response = requests.get(
+        'https://graph.facebook.com/v18.0/oauth/access_token',
+        params={
+            'grant_type': 'fb_exchange_token',
+            'client_id': os.getenv('FACEBOOK_APP_ID'),
+            'client_secret': os.getenv('FACEBOOK_APP_SECRET'),
+            'fb_exchange_token': credentials['access_token']
+        },
+        timeout=30
+    )
+    if response.status_code != 200:
+        raise Exception(f"Facebook token refresh error: {response.text}")
+    return response.json()
+
+def _refresh_linkedin(credentials: Dict) -> Dict:
+    """Use the LinkedIn refresh token to obtain a new access token"""
+    if not credentials.get('refresh_token'):
+        raise ValueError("LinkedIn credentials have no refresh token")
+
+    response = requests.post(
+        'https://www.linkedin.com/oauth/v2/accessToken',
+        data={
+            'grant_type': 'refresh_token',
+            'refresh_token': credentials['refresh_token'],
+            'client_id': os.getenv('LINKEDIN_CLIENT_ID'),
+            'client_secret': os.getenv('LINKEDIN_CLIENT_SECRET')
+        },
+        timeout=30
+    )
+    if response.status_code != 200:
+        raise Exception(f"LinkedIn token refresh error: {response.text}")
+    return response.json()
+
+# Platform -> function returning the OAuth token response ({'access_token', 'expires_in', ...})
+TOKEN_REFRESHERS: Dict[str, Callable[[Dict], Dict]] = {
+    'facebook': _refresh_facebook,
+    'linkedin': _refresh_linkedin
+}
+
+class CredentialVault:
+    """Encrypted per-user platform credential store with a decrypted TTL cache"""
+
+    def __init__(self, keys: str = None, cache_size: int = 10000, cache_ttl: float = 300):
+        # Comma-separated Fernet keys; the first encrypts, all decrypt (key rotation)
+        self._keys = keys
+        self._fernet: Optional[MultiFernet] = None
+        self._fernet_lock = threading.Lock()
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def get(self, user_id: str, platform: str) -> Optional[Dict]:
+        """Decrypted credentials of a user's platform account, or None if not connected"""
+        key = (user_id, platform)
+        credentials = self._cache.get(key)
+        if credentials is None:
+            record = PlatformCredential.query.filter_by(user_id=user_id, platform=platform).first()
+            if record is None:
+                # Misses are not cached: an account connected through another process must work at once
+                return None
+            credentials = self._decrypt(record.encrypted_credentials)
+            self._cache.set(key, credentials)
+        return dict(credentials)
+
+    def get_all(self, user_id: str, platforms: List[str]) -> Dict[str, Dict]:
+        """Credentials for each of the given platforms that the user has connected"""
+        results = {}
+        for platform in platforms:
+            credentials = self.get(user_id, platform)
+            if credentials is not None:
+                results[platform] = credentials
+        return results
+
+    def save(self, user_id: str, platform: str, credentials: Dict, expires_at: datetime = None) -> PlatformCredential:
+        """Encrypt and store (or replace) a user's platform credentials"""
+        record = PlatformCredential.query.filter_by(user_id=user_id, platform=platform).first()
+        if record is None:
+            record = PlatformCredential(user_id=user_id, platform=platform)
+            db.session.add(record)
+
+        record.encrypted_credentials = self._encrypt(credentials)
+        record.expires_at = expires_at
+        record.refresh_error = None
+        db.session.commit()
+
+        self._cache.set((user_id, platform), dict(credentials))
+        return record
+
+    def delete(self, user_id: str, platform: str) -> bool:
+        deleted = PlatformCredential.query.filter_by(user_id=user_id, platform=platform).delete()
+        db.session.commit()
+        self._cache.pop((user_id, platform))
+        return bool(deleted)
+
+    def connected_accounts(self, user_id: str) -> List[Dict]:
+        return [record.to_dict() for record in PlatformCredential.query.filter_by(user_id=user_id).all()]
+
+    def refresh_expiring(self, now: datetime = None) -> Dict:
+        """Refresh every OAuth token that expires within its platform's REFRESH_AHEAD window"""
+        now = now or datetime.utcnow()
+        stats = {'refreshed': 0, 'failed': 0}
+
+        for platform, ahead in REFRESH_AHEAD.items():
+            refresher = TOKEN_REFRESHERS.get(platform)
+            if refresher is None:
+                continue
+
+            records = PlatformCredential.query.filter(
+                PlatformCredential.platform == platform,
+                PlatformCredential.expires_at.isnot(None),
+                PlatformCredential.expires_at <= now + ahead
+            ).all()
+
+            for record in records:
+                if self._refresh_record(record, refresher, now):
+                    stats['refreshed'] += 1
+                else:
+                    stats['failed'] += 1
+
+        if stats['refreshed'] or stats['failed']:
+            logger.info(f"Credential refresh: {stats['refreshed']} refreshed, {stats['failed']} failed")
+        return stats
+
+    def _refresh_record(self, record: PlatformCredential, refresher: Callable[[Dict], Dict], now: datetime) -> bool:
+        # One unreadable record (e.g. encrypted under a key since removed) must not stop the others
+        try:
+            credentials = self._decrypt(record.encrypted_credentials)
+        except (InvalidToken, ValueError) as e:
+            return self._refresh_failed(record, f"Stored credentials could not be decrypted ({type(e).__name__})")
+
+        try:
+            token = refresher(credentials)
+        except Exception as e:
+            return self._refresh_failed(record, str(e))
+
+        credentials['access_token'] = token['access_token']
+        if token.get('refresh_token'):
+            credentials['refresh_token'] = token['refresh_token']
+
+        record.encrypted_credentials = self._encrypt(credentials)
+        record.expires_at = now + timedelta(seconds=int(token['expires_in'])) if token.get('expires_in') else None
+        record.last_refreshed_at = now
+        record.refresh_error = None
+        db.session.commit()
+
+        self._cache.set((record.user_id, record.platform), credentials)
+        return True
+
+    def _refresh_failed(self, record: PlatformCredential, error: str) -> bool:
+        logger.error(f"Failed to refresh {record.platform} token for user {record.user_id}: {error}")
+        record.refresh_error = error
+        db.session.commit()
+        return False
+
+    def _encrypt(self, credentials: Dict) -> str:
+        return self._get_fernet().encrypt(json.dumps(credentials).encode()).decode()
+
+    def _decrypt(self, token: str) -> Dict:
+        return json.loads(self._get_fernet().decrypt(token.encode()))
+
+    def _get_fernet(self) -> MultiFernet:
+        if self._fernet is None:
+            with self._fernet_lock:
+                if self._fernet is None:
+                    keys = self._keys or os.getenv('CREDENTIALS_ENCRYPTION_KEY')
+                    if not keys:
+                        raise RuntimeError("CREDENTIALS_ENCRYPTION_KEY is not set")
+                    self._fernet = MultiFernet([Fernet(key.strip()) for key in keys.split(',')])
+        return self._fernet
+
+# Global credential vault instance
+credential_vault = CredentialVault()
+
+def start_credential_refresh(app, interval_seconds: int = 3600) -> PeriodicJob:
+    """Start a background job that refreshes OAuth tokens before they expire
+
+    A lease lets only one process run it: two processes refreshing the same
+    LinkedIn token would each rotate the refresh token, invalidating the other's.
+    """
+    lease = LeaderLease('credential-refresh', timedelta(seconds=interval_seconds * 3))
+    return PeriodicJob('credential-refresh', interval_seconds, credential_vault.refresh_expiring, app=app, lease=lease).start()
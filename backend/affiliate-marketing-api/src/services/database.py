@@ -0,0 +1,45 @@
+"""
+Database Engines for AffiliateFlow SaaS Platform
+One pooled SQLAlchemy engine per database URL, shared by every service in the process.
+"""
+
+import os
+import threading
+from typing import Any, Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+
+# Connection pool settings; SQLite keeps SQLAlchemy's own pool choice and only gets the last two
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """create_engine() keyword arguments for a URL, also usable as SQLALCHEMY_ENGINE_OPTIONS"""
+    options: Dict[str, Any] = {
+        'pool_pre_ping': DB_POOL_PRE_PING,
+        'pool_recycle': DB_POOL_RECYCLE
+    }
+    if make_url(database_url).get_backend_name() != 'sqlite':
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+    return options
+
+def get_engine(database_url: str) -> Engine:
+    """The process-wide engine of a database URL, created on first use"""
+    engine = _engines.get(database_url)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(database_url)
+            if engine is None:
+                engine = _engines[database_url] = create_engine(database_url, **engine_options(database_url))
+    return engine
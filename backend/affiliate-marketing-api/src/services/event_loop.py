@@ -0,0 +1,77 @@
+"""
+Background Event Loop for AffiliateFlow SaaS Platform
+A long-lived asyncio loop in a daemon thread, so synchronous Flask views can
+run coroutines without creating and tearing down a loop per request.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+class BackgroundLoop:
+    """An event loop running forever in its own thread, started on first use"""
+
+    def __init__(self, name: str, executor: Optional[Executor] = None):
+        self.name = name
+        self.executor = executor
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop; (re)started if needed, e.g. in a worker forked after it started"""
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._start()
+        return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        if self.executor is not None:
+            loop.set_default_executor(self.executor)
+
+        ready = threading.Event()
+        thread = threading.Thread(target=self._run, args=(loop, ready), name=f"loop-{self.name}", daemon=True)
+        thread.start()
+        ready.wait()
+        self._loop, self._thread = loop, thread
+        logger.info(f"Started event loop {self.name}")
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def run(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and wait for its result; cancels it on timeout
+
+        Must not be called from the loop's own thread, which would deadlock.
+        """
+        if threading.current_thread() is self._thread:
+            raise RuntimeError(f"BackgroundLoop.run() called from the {self.name} loop thread")
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self):
+        """Stop the loop once the callbacks already queued have run"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+            self._loop, self._thread = None, None
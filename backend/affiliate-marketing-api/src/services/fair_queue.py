@@ -0,0 +1,169 @@
+"""
+Fair Multi-Tenant Queue for AffiliateFlow SaaS Platform
+Weighted deficit round-robin across tenants, with per-tenant in-flight caps and metrics.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Smoothing factor of the per-tenant latency averages
+LATENCY_EWMA_ALPHA = 0.2
+
+class _Tenant:
+    __slots__ = ('items', 'weight', 'cap', 'deficit', 'in_flight')
+
+    def __init__(self, weight: float, cap: int):
+        self.items: deque = deque()
+        self.weight = weight
+        self.cap = cap
+        self.deficit = 0.0
+        self.in_flight = 0
+
+class _TenantStats:
+    __slots__ = ('enqueued', 'completed', 'wait_avg', 'wait_max', 'run_avg', 'run_max')
+
+    def __init__(self):
+        self.enqueued = 0
+        self.completed = 0
+        self.wait_avg = 0.0
+        self.wait_max = 0.0
+        self.run_avg = 0.0
+        self.run_max = 0.0
+
+class FairQueue:
+    """Thread-safe deficit round-robin queue keyed by tenant
+
+    Every tenant with queued items sits in a ring. On its turn a tenant earns
+    quantum * weight credits and may dequeue one item per credit, so each
+    tenant gets throughput proportional to its weight however many items it
+    has queued. Tenants at their in-flight cap are skipped until done() is
+    called for one of their items.
+    """
+
+    def __init__(self, quantum: float = 1.0):
+        self.quantum = quantum
+        self._tenants: Dict[Hashable, _Tenant] = {}
+        self._ring: deque = deque()
+        self._stats: Dict[Hashable, _TenantStats] = {}
+        self._condition = threading.Condition()
+
+    def put(self, tenant: Hashable, item: Any, weight: float = 1.0, cap: int = 1):
+        """Queue an item for a tenant; weight and cap take effect immediately"""
+        with self._condition:
+            state = self._tenants.get(tenant)
+            if state is None:
+                state = self._tenants[tenant] = _Tenant(weight, cap)
+            state.weight = weight
+            state.cap = cap
+
+            if not state.items:
+                self._ring.append(tenant)
+            state.items.append((item, time.monotonic()))
+            self._stats.setdefault(tenant, _TenantStats()).enqueued += 1
+            self._condition.notify()
+
+    def get(self, timeout: float = None) -> Optional[Tuple[Hashable, Any, float]]:
+        """Next (tenant, item, dequeued_at) by weighted fair order, or None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                entry = self._pop_locked()
+                if entry is not None:
+                    return entry
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def done(self, tenant: Hashable, dequeued_at: float):
+        """Release a tenant's in-flight slot once its item has been processed"""
+        with self._condition:
+            state = self._tenants.get(tenant)
+            if state is not None:
+                state.in_flight -= 1
+                if not state.items and state.in_flight <= 0:
+                    del self._tenants[tenant]
+
+            stats = self._stats[tenant]
+            stats.completed += 1
+            run_time = time.monotonic() - dequeued_at
+            stats.run_avg += LATENCY_EWMA_ALPHA * (run_time - stats.run_avg)
+            stats.run_max = max(stats.run_max, run_time)
+
+            # A slot opened up: a tenant that was capped may be eligible again
+            self._condition.notify()
+
+    def _pop_locked(self) -> Optional[Tuple[Hashable, Any, float]]:
+        for _ in range(len(self._ring)):
+            tenant = self._ring[0]
+            state = self._tenants[tenant]
+
+            if state.in_flight >= state.cap:
+                # Capped tenants neither dequeue nor bank credit for later bursts
+                self._ring.rotate(-1)
+                continue
+
+            if state.deficit < 1:
+                state.deficit += self.quantum * state.weight
+            if state.deficit < 1:
+                self._ring.rotate(-1)
+                continue
+
+            item, enqueued_at = state.items.popleft()
+            state.deficit -= 1
+            state.in_flight += 1
+
+            if not state.items:
+                # Idle tenants lose leftover credit (standard DRR)
+                self._ring.popleft()
+                state.deficit = 0.0
+            elif state.deficit < 1:
+                self._ring.rotate(-1)
+
+            now = time.monotonic()
+            stats = self._stats[tenant]
+            wait = now - enqueued_at
+            stats.wait_avg += LATENCY_EWMA_ALPHA * (wait - stats.wait_avg)
+            stats.wait_max = max(stats.wait_max, wait)
+            return tenant, item, now
+
+        return None
+
+    def metrics(self, tenant: Hashable = None) -> Dict:
+        """Queue depth, in-flight count and latency (seconds) per tenant"""
+        now = time.monotonic()
+        with self._condition:
+            tenants = [tenant] if tenant is not None else list(self._stats)
+            report = {}
+            for key in tenants:
+                stats = self._stats.get(key)
+                if stats is None:
+                    continue
+                state = self._tenants.get(key)
+                report[key] = {
+                    'queue_depth': len(state.items) if state else 0,
+                    'in_flight': state.in_flight if state else 0,
+                    'weight': state.weight if state else None,
+                    'in_flight_cap': state.cap if state else None,
+                    'oldest_wait_seconds': round(now - state.items[0][1], 3) if state and state.items else 0.0,
+                    'enqueued': stats.enqueued,
+                    'completed': stats.completed,
+                    'wait_seconds_avg': round(stats.wait_avg, 3),
+                    'wait_seconds_max': round(stats.wait_max, 3),
+                    'run_seconds_avg': round(stats.run_avg, 3),
+                    'run_seconds_max': round(stats.run_max, 3)
+                }
+
+            return {
+                'total_queue_depth': sum(len(state.items) for state in self._tenants.values()),
+                'total_in_flight': sum(state.in_flight for state in self._tenants.values()),
+                'active_tenants': len(self._ring),
+                'tenants': report
+            }
+
+    def __len__(self) -> int:
+        with self._condition:
+            return sum(len(state.items) for state in self._tenants.values())
@@ -0,0 +1,134 @@
+"""
+Hashtag Suggestion Engine for AffiliateFlow SaaS Platform
+Precomputed niche/platform hashtag tables and single-pass keyword extraction.
+"""
+
+import re
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from src.services.platform_rules import PLATFORM_RULES
+
+DEFAULT_HASHTAG_LIMIT = 10
+
+# Hashtags taken from the content itself, at most this many per suggestion
+MAX_CONTENT_HASHTAGS = 5
+
+# Base hashtags by niche
+NICHE_HASHTAGS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    'travel': ('#travel', '#wanderlust', '#explore', '#adventure', '#vacation', '#travelgram', '#instatravel', '#traveling', '#travelphotography', '#backpacking'),
+    'productivity': ('#productivity', '#entrepreneur', '#business', '#success', '#motivation', '#goals', '#hustle', '#mindset', '#leadership', '#growth'),
+    'lifestyle': ('#lifestyle', '#inspiration', '#wellness', '#selfcare', '#mindfulness', '#happiness', '#positivity', '#life', '#daily', '#routine'),
+    'food': ('#food', '#foodie', '#delicious', '#yummy', '#cooking', '#recipe', '#foodporn', '#instafood', '#chef', '#kitchen'),
+    'fitness': ('#fitness', '#workout', '#gym', '#health', '#fit', '#training', '#exercise', '#motivation', '#strength', '#cardio'),
+    'fashion': ('#fashion', '#style', '#outfit', '#ootd', '#fashionista', '#trendy', '#stylish', '#look', '#clothing', '#accessories')
+})
+
+# Platform-specific hashtags
+PLATFORM_HASHTAGS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    'instagram': ('#instagood', '#photooftheday', '#instadaily', '#follow', '#like4like'),
+    'tiktok': ('#fyp', '#foryou', '#viral', '#trending', '#tiktok'),
+    'facebook': ('#facebook', '#social', '#community', '#share'),
+    'pinterest': ('#pinterest', '#pinit', '#inspiration', '#ideas'),
+    'youtube': ('#youtube', '#subscribe', '#video', '#content'),
+    'linkedin': ('#linkedin', '#professional', '#networking', '#career'),
+    'twitter': ('#twitter', '#tweet', '#follow', '#retweet')
+})
+
+# Common keywords that make good hashtags; words of 3 letters or fewer are too generic
+HASHTAG_KEYWORDS: FrozenSet[str] = frozenset(word for word in (
+    'tips', 'guide', 'how', 'best', 'top', 'amazing', 'awesome', 'great', 'new', 'free',
+    'easy', 'simple', 'quick', 'fast', 'effective', 'powerful', 'ultimate', 'complete',
+    'beginner', 'advanced', 'pro', 'expert', 'secret', 'hack', 'trick', 'method'
+) if len(word) > 3)
+
+class HashtagEngine:
+    """Hashtag suggestions from immutable tables, precomputed per niche and platform
+
+    The niche and platform hashtags of every combination are merged, deduplicated
+    and cut to the platform limit once, up front. A suggestion then only scans
+    the content for keywords, and skips even that when the base hashtags
+    already fill the limit.
+    """
+
+    def __init__(self, niche_hashtags: Mapping[str, Tuple[str, ...]] = NICHE_HASHTAGS,
+                 platform_hashtags: Mapping[str, Tuple[str, ...]] = PLATFORM_HASHTAGS,
+                 keywords: FrozenSet[str] = HASHTAG_KEYWORDS,
+                 max_content_hashtags: int = MAX_CONTENT_HASHTAGS):
+        self.niche_hashtags = niche_hashtags
+        self.platform_hashtags = platform_hashtags
+        self.keywords = frozenset(keyword.lower() for keyword in keywords)
+        self.max_content_hashtags = max_content_hashtags
+
+        # Only letter runs as long as some keyword can match, so most words never reach Python
+        lengths = [len(keyword) for keyword in self.keywords] or [1]
+        self._word_pattern = re.compile(r'(?<![^\W_])[^\W\d_]{%d,%d}(?![^\W_])' % (min(lengths), max(lengths)))
+
+        self._base: Dict[Tuple[str, str], Tuple[Tuple[str, ...], FrozenSet[str], int]] = {}
+        for niche in list(niche_hashtags) + ['']:
+            for platform in list(platform_hashtags) + ['']:
+                self._base[(niche, platform)] = self._build_base(niche, platform)
+
+    def _build_base(self, niche: str, platform: str) -> Tuple[Tuple[str, ...], FrozenSet[str], int]:
+        rules = PLATFORM_RULES.get(platform)
+        limit = rules.hashtag_limit if rules else DEFAULT_HASHTAG_LIMIT
+        merged = tuple(dict.fromkeys(self.niche_hashtags.get(niche, ()) + self.platform_hashtags.get(platform, ())))
+        return merged[:limit], frozenset(merged), limit
+
+    def _base_for(self, niche: str, platform: str) -> Tuple[Tuple[str, ...], FrozenSet[str], int]:
+        # Unknown niches and platforms share the '' entry: no table hashtags, default limit
+        return self._base[(niche if niche in self.niche_hashtags else '',
+                           platform if platform in self.platform_hashtags else '')]
+
+    def content_keywords(self, content: str, exclude: FrozenSet[str] = frozenset(),
+                         limit: Optional[int] = None) -> List[str]:
+        """Keyword hashtags in order of first appearance, at most limit of them"""
+        limit = self.max_content_hashtags if limit is None else limit
+        found: List[str] = []
+        if limit <= 0 or not content:
+            return found
+
+        keywords = self.keywords
+        for match in self._word_pattern.finditer(content):
+            word = match.group()
+            if word not in keywords:
+                word = word.lower()
+                if word not in keywords:
+                    continue
+            hashtag = '#' + word
+            if hashtag not in exclude and hashtag not in found:
+                found.append(hashtag)
+                if len(found) == limit:
+                    break
+        return found
+
+    def suggest(self, content: str, platform: str = 'instagram', niche: str = 'general',
+                trending: Sequence[str] = ()) -> List[str]:
+        """Niche, platform and content hashtags, deduplicated and cut to the platform limit
+
+        trending hashtags, best first, lead the list; the static ones fill the rest.
+        """
+        base, base_set, limit = self._base_for(niche, platform)
+        if trending:
+            merged = tuple(dict.fromkeys([*trending[:limit], *base]))
+            base, base_set = merged[:limit], base_set.union(merged)
+        if len(base) >= limit:
+            return list(base)
+        content_hashtags = self.content_keywords(content, base_set, min(self.max_content_hashtags, limit - len(base)))
+        return list(base) + content_hashtags
+
+    def suggest_batch(self, posts: Iterable[Dict],
+                      trending: Optional[Callable[[str, str], Sequence[str]]] = None) -> List[List[str]]:
+        """Suggestions for many posts at once; each post holds 'content', 'platform' and 'niche'
+
+        trending, if given, maps (niche, platform) to the hashtags to lead with.
+        """
+        results = []
+        for post in posts:
+            platform = post.get('platform', 'instagram')
+            niche = post.get('niche', 'general')
+            results.append(self.suggest(post.get('content', ''), platform, niche,
+                                        trending(niche, platform) if trending else ()))
+        return results
+
+hashtag_engine = HashtagEngine()
@@ -0,0 +1,195 @@
+"""
+Publish Idempotency for AffiliateFlow SaaS Platform
+Records every publish attempt under an idempotency key so retries never double-post.
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from src.models.content import db
+
+logger = logging.getLogger(__name__)
+
+STATE_IN_PROGRESS = 'in_progress'
+STATE_COMPLETE = 'complete'
+STATE_FAILED = 'failed'
+
+# An in-progress attempt whose worker died is taken over once its lease runs out
+LEASE_DURATION = timedelta(minutes=5)
+
+class PublishInProgressError(Exception):
+    """Another request or worker is currently publishing under the same key"""
+
+class PublishAttempt(db.Model):
+    """One publish of a post to a platform, keyed by its idempotency key"""
+    __tablename__ = 'publish_attempts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(255), unique=True, nullable=False)
+    post_id = db.Column(db.Integer, index=True)
+    platform = db.Column(db.String(50), nullable=False)
+    state = db.Column(db.String(20), nullable=False, default=STATE_IN_PROGRESS)
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+    lease_token = db.Column(db.String(36))
+    lease_expires_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)  # JSON outcome of the completed attempt
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def get_result(self) -> Optional[Dict]:
+        return json.loads(self.result) if self.result else None
+
+    def to_dict(self) -> Dict:
+        return {
+            'idempotency_key': self.idempotency_key,
+            'post_id': self.post_id,
+            'platform': self.platform,
+            'state': self.state,
+            'attempts': self.attempts,
+            'result': self.get_result(),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+def publish_key(post_id: int, platform: str) -> str:
+    """Default idempotency key of a stored post: it is published to its platform at most once"""
+    return f"post:{post_id}:{platform}"
+
+class IdempotencyStore:
+    """Claim / complete / fail state machine over PublishAttempt rows
+
+    The unique key makes the first INSERT win across threads and processes.
+    Later callers with the same key get the recorded outcome of a completed
+    attempt, a PublishInProgressError while another worker holds the lease,
+    or take the attempt over when it failed or its lease expired.
+    """
+
+    def __init__(self, lease_duration: timedelta = LEASE_DURATION):
+        self.lease_duration = lease_duration
+
+    def run(self, key: str, platform: str, func: Callable[[], Dict], post_id: int = None) -> Tuple[Dict, bool]:
+        """Run func at most once per key; returns (result, replayed)"""
+        token, recorded = self._claim(key, platform, post_id)
+        if token is None:
+            return recorded, True
+
+        try:
+            result = func()
+        except Exception as e:
+            self._fail(key, token, str(e))
+            raise
+
+        self._complete(key, token, result)
+        return result, False
+
+    async def run_async(self, key: str, platform: str, func: Callable[[], Awaitable[Dict]],
+                        post_id: int = None) -> Tuple[Dict, bool]:
+        """Coroutine variant of run()"""
+        token, recorded = self._claim(key, platform, post_id)
+        if token is None:
+            return recorded, True
+
+        try:
+            result = await func()
+        except Exception as e:
+            self._fail(key, token, str(e))
+            raise
+
+        self._complete(key, token, result)
+        return result, False
+
+    def get(self, key: str) -> Optional[PublishAttempt]:
+        return PublishAttempt.query.filter_by(idempotency_key=key).first()
+
+    def _claim(self, key: str, platform: str, post_id: Optional[int]) -> Tuple[Optional[str], Optional[Dict]]:
+        """Returns (lease token, None) when the caller should publish, else (None, recorded result)"""
+        now = datetime.utcnow()
+        token = str(uuid.uuid4())
+
+        db.session.add(PublishAttempt(
+            idempotency_key=key,
+            post_id=post_id,
+            platform=platform,
+            state=STATE_IN_PROGRESS,
+            lease_token=token,
+            lease_expires_at=now + self.lease_duration
+        ))
+        try:
+            db.session.commit()
+            return token, None
+        except IntegrityError:
+            db.session.rollback()
+
+        attempt = self.get(key)
+        if attempt.state == STATE_COMPLETE:
+            return None, attempt.get_result()
+
+        if attempt.state == STATE_IN_PROGRESS and attempt.lease_expires_at and attempt.lease_expires_at > now:
+            raise PublishInProgressError(f"Publish already in progress for key {key}")
+
+        # Failed or abandoned: take it over, unless another worker beat us to it
+        taken = db.session.execute(
+            update(PublishAttempt)
+            .where(
+                PublishAttempt.id == attempt.id,
+                PublishAttempt.state == attempt.state,
+                PublishAttempt.attempts == attempt.attempts
+            )
+            .values(
+                state=STATE_IN_PROGRESS,
+                attempts=PublishAttempt.attempts + 1,
+                lease_token=token,
+                lease_expires_at=now + self.lease_duration,
+                error=None,
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+        if not taken:
+            raise PublishInProgressError(f"Publish already in progress for key {key}")
+
+        logger.info(f"Retrying publish for key {key} (previous state: {attempt.state})")
+        return token, None
+
+    def _complete(self, key: str, token: str, result: Dict):
+        """Record the outcome, committing it together with the caller's pending changes"""
+        # Unsuccessful outcomes are kept for inspection but stay retryable
+        state = STATE_COMPLETE if result.get('success', True) else STATE_FAILED
+        self._finish(key, token, state, result=json.dumps(result, default=str), error=result.get('error'))
+
+    def _fail(self, key: str, token: str, error: str):
+        db.session.rollback()
+        self._finish(key, token, STATE_FAILED, error=error)
+
+    def _finish(self, key: str, token: str, state: str, result: str = None, error: str = None):
+        # The lease token fences off a worker whose lease expired and was taken over
+        updated = db.session.execute(
+            update(PublishAttempt)
+            .where(PublishAttempt.idempotency_key == key, PublishAttempt.lease_token == token)
+            .values(
+                state=state,
+                result=result,
+                error=error,
+                lease_token=None,
+                lease_expires_at=None,
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+        if not updated:
+            logger.warning(f"Publish attempt {key} was taken over by another worker before it finished")
+
+# Global idempotency store instance
+idempotency_store = IdempotencyStore()
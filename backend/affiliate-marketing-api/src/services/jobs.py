@@ -0,0 +1,75 @@
+"""
+Background job helpers for AffiliateFlow SaaS Platform
+Runs periodic maintenance work (analytics refresh, model rebuilds, ...) in daemon threads.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class PeriodicJob:
+    """Run a callable on a fixed interval in a daemon thread
+
+    With a lease (see src.services.leases), a run is skipped unless this
+    process holds it, so a job started in every worker runs in only one.
+    """
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], None], app=None, run_on_start: bool = True,
+                 lease: Any = None):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.app = app
+        self.run_on_start = run_on_start
+        self.lease = lease
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'PeriodicJob':
+        """Start the job thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return self
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"job-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"Started periodic job {self.name} (every {self.interval_seconds}s)")
+        return self
+
+    def stop(self, timeout: float = None):
+        """Signal the job to stop and wait for the current run to finish"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self.lease is not None:
+            # Let another process take over without waiting for the lease to expire
+            if self.app is not None:
+                with self.app.app_context():
+                    self.lease.release()
+            else:
+                self.lease.release()
+
+    def run_once(self):
+        """Run the job body once, inside an app context when one was given"""
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    self._run_leased()
+            else:
+                self._run_leased()
+        except Exception as e:
+            logger.error(f"Periodic job {self.name} failed: {str(e)}")
+
+    def _run_leased(self):
+        if self.lease is not None and not self.lease.acquire():
+            return
+        self.func()
+
+    def _run(self):
+        if self.run_on_start:
+            self.run_once()
+
+        while not self._stop_event.wait(self.interval_seconds):
+            self.run_once()
@@ -0,0 +1,84 @@
+"""
+Job Leases for AffiliateFlow SaaS Platform
+Database leases that let exactly one process of many run a background job.
+"""
+
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from src.models.content import db
+
+logger = logging.getLogger(__name__)
+
+class JobLease(db.Model):
+    """Which process currently runs a job, and until when"""
+    __tablename__ = 'job_leases'
+
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(255), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class LeaderLease:
+    """A named, time-limited lease; whoever holds it is the one process that runs the job
+
+    The holder renews the lease on every run. If it dies, another process takes
+    the lease over once it expires, so duration should comfortably exceed the
+    job's interval plus its longest run.
+    """
+
+    def __init__(self, name: str, duration: timedelta):
+        self.name = name
+        self.duration = duration
+        self._token = uuid.uuid4().hex[:12]
+
+    @property
+    def holder(self) -> str:
+        # The pid is read on every call, so workers forked from one master never share a holder
+        return f"{socket.gethostname()}:{os.getpid()}:{self._token}"
+
+    def acquire(self, now: datetime = None) -> bool:
+        """Take or renew the lease; True if this process holds it for the next duration"""
+        now = now or datetime.utcnow()
+        holder = self.holder
+        try:
+            taken = db.session.execute(
+                update(JobLease)
+                .where(JobLease.name == self.name, or_(JobLease.holder == holder, JobLease.expires_at <= now))
+                .values(holder=holder, expires_at=now + self.duration)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not taken:
+                if db.session.query(JobLease.name).filter_by(name=self.name).first() is not None:
+                    db.session.commit()
+                    return False
+                db.session.add(JobLease(name=self.name, holder=holder, expires_at=now + self.duration))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Another process created the lease first
+            db.session.rollback()
+            return False
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to acquire job lease {self.name}: {str(e)}")
+            return False
+
+    def release(self):
+        """Give the lease up early, e.g. on shutdown, if this process holds it"""
+        try:
+            db.session.execute(
+                update(JobLease)
+                .where(JobLease.name == self.name, JobLease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to release job lease {self.name}: {str(e)}")
@@ -0,0 +1,269 @@
+"""
+Platform Rules Registry for AffiliateFlow SaaS Platform
+Single source of per-platform content limits and formatting, and one-pass
+content optimization for several platforms at once.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.services.content_rules import apply_tone
+from src.services.twitter_text import MAX_TWEET_WEIGHT, build_thread, token_weight, weighted_length
+
+# Platform configurations
+PLATFORM_CONFIGS = {
+    'instagram': {
+        'max_length': 2200,
+        'hashtag_limit': 30,
+        'optimal_times': ['09:00', '15:00', '19:00'],
+        'supported_media': ['image', 'video'],
+        'features': ['posts', 'stories', 'reels']
+    },
+    'tiktok': {
+        'max_length': 300,
+        'hashtag_limit': 20,
+        'optimal_times': ['12:00', '18:00', '21:00'],
+        'supported_media': ['video'],
+        'features': ['videos']
+    },
+    'facebook': {
+        'max_length': 63206,
+        'hashtag_limit': 10,
+        'optimal_times': ['08:00', '14:00', '20:00'],
+        'supported_media': ['image', 'video', 'link'],
+        'features': ['posts', 'stories']
+    },
+    'pinterest': {
+        'max_length': 500,
+        'hashtag_limit': 20,
+        'optimal_times': ['11:00', '16:00', '22:00'],
+        'supported_media': ['image'],
+        'features': ['pins', 'boards']
+    },
+    'youtube': {
+        'max_length': 5000,
+        'hashtag_limit': 15,
+        'optimal_times': ['10:00'],
+        'supported_media': ['video'],
+        'features': ['videos', 'shorts', 'community']
+    },
+    'linkedin': {
+        'max_length': 3000,
+        'hashtag_limit': 5,
+        'optimal_times': ['09:00', '12:00', '17:00'],
+        'supported_media': ['image', 'video', 'document'],
+        'features': ['posts', 'articles']
+    },
+    'twitter': {
+        'max_length': 280,
+        'hashtag_limit': 2,
+        'optimal_times': ['09:00', '12:00', '15:00', '18:00'],
+        'supported_media': ['image', 'video', 'gif'],
+        'features': ['tweets', 'threads']
+    }
+}
+
+# Engagement prompts appended to posts created through the API
+CALLS_TO_ACTION = {
+    'instagram': "\n\n💡 Save this post for later!\n👥 Tag someone who needs to see this!",
+    'tiktok': "\n\n🔥 Follow for more tips!\n💬 Comment your thoughts below!",
+    'pinterest': "\n\n📌 Save to your board!\n🔗 Click for full guide!",
+    'youtube': "\n\n📺 Subscribe for more content like this!\n👍 Like this video if it helped you!",
+    'linkedin': "\n\n💼 What's your experience with this?\n🔗 Connect with me for more insights!",
+    'twitter': "\n\n🧵 Thread below 👇\n🔄 RT if you found this helpful!"
+}
+
+# Facebook posts lead with an emoji unless they already start with one of these
+FACEBOOK_LEAD = "💡 "
+FACEBOOK_LEAD_EMOJIS = ("🔥", "💡", "🚀", "⚡")
+
+ELLIPSIS = '...'
+
+@dataclass(frozen=True)
+class PlatformRules:
+    name: str
+    max_length: int
+    hashtag_limit: int
+    call_to_action: str = ''
+    call_to_action_length: int = 0  # measured the way this platform counts length
+    weighted_length: bool = False  # length counted as Twitter does (URLs 23, CJK/emoji 2)
+    supports_threads: bool = False
+    requires_image: bool = False
+
+def _compile_rules() -> Dict[str, PlatformRules]:
+    rules = {}
+    for platform, config in PLATFORM_CONFIGS.items():
+        weighted = platform == 'twitter'
+        call_to_action = CALLS_TO_ACTION.get(platform, '')
+        rules[platform] = PlatformRules(
+            name=platform,
+            max_length=config['max_length'],
+            hashtag_limit=config['hashtag_limit'],
+            call_to_action=call_to_action,
+            call_to_action_length=weighted_length(call_to_action) if weighted else len(call_to_action),
+            weighted_length=weighted,
+            supports_threads='threads' in config['features'],
+            requires_image=platform == 'instagram'
+        )
+    return rules
+
+PLATFORM_RULES: Dict[str, PlatformRules] = _compile_rules()
+
+def get_platform_rules(platform: str) -> Optional[PlatformRules]:
+    return PLATFORM_RULES.get(platform)
+
+_TOKEN = re.compile(r'\S+')
+
+def _span_weight(text: str) -> int:
+    return len(text) if text.isascii() and '.' not in text else token_weight(text)
+
+class _TokenizedText:
+    """A variant text with its Twitter token weights, scanned lazily and shared
+
+    Tokens are only weighed as far as the largest weighted limit asked for, and
+    the truncation and thread checks reuse the same running weights.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.weights: List[int] = []  # Twitter-weighted length of text[:end], per token
+        self._matches = _TOKEN.finditer(text)
+        self._exhausted = False
+
+    def _scan_token(self) -> bool:
+        match = next(self._matches, None)
+        if match is None:
+            self._exhausted = True
+            return False
+        start, end = match.span()
+        self.starts.append(start)
+        self.ends.append(end)
+        return True
+
+    def _weigh_until(self, weight: int):
+        """Weigh tokens until their running weight passes weight or the text runs out"""
+        while not self.weights or self.weights[-1] <= weight:
+            index = len(self.weights)
+            if index == len(self.ends) and not self._scan_token():
+                return
+            previous = self.ends[index - 1] if index else 0
+            start, end = self.starts[index], self.ends[index]
+            total = self.weights[-1] if self.weights else 0
+            self.weights.append(
+                total + _span_weight(self.text[previous:start]) + _span_weight(self.text[start:end])
+            )
+
+    def truncate(self, limit: int) -> str:
+        """Cut to at most limit characters (ellipsis included), at a word boundary where possible"""
+        if len(self.text) <= limit:
+            return self.text
+
+        cut = max(limit - len(ELLIPSIS), 0)
+        # str.rstrip/rsplit find the last word boundary at C speed; no token list needed
+        head = self.text[:cut + 1]
+        end = len(head.rstrip())
+        if end > cut:
+            # The character at the cut is inside a word: drop that word
+            words = head.rsplit(None, 1)
+            end = len(words[0]) if len(words) == 2 else 0
+        if end < cut // 2:
+            # A single huge token: a hard cut keeps more of the text
+            end = cut
+        return self.text[:end] + ELLIPSIS
+
+    def exceeds_weight(self, limit: int) -> bool:
+        """Whether the Twitter-weighted length of the text is over limit"""
+        self._weigh_until(limit)
+        if self.weights and self.weights[-1] > limit:
+            return True
+        # Every token fits; only trailing whitespace is left
+        weighed = self.weights[-1] if self.weights else 0
+        return weighed + _span_weight(self.text[self.ends[-1] if self.ends else 0:]) > limit
+
+    def truncate_weighted(self, limit: int) -> str:
+        """Like truncate, with length counted as Twitter weighs it"""
+        if not self.exceeds_weight(limit):
+            return self.text
+
+        cut = max(limit - len(ELLIPSIS), 0)
+        kept = bisect_right(self.weights, cut)
+        if kept == len(self.ends) and self._exhausted:
+            # The words fit; it is trailing whitespace that does not
+            return self.text[:self.ends[-1]]
+        if kept and self.weights[kept - 1] >= cut // 2:
+            return self.text[:self.ends[kept - 1]] + ELLIPSIS
+
+        # A single huge token: cut it character by character
+        weight = 0
+        for index, char in enumerate(self.text):
+            weight += token_weight(char)
+            if weight > cut:
+                return self.text[:index] + ELLIPSIS
+        return self.text
+
+def optimize_for_platforms(content: Dict, platforms: List[str], call_to_action: bool = False,
+                           twitter_threads: bool = True) -> Dict[str, Dict]:
+    """Build every platform's variant of a piece of content in one pass
+
+    content holds 'text' and optionally 'hashtags', 'image_url' and other
+    fields, which are carried over. Each distinct variant text (after tone
+    rules) is prepared once and shared: word-boundary cuts scan only up to the
+    platform's limit, and Twitter weights are computed lazily and reused by the
+    truncation and thread checks. With call_to_action, the platform's engagement
+    prompt is appended, and room for it is reserved within the length limit.
+    With twitter_threads, over-long Twitter variants also carry the full text
+    split into a 'thread'.
+    """
+    text = content.get('text', '')
+    hashtags = content.get('hashtags') or []
+    tokenized = {text: _TokenizedText(text)}
+
+    def tokenize(variant_text: str) -> _TokenizedText:
+        if variant_text not in tokenized:
+            tokenized[variant_text] = _TokenizedText(variant_text)
+        return tokenized[variant_text]
+
+    results = {}
+    for platform in platforms:
+        rules = PLATFORM_RULES.get(platform)
+        optimized = dict(content)
+        if rules is None:
+            results[platform] = optimized
+            continue
+
+        if rules.weighted_length:
+            # Twitter normalizes before counting; URLs can make the cut land past max_length chars
+            source = apply_tone(platform, unicodedata.normalize('NFC', text))
+        else:
+            # Tone rules rewrite the text before it is cut, so the result respects the limit
+            source = apply_tone(platform, text, rules.max_length)
+
+        budget = rules.max_length
+        prefix = suffix = ''
+        if call_to_action:
+            suffix = rules.call_to_action
+            budget -= rules.call_to_action_length
+            if platform == 'facebook' and not source.startswith(FACEBOOK_LEAD_EMOJIS):
+                prefix = FACEBOOK_LEAD
+                budget -= len(prefix)
+
+        variant = tokenize(source)
+        body = variant.truncate_weighted(budget) if rules.weighted_length else variant.truncate(budget)
+
+        optimized['text'] = prefix + body + suffix
+        optimized['hashtags'] = hashtags[:rules.hashtag_limit]
+
+        if twitter_threads and rules.supports_threads and variant.exceeds_weight(MAX_TWEET_WEIGHT):
+            # Too long for one tweet: publish the full text as a thread
+            optimized['thread'] = build_thread(source)
+        if rules.requires_image and not content.get('image_url'):
+            optimized['requires_image'] = True
+
+        results[platform] = optimized
+
+    return results
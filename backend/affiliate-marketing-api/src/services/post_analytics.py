@@ -0,0 +1,126 @@
+"""
+Social Media Post Analytics Queries for AffiliateFlow SaaS Platform
+SQL-side aggregation of SocialMediaPost metrics plus a per-user result cache.
+"""
+
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List
+
+from sqlalchemy import func
+
+from src.models.content import db, SocialMediaPost
+from src.services.cache import TTLCache
+
+METRIC_COLUMNS = ('likes', 'comments', 'shares', 'clicks', 'reach', 'impressions')
+
+# Per-user time-window aggregation. On PostgreSQL the metrics are INCLUDEd so the
+# GROUP BY platform aggregates are answered with an index-only scan.
+db.Index(
+    'ix_social_media_posts_user_published',
+    SocialMediaPost.user_id,
+    SocialMediaPost.published_time,
+    postgresql_include=['platform', 'status', *METRIC_COLUMNS]
+)
+
+# Dashboard analytics window (posts created in the last N days)
+db.Index(
+    'ix_social_media_posts_user_created',
+    SocialMediaPost.user_id,
+    SocialMediaPost.created_at,
+    postgresql_include=['platform', *METRIC_COLUMNS]
+)
+
+def engagement_expression():
+    """SQL expression for a post's engagement (likes + comments + shares)"""
+    return SocialMediaPost.likes + SocialMediaPost.comments + SocialMediaPost.shares
+
+def _window_filters(user_id: str, start: datetime, end: datetime = None, platform: str = None,
+                    time_column=None, statuses: List[str] = None) -> List:
+    time_column = SocialMediaPost.published_time if time_column is None else time_column
+    filters = [SocialMediaPost.user_id == user_id, time_column >= start]
+    if end is not None:
+        filters.append(time_column < end)
+    if platform:
+        filters.append(SocialMediaPost.platform == platform)
+    if statuses:
+        filters.append(SocialMediaPost.status.in_(statuses))
+    return filters
+
+def platform_totals(user_id: str, start: datetime, end: datetime = None, platform: str = None,
+                    time_column=None, statuses: List[str] = None) -> Dict[str, Dict[str, int]]:
+    """Post count and metric sums per platform, in a single GROUP BY query"""
+    rows = db.session.query(
+        SocialMediaPost.platform,
+        func.count(SocialMediaPost.id),
+        *[func.coalesce(func.sum(getattr(SocialMediaPost, column)), 0) for column in METRIC_COLUMNS]
+    ).filter(
+        *_window_filters(user_id, start, end, platform, time_column, statuses)
+    ).group_by(SocialMediaPost.platform).all()
+
+    totals = {}
+    for row in rows:
+        platform_row = {'count': int(row[1])}
+        platform_row.update({column: int(value) for column, value in zip(METRIC_COLUMNS, row[2:])})
+        totals[row[0]] = platform_row
+    return totals
+
+def best_post_per_platform(user_id: str, start: datetime, end: datetime = None,
+                           time_column=None, statuses: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Highest-engagement post of each platform, using a row_number() window"""
+    engagement = engagement_expression()
+    ranked = db.session.query(
+        SocialMediaPost.id,
+        SocialMediaPost.platform,
+        SocialMediaPost.platform_post_id,
+        SocialMediaPost.impressions,
+        engagement.label('engagement'),
+        func.row_number().over(
+            partition_by=SocialMediaPost.platform,
+            order_by=(engagement.desc(), SocialMediaPost.id.desc())
+        ).label('rank')
+    ).filter(
+        *_window_filters(user_id, start, end, None, time_column, statuses)
+    ).subquery()
+
+    rows = db.session.query(ranked).filter(ranked.c.rank == 1).all()
+    return {
+        row.platform: {
+            'id': row.id,
+            'platform_post_id': row.platform_post_id,
+            'impressions': row.impressions or 0,
+            'engagement': row.engagement or 0
+        }
+        for row in rows
+    }
+
+def top_posts(user_id: str, start: datetime, end: datetime = None, platform: str = None,
+              time_column=None, statuses: List[str] = None, limit: int = 5) -> List[SocialMediaPost]:
+    """Highest-engagement posts in the window, ordered and limited in SQL"""
+    return SocialMediaPost.query.filter(
+        *_window_filters(user_id, start, end, platform, time_column, statuses)
+    ).order_by(
+        engagement_expression().desc(), SocialMediaPost.id.desc()
+    ).limit(limit).all()
+
+class AnalyticsCache:
+    """Per-user analytics result cache with O(1) invalidation"""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Bumping a user's generation orphans all of their cached entries at once;
+        # orphaned entries age out of the LRU on their own.
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, user_id: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        cache_key = (user_id, self._generations.get(user_id, 0), key)
+        return self._cache.get_or_set(cache_key, factory)
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached result for a user (e.g. after their metrics were refreshed)"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+# Shared by SocialMediaAnalytics and the analytics collector
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,229 @@
+"""
+Optimal Posting Time Model for AffiliateFlow SaaS Platform
+Learns day-of-week x hour engagement-rate matrices from published post history.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Float, Integer, cast, extract, func
+
+from src.models.content import db, SocialMediaPost
+from src.services.jobs import PeriodicJob
+
+logger = logging.getLogger(__name__)
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+CELLS = 7 * 24  # one cell per weekday hour, Monday 00:00 first
+
+# Engagement keeps moving for a while after publishing, so posts only enter the
+# model once they are this old. That makes every post count exactly once.
+SETTLE_PERIOD = timedelta(hours=48)
+
+# Weight of the platform-wide prior, in pseudo-posts per cell. Users with a few
+# posts in a cell get mostly the prior; heavy posters get mostly their own data.
+PRIOR_STRENGTH = 5.0
+
+class PostingTimeModel:
+    """Per-user, per-platform engagement-rate model over the 168 hours of a week"""
+
+    def __init__(self, prior_strength: float = PRIOR_STRENGTH, top_n: int = 3):
+        self.prior_strength = prior_strength
+        self.top_n = top_n
+
+        # Row i of the histograms belongs to self._keys[i] == (user_id, platform)
+        self._keys: List[Tuple[str, str]] = []
+        self._key_index: Dict[Tuple[str, str], int] = {}
+        self._rate_sums = np.zeros((0, CELLS))
+        self._counts = np.zeros((0, CELLS))
+        self._watermark: Optional[datetime] = None
+        self._update_lock = threading.Lock()
+
+        # Served snapshots, replaced wholesale after each update
+        self._user_slots: Dict[Tuple[str, str], List[Dict]] = {}
+        self._platform_slots: Dict[str, List[Dict]] = {}
+
+    def get_optimal_times(self, user_id: str, platform: str) -> List[Dict]:
+        """Best posting slots for a user, falling back to the platform-wide prior"""
+        slots = self._user_slots.get((user_id, platform))
+        if slots is None:
+            slots = self._platform_slots.get(platform, [])
+        return slots
+
+    def next_optimal_time(self, user_id: str, platform: str, now: datetime = None) -> Optional[datetime]:
+        """Soonest upcoming occurrence of one of the user's best slots"""
+        slots = self.get_optimal_times(user_id, platform)
+        if not slots:
+            return None
+
+        now = now or datetime.utcnow()
+        week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        candidates = []
+        for slot in slots:
+            when = week_start + timedelta(days=slot['day_index'], hours=slot['hour'])
+            if when <= now:
+                when += timedelta(days=7)
+            candidates.append(when)
+        return min(candidates)
+
+    def update(self, now: datetime = None) -> int:
+        """Fold posts that settled since the last run into the model; returns posts added"""
+        with self._update_lock:
+            cutoff = (now or datetime.utcnow()) - SETTLE_PERIOD
+            added = self._ingest(self._watermark, cutoff)
+            self._watermark = cutoff
+
+            if added or not self._platform_slots:
+                self._rebuild_snapshots()
+
+        if added:
+            logger.info(f"Posting time model: added {added} posts, {len(self._keys)} user/platform series")
+        return added
+
+    def _ingest(self, after: Optional[datetime], until: datetime) -> int:
+        if after is None:
+            # First run: the whole history, so the database does the aggregation
+            return self._ingest_aggregated(until)
+
+        engagement = SocialMediaPost.likes + SocialMediaPost.comments + SocialMediaPost.shares
+        query = db.session.query(
+            SocialMediaPost.user_id,
+            SocialMediaPost.platform,
+            SocialMediaPost.published_time,
+            engagement,
+            SocialMediaPost.impressions
+        ).filter(
+            *_settled_posts(until),
+            SocialMediaPost.published_time > after
+        )
+
+        rows_index, cells, rates = [], [], []
+        for user_id, platform, published_time, post_engagement, impressions in query.yield_per(10000):
+            rows_index.append(self._row_for((user_id, platform)))
+            cells.append(published_time.weekday() * 24 + published_time.hour)
+            rates.append((post_engagement or 0) / impressions)
+
+        if not rows_index:
+            return 0
+
+        rows_index = np.asarray(rows_index)
+        cells = np.asarray(cells)
+        np.add.at(self._rate_sums, (rows_index, cells), np.asarray(rates, dtype=float))
+        np.add.at(self._counts, (rows_index, cells), 1.0)
+        return len(rows_index)
+
+    def _ingest_aggregated(self, until: datetime) -> int:
+        """Add rate sums and post counts per user, platform and weekday hour, computed with one GROUP BY"""
+        engagement = func.coalesce(SocialMediaPost.likes + SocialMediaPost.comments + SocialMediaPost.shares, 0)
+        # Sunday is day 0 on PostgreSQL and SQLite alike
+        day_of_week = cast(extract('dow', SocialMediaPost.published_time), Integer)
+        hour = cast(extract('hour', SocialMediaPost.published_time), Integer)
+        query = db.session.query(
+            SocialMediaPost.user_id,
+            SocialMediaPost.platform,
+            day_of_week,
+            hour,
+            func.sum(cast(engagement, Float) / SocialMediaPost.impressions),
+            func.count()
+        ).filter(
+            *_settled_posts(until)
+        ).group_by(
+            SocialMediaPost.user_id,
+            SocialMediaPost.platform,
+            day_of_week,
+            hour
+        )
+
+        rows_index, cells, rate_sums, counts = [], [], [], []
+        for user_id, platform, day, hour_of_day, rate_sum, count in query:
+            rows_index.append(self._row_for((user_id, platform)))
+            cells.append((day + 6) % 7 * 24 + hour_of_day)
+            rate_sums.append(rate_sum or 0.0)
+            counts.append(count)
+
+        if not rows_index:
+            return 0
+
+        rows_index = np.asarray(rows_index)
+        cells = np.asarray(cells)
+        np.add.at(self._rate_sums, (rows_index, cells), np.asarray(rate_sums, dtype=float))
+        np.add.at(self._counts, (rows_index, cells), np.asarray(counts, dtype=float))
+        return int(sum(counts))
+
+    def _row_for(self, key: Tuple[str, str]) -> int:
+        index = self._key_index.get(key)
+        if index is None:
+            index = len(self._keys)
+            self._keys.append(key)
+            self._key_index[key] = index
+            if index >= self._rate_sums.shape[0]:
+                # Grow geometrically so ingesting new users stays amortised O(1)
+                capacity = max(64, 2 * self._rate_sums.shape[0])
+                self._rate_sums = np.resize(self._rate_sums, (capacity, CELLS))
+                self._counts = np.resize(self._counts, (capacity, CELLS))
+                self._rate_sums[index:] = 0
+                self._counts[index:] = 0
+        return index
+
+    def _rebuild_snapshots(self):
+        """Recompute every served slot list from the histograms in a few array operations"""
+        size = len(self._keys)
+        sums = _smooth(self._rate_sums[:size])
+        counts = _smooth(self._counts[:size])
+
+        platforms = sorted({platform for _, platform in self._keys})
+        platform_of_row = np.array([platforms.index(platform) for _, platform in self._keys], dtype=int)
+
+        # Global prior per platform: pooled rates of every user on that platform
+        prior_sums = np.zeros((len(platforms), CELLS))
+        prior_counts = np.zeros((len(platforms), CELLS))
+        np.add.at(prior_sums, platform_of_row, sums)
+        np.add.at(prior_counts, platform_of_row, counts)
+        overall = prior_sums.sum(axis=1, keepdims=True) / np.maximum(prior_counts.sum(axis=1, keepdims=True), 1)
+        prior_rates = np.where(prior_counts > 0, prior_sums / np.maximum(prior_counts, 1e-9), overall)
+
+        # Shrink each user's cells toward the prior in proportion to how little data they have
+        m = self.prior_strength
+        posterior = (sums + m * prior_rates[platform_of_row]) / (counts + m)
+
+        self._platform_slots = {
+            platform: self._top_slots(prior_rates[i]) for i, platform in enumerate(platforms)
+        }
+        self._user_slots = {
+            key: self._top_slots(posterior[i]) for i, key in enumerate(self._keys)
+        }
+
+    def _top_slots(self, rates: np.ndarray) -> List[Dict]:
+        best = np.argsort(rates)[::-1][:self.top_n]
+        return [
+            {
+                'day': DAYS[cell // 24],
+                'time': f"{cell % 24:02d}:00",
+                'engagement_rate': round(float(rates[cell]), 4),
+                'day_index': int(cell // 24),
+                'hour': int(cell % 24)
+            }
+            for cell in best
+        ]
+
+def _settled_posts(until: datetime) -> Tuple:
+    """Filters of the published posts with impressions that settled by until"""
+    return (
+        SocialMediaPost.status == 'published',
+        SocialMediaPost.impressions > 0,
+        SocialMediaPost.published_time <= until
+    )
+
+def _smooth(matrix: np.ndarray) -> np.ndarray:
+    """Blend each hour with its neighbours; the week wraps around (Sunday 23:00 -> Monday 00:00)"""
+    return 0.5 * matrix + 0.25 * np.roll(matrix, 1, axis=1) + 0.25 * np.roll(matrix, -1, axis=1)
+
+# Global model instance, refreshed by the background job
+posting_time_model = PostingTimeModel()
+
+def start_posting_time_model(app, interval_seconds: int = 3600) -> PeriodicJob:
+    """Start a background job that folds newly settled posts into the model"""
+    return PeriodicJob('posting-time-model', interval_seconds, posting_time_model.update, app=app).start()
@@ -0,0 +1,295 @@
+"""
+Publish Dispatcher for AffiliateFlow SaaS Platform
+Publishes queued posts on background workers and broadcasts their status changes.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import update
+
+from src.models.content import db, SocialMediaPost
+from src.services.fair_queue import FairQueue
+from src.services.idempotency import PublishInProgressError, idempotency_store, publish_key
+from src.services.tenant_context import tenant_cache
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_PUBLISHING = 'publishing'
+IN_FLIGHT_STATUSES = (STATUS_QUEUED, STATUS_PUBLISHING)
+
+# Shortest wait before retrying a post whose publish attempt another worker holds
+IN_PROGRESS_RETRY_DELAY = timedelta(seconds=1)
+
+# Fair share of publish throughput per subscription tier, and how many of a
+# tenant's posts may be publishing at once. A tenant bursting thousands of
+# posts only ever occupies its cap, so other tenants' posts keep going out.
+TIER_QUEUE_POLICIES = {
+    'free': {'weight': 1, 'in_flight_cap': 1},
+    'starter': {'weight': 2, 'in_flight_cap': 2},
+    'professional': {'weight': 4, 'in_flight_cap': 3},
+    'enterprise': {'weight': 8, 'in_flight_cap': 4}
+}
+
+class StatusBroker:
+    """In-process pub/sub of post status events, one queue per subscriber
+
+    Subscribers only see events published in their own process, so the status
+    stream requires the API to run as a single process (as src/main.py does);
+    clients of other processes can still poll the status endpoint.
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: str) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id: str, subscriber: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id: str, event: Dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, []))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A stalled client must not block publishing; it can re-sync via the status endpoint
+                pass
+
+def status_event(post: SocialMediaPost, error: str = None) -> Dict:
+    event = {
+        'post_id': post.id,
+        'platform': post.platform,
+        'status': post.status,
+        'platform_post_id': post.platform_post_id,
+        'platform_url': post.platform_url,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    if error:
+        event['error'] = error
+    return event
+
+class PublishDispatcher:
+    """Worker pool publishing posts off the request path
+
+    Each worker thread runs its own asyncio event loop inside an app context,
+    so publishers can await platform I/O. Posts move queued -> publishing ->
+    published/failed, and every transition is pushed to the StatusBroker.
+    Work is taken from a FairQueue keyed by user_id and weighted by tier.
+    The queue lives in memory, so like the StatusBroker it assumes a single
+    API process; PublishAttempt keys still prevent double posting if several
+    processes re-queue the same in-flight posts on start.
+    """
+
+    def __init__(self, publish_func: Callable[[SocialMediaPost], Awaitable[Dict]] = None,
+                 broker: StatusBroker = None, workers: int = 8):
+        self.publish_func = publish_func
+        self.broker = broker or StatusBroker()
+        self.workers = workers
+        self.app = None
+        self._queue = FairQueue()
+        self._threads: List[threading.Thread] = []
+        self._retry_timers: Dict[int, threading.Timer] = {}
+        self._retry_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self, app, publish_func: Callable[[SocialMediaPost], Awaitable[Dict]] = None) -> 'PublishDispatcher':
+        self.app = app
+        if publish_func is not None:
+            self.publish_func = publish_func
+
+        self._stop_event.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run_worker, name=f'publish-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        # Posts queued before a restart are not in the in-memory queue any more
+        with app.app_context():
+            pending = db.session.query(SocialMediaPost.id, SocialMediaPost.user_id).filter(
+                SocialMediaPost.status.in_(IN_FLIGHT_STATUSES)
+            ).all()
+            for post_id, user_id in pending:
+                self._put(post_id, user_id)
+        if pending:
+            logger.info(f"Publish dispatcher: re-queued {len(pending)} in-flight posts")
+
+        return self
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        with self._retry_lock:
+            timers, self._retry_timers = list(self._retry_timers.values()), {}
+        for timer in timers:
+            timer.cancel()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, post: SocialMediaPost) -> bool:
+        """Mark a post queued and hand it to the workers; False if it is already in flight or published"""
+        queued = db.session.execute(
+            update(SocialMediaPost)
+            .where(
+                SocialMediaPost.id == post.id,
+                SocialMediaPost.status.notin_(IN_FLIGHT_STATUSES + ('published',))
+            )
+            .values(status=STATUS_QUEUED, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        db.session.refresh(post)
+
+        if not queued:
+            return False
+
+        self.broker.publish(post.user_id, status_event(post))
+        if self.running:
+            self._put(post.id, post.user_id)
+        else:
+            # Background jobs disabled (scripts, tests): publish inline
+            self._process(post.id)
+            db.session.refresh(post)
+        return True
+
+    def metrics(self, user_id: str = None) -> Dict:
+        """Per-tenant queue depth, in-flight count and wait/publish latency"""
+        return self._queue.metrics(user_id)
+
+    def _put(self, post_id: int, user_id: str):
+        policy = self._tenant_policy(user_id)
+        self._queue.put(user_id, post_id, weight=policy['weight'], cap=policy['in_flight_cap'])
+
+    def _tenant_policy(self, user_id: str) -> Dict:
+        tenant = tenant_cache.load(user_id)
+        tier = getattr(tenant.tier, 'value', tenant.tier) if tenant else 'free'
+        return TIER_QUEUE_POLICIES.get(tier, TIER_QUEUE_POLICIES['free'])
+
+    def _run_worker(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while not self._stop_event.is_set():
+                entry = self._queue.get(timeout=1)
+                if entry is None:
+                    continue
+
+                user_id, post_id, dequeued_at = entry
+                try:
+                    with self.app.app_context():
+                        self._process(post_id, loop)
+                except Exception as e:
+                    logger.error(f"Publish worker failed on post {post_id}: {str(e)}")
+                finally:
+                    self._queue.done(user_id, dequeued_at)
+        finally:
+            loop.close()
+
+    def _process(self, post_id: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        post = db.session.get(SocialMediaPost, post_id)
+        if post is None or post.status not in IN_FLIGHT_STATUSES:
+            return
+
+        self._set_status(post, STATUS_PUBLISHING)
+        error = None
+        try:
+            coroutine = idempotency_store.run_async(
+                publish_key(post.id, post.platform), post.platform, lambda: self.publish_func(post), post_id=post.id
+            )
+            if loop is None:
+                result, replayed = asyncio.run(coroutine)
+            else:
+                result, replayed = loop.run_until_complete(coroutine)
+        except PublishInProgressError:
+            self._wait_for_holder(post_id)
+            return
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Failed to publish post {post_id}: {error}")
+            post = db.session.get(SocialMediaPost, post_id)
+            self._set_status(post, 'failed', error)
+            return
+
+        db.session.refresh(post)
+        if replayed:
+            # Published by an earlier attempt; the post only needs its recorded outcome
+            self._apply_result(post, result)
+        self.broker.publish(post.user_id, status_event(post))
+
+    def _wait_for_holder(self, post_id: int):
+        """Another worker holds the post's publish attempt, e.g. one that died before a restart
+
+        Queue the post again once the holder's lease runs out: by then the
+        attempt is either finished (and replayed) or abandoned (and taken over).
+        Without workers to retry it, the post is marked failed so it can be
+        published again.
+        """
+        post = db.session.get(SocialMediaPost, post_id)
+        attempt = idempotency_store.get(publish_key(post.id, post.platform))
+        delay = IN_PROGRESS_RETRY_DELAY
+        if attempt is not None and attempt.lease_expires_at is not None:
+            delay = max(delay, attempt.lease_expires_at - datetime.utcnow() + IN_PROGRESS_RETRY_DELAY)
+
+        if not self.running:
+            self._set_status(post, 'failed', 'Another publish of this post is in progress; retry later')
+            return
+
+        self._set_status(post, STATUS_QUEUED)
+        logger.info(f"Post {post_id} is being published by another worker; retrying in {delay.total_seconds():.0f}s")
+        timer = threading.Timer(delay.total_seconds(), self._retry, args=(post.id, post.user_id))
+        timer.daemon = True
+        with self._retry_lock:
+            previous = self._retry_timers.pop(post.id, None)
+            self._retry_timers[post.id] = timer
+        if previous is not None:
+            previous.cancel()
+        timer.start()
+
+    def _retry(self, post_id: int, user_id: str):
+        with self._retry_lock:
+            self._retry_timers.pop(post_id, None)
+        if self._stop_event.is_set():
+            return
+        try:
+            with self.app.app_context():
+                self._put(post_id, user_id)
+        except Exception as e:
+            logger.error(f"Failed to re-queue post {post_id}: {str(e)}")
+
+    def _apply_result(self, post: SocialMediaPost, result: Optional[Dict]):
+        result = result or {}
+        post.status = 'published' if result.get('success', True) else 'failed'
+        post.platform_post_id = result.get('platform_post_id') or post.platform_post_id
+        post.platform_url = result.get('platform_url') or post.platform_url
+        if post.status == 'published' and post.published_time is None:
+            post.published_time = datetime.utcnow()
+        db.session.commit()
+
+    def _set_status(self, post: SocialMediaPost, status: str, error: str = None):
+        post.status = status
+        db.session.commit()
+        self.broker.publish(post.user_id, status_event(post, error))
+
+# Global dispatcher instance; the social media routes supply the publish function
+publish_dispatcher = PublishDispatcher()
@@ -0,0 +1,221 @@
+"""
+Post Slot Allocator for AffiliateFlow SaaS Platform
+Spreads scheduled posts over capacity-bounded time buckets near their target times.
+"""
+
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, case, cast, extract, func, literal_column, update
+
+from src.models.content import db, SocialMediaPost
+
+logger = logging.getLogger(__name__)
+
+BUCKET_MINUTES = 5
+
+# How far before/after its target time a post may be moved to find a free bucket
+SEARCH_WINDOW = timedelta(minutes=90)
+
+# If every bucket in the window is full, keep looking forward this far
+MAX_DEFERRAL = timedelta(days=2)
+
+# Posts all tenants together may publish on a platform per bucket (publisher throughput)
+PLATFORM_BUCKET_CAPACITY = {
+    'twitter': 150,
+    'facebook': 200,
+    'instagram': 100,
+    'linkedin': 100,
+    'pinterest': 100,
+    'tiktok': 50,
+    'youtube': 25
+}
+DEFAULT_BUCKET_CAPACITY = 100
+
+# Posts a single account may publish per hour on each platform
+ACCOUNT_HOURLY_LIMITS = {
+    'twitter': 5,
+    'facebook': 4,
+    'instagram': 2,
+    'linkedin': 2,
+    'pinterest': 10,
+    'tiktok': 3,
+    'youtube': 1
+}
+DEFAULT_ACCOUNT_HOURLY_LIMIT = 4
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Existing-load lookup: scheduled posts in a time span
+db.Index('ix_social_media_posts_status_scheduled', SocialMediaPost.status, SocialMediaPost.scheduled_time)
+
+class NoSlotAvailable(Exception):
+    """Some posts have no bucket with room within MAX_DEFERRAL of their target time"""
+
+    def __init__(self, keys: List[Hashable]):
+        super().__init__(f'No free publishing slot near the requested time for {len(keys)} post(s); choose a later time')
+        self.keys = keys
+
+@dataclass
+class SlotRequest:
+    key: Hashable  # post ID, or any caller key for posts not inserted yet
+    user_id: str
+    platform: str
+    target: datetime
+    allow_earlier: bool = True  # False when the user picked the time and it must not move earlier
+
+class SlotAllocator:
+    """Assigns publish times so no bucket, platform or account exceeds its capacity"""
+
+    def __init__(self, bucket_minutes: int = BUCKET_MINUTES, search_window: timedelta = SEARCH_WINDOW,
+                 rng: random.Random = None):
+        self.bucket_seconds = bucket_minutes * 60
+        self.window_buckets = int(search_window.total_seconds() // self.bucket_seconds)
+        self.max_deferral_buckets = int(MAX_DEFERRAL.total_seconds() // self.bucket_seconds)
+        self.rng = rng or random.Random()
+
+    def allocate(self, requests: List[SlotRequest], now: datetime = None,
+                 exclude_ids: Iterable[int] = ()) -> Dict[Hashable, datetime]:
+        """Pick a jittered publish time for every request, honouring existing schedules
+
+        Raises NoSlotAvailable, without assigning anything, when a request's
+        platform or account is full for the whole deferral window.
+        """
+        if not requests:
+            return {}
+
+        now = now or datetime.utcnow()
+        earliest_bucket = self._bucket(now) + 1
+        platform_load, account_load = self._load_existing(requests, exclude_ids)
+
+        assignments = {}
+        unplaced = []
+        for request in sorted(requests, key=lambda r: r.target):
+            target_bucket = max(self._bucket(request.target), earliest_bucket)
+            bucket = self._find_bucket(request, target_bucket, earliest_bucket, platform_load, account_load)
+            if bucket is None:
+                unplaced.append(request.key)
+                continue
+
+            platform_load[(request.platform, bucket)] += 1
+            account_load[(request.user_id, request.platform, self._hour(bucket))] += 1
+
+            # Jitter within the bucket so posts sharing a bucket do not fire on the same second;
+            # a post that must not move earlier is only jittered past its target
+            bucket_start = bucket * self.bucket_seconds
+            earliest_offset = 0.0
+            if not request.allow_earlier:
+                earliest_offset = max((request.target - _EPOCH).total_seconds() - bucket_start, 0.0)
+            offset = earliest_offset + self.rng.random() * (self.bucket_seconds - earliest_offset)
+            assignments[request.key] = _EPOCH + timedelta(seconds=bucket_start + offset)
+
+        if unplaced:
+            logger.warning('No free slot for %d of %d posts within %s of their targets', len(unplaced), len(requests), MAX_DEFERRAL)
+            raise NoSlotAvailable(unplaced)
+        return assignments
+
+    def _find_bucket(self, request: SlotRequest, target_bucket: int, earliest_bucket: int,
+                     platform_load: Dict, account_load: Dict) -> Optional[int]:
+        platform_capacity = PLATFORM_BUCKET_CAPACITY.get(request.platform, DEFAULT_BUCKET_CAPACITY)
+        account_limit = ACCOUNT_HOURLY_LIMITS.get(request.platform, DEFAULT_ACCOUNT_HOURLY_LIMIT)
+
+        def has_room(bucket: int) -> bool:
+            return (bucket >= earliest_bucket
+                    and platform_load[(request.platform, bucket)] < platform_capacity
+                    and account_load[(request.user_id, request.platform, self._hour(bucket))] < account_limit)
+
+        # Nearest buckets first: target, +1, -1, +2, -2, ...
+        for distance in range(self.window_buckets + 1):
+            candidates = (target_bucket + distance, target_bucket - distance) if request.allow_earlier else (target_bucket + distance,)
+            for bucket in candidates:
+                if has_room(bucket):
+                    return bucket
+
+        for bucket in range(target_bucket + self.window_buckets + 1, target_bucket + self.max_deferral_buckets):
+            if has_room(bucket):
+                return bucket
+
+        return None
+
+    def _load_existing(self, requests: List[SlotRequest], exclude_ids: Iterable[int]) -> Tuple[Dict, Dict]:
+        """Count posts already scheduled in the time span the batch may be placed in
+
+        Counting happens in the database: posts per platform and bucket for all
+        tenants, and posts per platform and hour for the batch's own accounts.
+        """
+        span_start = min(r.target for r in requests) - timedelta(seconds=(self.window_buckets + 1) * self.bucket_seconds)
+        span_end = max(r.target for r in requests) + timedelta(seconds=(self.max_deferral_buckets + 1) * self.bucket_seconds)
+        platforms = {r.platform for r in requests}
+        user_ids = {r.user_id for r in requests}
+        exclude_ids = list(exclude_ids)
+
+        seconds = self._epoch_seconds(SocialMediaPost.scheduled_time)
+        # Divisors are inlined so the grouped expression matches the selected one on PostgreSQL
+        bucket = (seconds // literal_column(str(self.bucket_seconds))).label('bucket')
+        hour = (seconds // literal_column('3600')).label('hour')
+
+        def scheduled(*columns):
+            query = db.session.query(*columns, func.count()).filter(
+                SocialMediaPost.status == 'scheduled',
+                SocialMediaPost.platform.in_(platforms),
+                SocialMediaPost.scheduled_time >= span_start,
+                SocialMediaPost.scheduled_time < span_end
+            )
+            if exclude_ids:
+                query = query.filter(SocialMediaPost.id.notin_(exclude_ids))
+            return query.group_by(*columns)
+
+        platform_load = defaultdict(int)
+        for platform, bucket_number, count in scheduled(SocialMediaPost.platform, bucket):
+            platform_load[(platform, int(bucket_number))] = count
+
+        account_load = defaultdict(int)
+        account_rows = scheduled(SocialMediaPost.user_id, SocialMediaPost.platform, hour).filter(
+            SocialMediaPost.user_id.in_(user_ids)
+        )
+        for user_id, platform, hour_number, count in account_rows:
+            account_load[(user_id, platform, int(hour_number))] = count
+        return platform_load, account_load
+
+    @staticmethod
+    def _epoch_seconds(column):
+        """Whole seconds since the epoch of a naive UTC timestamp column, as an integer"""
+        seconds = extract('epoch', column)
+        if db.session.get_bind().dialect.name != 'sqlite':
+            # SQLite's strftime('%s') is already whole seconds; PostgreSQL's epoch keeps the fraction
+            seconds = func.floor(seconds)
+        return cast(seconds, BigInteger)
+
+    def _bucket(self, moment: datetime) -> int:
+        return int((moment - _EPOCH).total_seconds() // self.bucket_seconds)
+
+    def _hour(self, bucket: int) -> int:
+        return bucket * self.bucket_seconds // 3600
+
+def schedule_posts(requests: List[SlotRequest], now: datetime = None, allocator: SlotAllocator = None) -> Dict[int, datetime]:
+    """Allocate slots for existing posts and apply them with a single UPDATE statement
+
+    Nothing is updated when some post cannot be placed (NoSlotAvailable).
+    """
+    allocator = allocator or SlotAllocator()
+    post_ids = [request.key for request in requests]
+    assignments = allocator.allocate(requests, now=now, exclude_ids=post_ids)
+    if not assignments:
+        return assignments
+
+    db.session.execute(
+        update(SocialMediaPost)
+        .where(SocialMediaPost.id.in_(list(assignments)))
+        .values(
+            scheduled_time=case(assignments, value=SocialMediaPost.id),
+            status='scheduled',
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return assignments
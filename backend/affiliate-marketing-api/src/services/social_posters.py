@@ -0,0 +1,445 @@
+"""
+Social Media Platform Posters for AffiliateFlow SaaS Platform
+One poster per platform. Loaded on first use through the registry in
+social_media_service, and each poster imports its platform SDK only when it
+first talks to the platform, so processes that never post never pay for them.
+"""
+
+import importlib
+import json
+import os
+from typing import Dict, List
+
+import requests
+
+# Graph API analytics timeouts (seconds): connecting, and waiting for the response
+FACEBOOK_CONNECT_TIMEOUT = float(os.getenv('FACEBOOK_CONNECT_TIMEOUT', '5'))
+FACEBOOK_READ_TIMEOUT = float(os.getenv('FACEBOOK_READ_TIMEOUT', '30'))
+
+def _sdk(module_name: str):
+    """Import a platform SDK on first use; later calls hit the sys.modules cache"""
+    return importlib.import_module(module_name)
+
+class BasePoster:
+    """Base class for social media platform posters"""
+    
+    # Whether get_analytics is implemented; the analytics collector skips other platforms
+    supports_analytics = False
+    
+    # Maximum number of posts fetched per get_analytics_batch call
+    analytics_batch_size = 25
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        raise NotImplementedError
+    
+    def get_analytics(self, post_id: str, credentials: Dict) -> Dict:
+        raise NotImplementedError
+    
+    def get_analytics_batch(self, post_ids: List[str], credentials: Dict) -> Dict[str, Dict]:
+        """Get analytics for several posts; platforms with a batch API override this"""
+        results = {}
+        for post_id in post_ids:
+            analytics = self.get_analytics(post_id, credentials)
+            if analytics:
+                results[post_id] = analytics
+        return results
+    
+    def validate_credentials(self, credentials: Dict) -> bool:
+        raise NotImplementedError
+
+class FacebookPoster(BasePoster):
+    """Facebook posting implementation"""
+    
+    supports_analytics = True
+    
+    # Graph API accepts up to 50 sub-requests per batch call
+    analytics_batch_size = 50
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        access_token = credentials.get('access_token')
+        page_id = credentials.get('page_id')
+        
+        if not access_token or not page_id:
+            raise ValueError("Facebook access token and page ID required")
+        
+        url = f"https://graph.facebook.com/v18.0/{page_id}/feed"
+        
+        data = {
+            'message': content['text'],
+            'access_token': access_token
+        }
+        
+        # Add image if provided
+        if content.get('image_url'):
+            data['link'] = content['image_url']
+        
+        # Add video if provided
+        if content.get('video_url'):
+            data['source'] = content['video_url']
+        
+        aiohttp = _sdk('aiohttp')
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, data=data) as response:
+                result = await response.json()
+                
+                if response.status == 200:
+                    return {
+                        'id': result['id'],
+                        'url': f"https://facebook.com/{page_id}/posts/{result['id'].split('_')[1]}"
+                    }
+                else:
+                    raise Exception(f"Facebook API error: {result.get('error', {}).get('message', 'Unknown error')}")
+    
+    def get_analytics(self, post_id: str, credentials: Dict) -> Dict:
+        access_token = credentials.get('access_token')
+        
+        url = f"https://graph.facebook.com/v18.0/{post_id}/insights"
+        params = {
+            'metric': 'post_impressions,post_engaged_users,post_clicks',
+            'access_token': access_token
+        }
+        
+        response = requests.get(url, params=params, timeout=(FACEBOOK_CONNECT_TIMEOUT, FACEBOOK_READ_TIMEOUT))
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                'impressions': data.get('data', [{}])[0].get('values', [{}])[0].get('value', 0),
+                'engagement': data.get('data', [{}])[1].get('values', [{}])[0].get('value', 0),
+                'clicks': data.get('data', [{}])[2].get('values', [{}])[0].get('value', 0)
+            }
+        return {}
+    
+    def get_analytics_batch(self, post_ids: List[str], credentials: Dict) -> Dict[str, Dict]:
+        """Fetch engagement for up to 50 posts in one Graph API batch request"""
+        access_token = credentials.get('access_token')
+        
+        batch = [
+            {
+                'method': 'GET',
+                'relative_url': f"{post_id}?fields=shares,likes.summary(true).limit(0),"
+                                f"comments.summary(true).limit(0),"
+                                f"insights.metric(post_impressions,post_impressions_unique,post_clicks)"
+            }
+            for post_id in post_ids[:self.analytics_batch_size]
+        ]
+        
+        response = requests.post(
+            "https://graph.facebook.com/v18.0/",
+            data={
+                'access_token': access_token,
+                'batch': json.dumps(batch),
+                'include_headers': 'false'
+            },
+            timeout=(FACEBOOK_CONNECT_TIMEOUT, FACEBOOK_READ_TIMEOUT)
+        )
+        if response.status_code != 200:
+            raise Exception(f"Facebook batch API error: {response.text}")
+        
+        results = {}
+        for post_id, item in zip(post_ids, response.json()):
+            # Failed sub-requests come back as null or with a non-200 code
+            if not item or item.get('code') != 200:
+                continue
+            
+            body = json.loads(item['body'])
+            insights = {
+                metric['name']: metric.get('values', [{}])[0].get('value', 0)
+                for metric in body.get('insights', {}).get('data', [])
+            }
+            results[post_id] = {
+                'likes': body.get('likes', {}).get('summary', {}).get('total_count', 0),
+                'comments': body.get('comments', {}).get('summary', {}).get('total_count', 0),
+                'shares': body.get('shares', {}).get('count', 0),
+                'impressions': insights.get('post_impressions', 0),
+                'reach': insights.get('post_impressions_unique', 0),
+                'clicks': insights.get('post_clicks', 0)
+            }
+        
+        return results
+
+class InstagramPoster(BasePoster):
+    """Instagram posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        access_token = credentials.get('access_token')
+        user_id = credentials.get('user_id')
+        
+        if not access_token or not user_id:
+            raise ValueError("Instagram access token and user ID required")
+        
+        # Instagram requires media to be uploaded first
+        if content.get('image_url'):
+            # Create media container
+            container_url = f"https://graph.facebook.com/v18.0/{user_id}/media"
+            container_data = {
+                'image_url': content['image_url'],
+                'caption': content['text'],
+                'access_token': access_token
+            }
+            
+            aiohttp = _sdk('aiohttp')
+            async with aiohttp.ClientSession() as session:
+                async with session.post(container_url, data=container_data) as response:
+                    container_result = await response.json()
+                    
+                    if response.status != 200:
+                        raise Exception(f"Instagram container creation error: {container_result.get('error', {}).get('message', 'Unknown error')}")
+                    
+                    container_id = container_result['id']
+                    
+                    # Publish media
+                    publish_url = f"https://graph.facebook.com/v18.0/{user_id}/media_publish"
+                    publish_data = {
+                        'creation_id': container_id,
+                        'access_token': access_token
+                    }
+                    
+                    async with session.post(publish_url, data=publish_data) as publish_response:
+                        publish_result = await publish_response.json()
+                        
+                        if publish_response.status == 200:
+                            return {
+                                'id': publish_result['id'],
+                                'url': f"https://instagram.com/p/{publish_result['id']}"
+                            }
+                        else:
+                            raise Exception(f"Instagram publish error: {publish_result.get('error', {}).get('message', 'Unknown error')}")
+        
+        raise ValueError("Instagram posts require an image")
+
+class TwitterPoster(BasePoster):
+    """Twitter/X posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        api_key = credentials.get('api_key')
+        api_secret = credentials.get('api_secret')
+        access_token = credentials.get('access_token')
+        access_token_secret = credentials.get('access_token_secret')
+        
+        if not all([api_key, api_secret, access_token, access_token_secret]):
+            raise ValueError("Twitter API credentials incomplete")
+        
+        # Using Twitter API v2
+        tweepy = _sdk('tweepy')
+        auth = tweepy.OAuth1UserHandler(
+            api_key, api_secret, access_token, access_token_secret
+        )
+        api = tweepy.API(auth)
+        client = tweepy.Client(
+            consumer_key=api_key,
+            consumer_secret=api_secret,
+            access_token=access_token,
+            access_token_secret=access_token_secret
+        )
+        
+        try:
+            # Upload media if provided
+            media_ids = []
+            if content.get('image_url'):
+                # Download and upload image
+                image_response = requests.get(content['image_url'])
+                if image_response.status_code == 200:
+                    media = api.media_upload(filename="temp_image.jpg", file=image_response.content)
+                    media_ids.append(media.media_id)
+            
+            # Post tweet
+            tweet = client.create_tweet(
+                text=content['text'][:280],  # Twitter character limit
+                media_ids=media_ids if media_ids else None
+            )
+            
+            return {
+                'id': tweet.data['id'],
+                'url': f"https://twitter.com/user/status/{tweet.data['id']}"
+            }
+            
+        except Exception as e:
+            raise Exception(f"Twitter API error: {str(e)}")
+
+class LinkedInPoster(BasePoster):
+    """LinkedIn posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        access_token = credentials.get('access_token')
+        person_id = credentials.get('person_id')
+        
+        if not access_token or not person_id:
+            raise ValueError("LinkedIn access token and person ID required")
+        
+        url = "https://api.linkedin.com/v2/ugcPosts"
+        
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json',
+            'X-Restli-Protocol-Version': '2.0.0'
+        }
+        
+        post_data = {
+            "author": f"urn:li:person:{person_id}",
+            "lifecycleState": "PUBLISHED",
+            "specificContent": {
+                "com.linkedin.ugc.ShareContent": {
+                    "shareCommentary": {
+                        "text": content['text']
+                    },
+                    "shareMediaCategory": "NONE"
+                }
+            },
+            "visibility": {
+                "com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"
+            }
+        }
+        
+        # Add media if provided
+        if content.get('image_url'):
+            post_data["specificContent"]["com.linkedin.ugc.ShareContent"]["shareMediaCategory"] = "IMAGE"
+            post_data["specificContent"]["com.linkedin.ugc.ShareContent"]["media"] = [
+                {
+                    "status": "READY",
+                    "description": {
+                        "text": content.get('image_alt', '')
+                    },
+                    "media": content['image_url']
+                }
+            ]
+        
+        aiohttp = _sdk('aiohttp')
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, headers=headers, json=post_data) as response:
+                if response.status == 201:
+                    result = await response.json()
+                    post_id = result['id']
+                    return {
+                        'id': post_id,
+                        'url': f"https://linkedin.com/feed/update/{post_id}"
+                    }
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"LinkedIn API error: {error_text}")
+
+class TikTokPoster(BasePoster):
+    """TikTok posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        # TikTok API implementation would go here
+        # Note: TikTok's API has strict requirements and approval process
+        raise NotImplementedError("TikTok posting requires approved developer account")
+
+class YouTubePoster(BasePoster):
+    """YouTube posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        # YouTube API implementation for video uploads would go here
+        raise NotImplementedError("YouTube posting requires video content")
+
+class PinterestPoster(BasePoster):
+    """Pinterest posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        access_token = credentials.get('access_token')
+        board_id = credentials.get('board_id')
+        
+        if not access_token or not board_id:
+            raise ValueError("Pinterest access token and board ID required")
+        
+        url = "https://api.pinterest.com/v5/pins"
+        
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json'
+        }
+        
+        pin_data = {
+            'board_id': board_id,
+            'description': content['text'],
+            'link': content.get('link_url', ''),
+            'media_source': {
+                'source_type': 'image_url',
+                'url': content.get('image_url', '')
+            }
+        }
+        
+        aiohttp = _sdk('aiohttp')
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, headers=headers, json=pin_data) as response:
+                if response.status == 201:
+                    result = await response.json()
+                    return {
+                        'id': result['id'],
+                        'url': result['url']
+                    }
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Pinterest API error: {error_text}")
+
+class RedditPoster(BasePoster):
+    """Reddit posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        # Reddit API implementation would go here
+        # Requires careful handling of subreddit rules and rate limits
+        raise NotImplementedError("Reddit posting requires subreddit-specific implementation")
+
+class TelegramPoster(BasePoster):
+    """Telegram posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        bot_token = credentials.get('bot_token')
+        chat_id = credentials.get('chat_id')
+        
+        if not bot_token or not chat_id:
+            raise ValueError("Telegram bot token and chat ID required")
+        
+        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        
+        data = {
+            'chat_id': chat_id,
+            'text': content['text'],
+            'parse_mode': 'HTML'
+        }
+        
+        aiohttp = _sdk('aiohttp')
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=data) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    message_id = result['result']['message_id']
+                    return {
+                        'id': str(message_id),
+                        'url': f"https://t.me/{chat_id}/{message_id}"
+                    }
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Telegram API error: {error_text}")
+
+class DiscordPoster(BasePoster):
+    """Discord posting implementation"""
+    
+    async def post(self, content: Dict, credentials: Dict) -> Dict:
+        webhook_url = credentials.get('webhook_url')
+        
+        if not webhook_url:
+            raise ValueError("Discord webhook URL required")
+        
+        data = {
+            'content': content['text']
+        }
+        
+        # Add embed if image provided
+        if content.get('image_url'):
+            data['embeds'] = [{
+                'image': {'url': content['image_url']},
+                'description': content.get('image_alt', '')
+            }]
+        
+        aiohttp = _sdk('aiohttp')
+        async with aiohttp.ClientSession() as session:
+            async with session.post(webhook_url, json=data) as response:
+                if response.status == 204:
+                    return {
+                        'id': 'discord_message',
+                        'url': webhook_url
+                    }
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Discord webhook error: {error_text}")
@@ -6,11 +6,20 @@ Handles all payment processing, subscription management, and billing operations.
 import stripe
 import os
 import logging
+import asyncio
+import functools
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Awaitable, Callable, Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.event_loop import BackgroundLoop
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,6 +27,38 @@ logger = logging.getLogger(__name__)
 # Initialize Stripe with secret key
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY', 'sk_test_...')
 
+# Stripe API connection settings: per-request timeouts (seconds), pooled connections and
+# concurrent calls, and SDK retries of failed requests (each retry gets the full timeouts)
+STRIPE_CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', '5'))
+STRIPE_READ_TIMEOUT = float(os.getenv('STRIPE_READ_TIMEOUT', '30'))
+STRIPE_POOL_SIZE = int(os.getenv('STRIPE_POOL_SIZE', '10'))
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', '2'))
+
+# Longest a route waits for a Stripe operation before giving up on it
+STRIPE_OPERATION_TIMEOUT = float(os.getenv('STRIPE_OPERATION_TIMEOUT', '60'))
+
+# Per-call limit of the concurrent billing page fetches; a slow call is reported, not waited on
+STRIPE_FETCH_TIMEOUT = float(os.getenv('STRIPE_FETCH_TIMEOUT', '10'))
+# Threads for those fetches, kept apart so calls abandoned at the timeout cannot starve other Stripe work
+STRIPE_FETCH_POOL_SIZE = int(os.getenv('STRIPE_FETCH_POOL_SIZE', '8'))
+
+def _create_http_client() -> stripe.RequestsClient:
+    """Stripe HTTP client on one keep-alive connection pool shared by all threads"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=STRIPE_POOL_SIZE))
+    return stripe.RequestsClient(timeout=(STRIPE_CONNECT_TIMEOUT, STRIPE_READ_TIMEOUT), session=session)
+
+stripe.default_http_client = _create_http_client()
+stripe.max_network_retries = STRIPE_MAX_NETWORK_RETRIES
+
+def to_plain(value: Any) -> Any:
+    """Stripe objects and lists as plain, JSON-serializable dicts and lists"""
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
 class SubscriptionTier(Enum):
     FREE = "free"
     STARTER = "starter"
@@ -36,11 +77,50 @@ class PricingPlan:
     limits: Dict[str, int]
 
 class StripeService:
-    """Comprehensive Stripe integration for AffiliateFlow SaaS platform"""
+    """Comprehensive Stripe integration for AffiliateFlow SaaS platform
+    
+    The async methods run on one long-lived event loop; their blocking SDK
+    calls go to a thread pool sized to the HTTP connection pool. Synchronous
+    callers use run().
+    """
     
     def __init__(self):
         self.pricing_plans = self._initialize_pricing_plans()
         self.webhook_secret = os.getenv('STRIPE_WEBHOOK_SECRET', 'whsec_...')
+        self._executor = ThreadPoolExecutor(max_workers=STRIPE_POOL_SIZE, thread_name_prefix='stripe')
+        self._fetch_executor = ThreadPoolExecutor(max_workers=STRIPE_FETCH_POOL_SIZE, thread_name_prefix='stripe-fetch')
+        self._loop = BackgroundLoop('stripe', self._executor)
+    
+    def run(self, coroutine: Awaitable, timeout: float = STRIPE_OPERATION_TIMEOUT) -> Any:
+        """Run one of the async methods from synchronous code, e.g. a Flask view"""
+        return self._loop.run(coroutine, timeout)
+    
+    async def _call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking Stripe SDK call on the executor without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def _write(self, func: Callable, operation: str, idempotency_key: Optional[str], *args, **kwargs) -> Any:
+        """Run a Stripe write under an Idempotency-Key, so Stripe applies it at most once per key
+        
+        A run() that times out leaves the call running, and it may still
+        succeed. Callers that retry with the same idempotency_key get that
+        write's result back instead of a second write; without one, each call
+        gets a fresh key, which still covers the SDK's own network retries.
+        """
+        key = f"{operation}:{idempotency_key or uuid.uuid4()}"
+        return await self._call(func, *args, idempotency_key=key, **kwargs)
+    
+    async def _fetch(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a read for a timed fan-out on the fetch executor, without SDK retries
+        
+        A call the caller stopped waiting for still holds its thread until the
+        HTTP read timeout; retrying it past the deadline would hold it longer.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._fetch_executor, functools.partial(func, *args, max_network_retries=0, **kwargs)
+        )
     
     def _initialize_pricing_plans(self) -> Dict[SubscriptionTier, PricingPlan]:
         """Initialize all pricing plans with Stripe price IDs"""
@@ -136,10 +216,14 @@ class StripeService:
             )
         }
     
-    async def create_customer(self, user_id: str, email: str, name: str = None) -> Dict[str, Any]:
+    async def create_customer(self, user_id: str, email: str, name: str = None,
+                              idempotency_key: str = None) -> Dict[str, Any]:
         """Create a new Stripe customer"""
         try:
-            customer = stripe.Customer.create(
+            customer = await self._write(
+                stripe.Customer.create,
+                'create-customer',
+                idempotency_key,
                 email=email,
                 name=name,
                 metadata={
@@ -167,7 +251,8 @@ class StripeService:
         tier: SubscriptionTier, 
         billing_cycle: str = 'monthly',
         success_url: str = None,
-        cancel_url: str = None
+        cancel_url: str = None,
+        idempotency_key: str = None
     ) -> Dict[str, Any]:
         """Create a Stripe Checkout session for subscription"""
         try:
@@ -182,7 +267,10 @@ class StripeService:
             price_id = (plan.stripe_price_id_yearly if billing_cycle == 'yearly' 
                        else plan.stripe_price_id_monthly)
             
-            session = stripe.checkout.Session.create(
+            session = await self._write(
+                stripe.checkout.Session.create,
+                'create-checkout-session',
+                idempotency_key,
                 customer=customer_id,
                 payment_method_types=['card'],
                 line_items=[{
@@ -222,7 +310,8 @@ class StripeService:
         self, 
         customer_id: str, 
         tier: SubscriptionTier, 
-        billing_cycle: str = 'monthly'
+        billing_cycle: str = 'monthly',
+        idempotency_key: str = None
     ) -> Dict[str, Any]:
         """Create a subscription directly (for API usage)"""
         try:
@@ -239,7 +328,10 @@ class StripeService:
             price_id = (plan.stripe_price_id_yearly if billing_cycle == 'yearly' 
                        else plan.stripe_price_id_monthly)
             
-            subscription = stripe.Subscription.create(
+            subscription = await self._write(
+                stripe.Subscription.create,
+                'create-subscription',
+                idempotency_key,
                 customer=customer_id,
                 items=[{
                     'price': price_id,
@@ -270,22 +362,26 @@ class StripeService:
         self, 
         subscription_id: str, 
         new_tier: SubscriptionTier, 
-        billing_cycle: str = 'monthly'
+        billing_cycle: str = 'monthly',
+        idempotency_key: str = None
     ) -> Dict[str, Any]:
         """Update an existing subscription (upgrade/downgrade)"""
         try:
             if subscription_id.startswith('free_'):
                 # Upgrading from free tier
                 customer_id = subscription_id.replace('free_', '')
-                return await self.create_subscription(customer_id, new_tier, billing_cycle)
+                return await self.create_subscription(customer_id, new_tier, billing_cycle, idempotency_key)
             
-            subscription = stripe.Subscription.retrieve(subscription_id)
+            subscription = await self._call(stripe.Subscription.retrieve, subscription_id)
             plan = self.pricing_plans[new_tier]
             
             price_id = (plan.stripe_price_id_yearly if billing_cycle == 'yearly' 
                        else plan.stripe_price_id_monthly)
             
-            updated_subscription = stripe.Subscription.modify(
+            updated_subscription = await self._write(
+                stripe.Subscription.modify,
+                'update-subscription',
+                idempotency_key,
                 subscription_id,
                 items=[{
                     'id': subscription['items']['data'][0].id,
@@ -312,7 +408,8 @@ class StripeService:
                 'error': str(e)
             }
     
-    async def cancel_subscription(self, subscription_id: str, at_period_end: bool = True) -> Dict[str, Any]:
+    async def cancel_subscription(self, subscription_id: str, at_period_end: bool = True,
+                                  idempotency_key: str = None) -> Dict[str, Any]:
         """Cancel a subscription"""
         try:
             if subscription_id.startswith('free_'):
@@ -322,12 +419,15 @@ class StripeService:
                 }
             
             if at_period_end:
-                subscription = stripe.Subscription.modify(
+                subscription = await self._write(
+                    stripe.Subscription.modify,
+                    'cancel-subscription',
+                    idempotency_key,
                     subscription_id,
                     cancel_at_period_end=True
                 )
             else:
-                subscription = stripe.Subscription.delete(subscription_id)
+                subscription = await self._write(stripe.Subscription.delete, 'delete-subscription', idempotency_key, subscription_id)
             
             logger.info(f"Cancelled subscription {subscription_id}")
             return {
@@ -356,7 +456,7 @@ class StripeService:
                     'cancel_at_period_end': False
                 }
             
-            subscription = stripe.Subscription.retrieve(subscription_id)
+            subscription = await self._call(stripe.Subscription.retrieve, subscription_id)
             
             return {
                 'success': True,
@@ -376,10 +476,14 @@ class StripeService:
                 'error': str(e)
             }
     
-    async def create_billing_portal_session(self, customer_id: str, return_url: str = None) -> Dict[str, Any]:
+    async def create_billing_portal_session(self, customer_id: str, return_url: str = None,
+                                            idempotency_key: str = None) -> Dict[str, Any]:
         """Create a billing portal session for customer self-service"""
         try:
-            session = stripe.billing_portal.Session.create(
+            session = await self._write(
+                stripe.billing_portal.Session.create,
+                'create-billing-portal-session',
+                idempotency_key,
                 customer=customer_id,
                 return_url=return_url or 'https://affiliateflow.com/dashboard'
             )
@@ -485,34 +589,46 @@ class StripeService:
         
         return {'success': True, 'message': 'Payment failure handled'}
     
-    async def get_usage_and_billing(self, customer_id: str) -> Dict[str, Any]:
-        """Get customer usage and billing information"""
-        try:
-            # Get customer details
-            customer = stripe.Customer.retrieve(customer_id)
-            
-            # Get active subscription
-            subscriptions = stripe.Subscription.list(customer=customer_id, status='active')
-            
-            # Get recent invoices
-            invoices = stripe.Invoice.list(customer=customer_id, limit=10)
-            
-            # Get payment methods
-            payment_methods = stripe.PaymentMethod.list(customer=customer_id, type='card')
-            
-            return {
-                'success': True,
-                'customer': customer,
-                'subscriptions': subscriptions.data,
-                'invoices': invoices.data,
-                'payment_methods': payment_methods.data
-            }
-        except stripe.error.StripeError as e:
-            logger.error(f"Failed to get usage and billing: {str(e)}")
+    async def get_usage_and_billing(self, customer_id: str, timeout: float = STRIPE_FETCH_TIMEOUT) -> Dict[str, Any]:
+        """Get customer usage and billing information
+        
+        The four Stripe calls run concurrently, each with its own timeout, so
+        the response takes as long as the slowest one. A failed call leaves its
+        field empty (None for the customer, [] for lists) and is listed in
+        'errors'; success is False only when every call failed.
+        """
+        fetches = {
+            'customer': self._fetch(stripe.Customer.retrieve, customer_id),
+            'subscriptions': self._fetch(stripe.Subscription.list, customer=customer_id, status='active'),
+            'invoices': self._fetch(stripe.Invoice.list, customer=customer_id, limit=10),
+            'payment_methods': self._fetch(stripe.PaymentMethod.list, customer=customer_id, type='card')
+        }
+        results = await asyncio.gather(
+            *[asyncio.wait_for(fetch, timeout) for fetch in fetches.values()],
+            return_exceptions=True
+        )
+        
+        response = {'success': True}
+        errors = {}
+        for field, result in zip(fetches, results):
+            if isinstance(result, Exception):
+                errors[field] = f"Timed out after {timeout}s" if isinstance(result, asyncio.TimeoutError) else str(result)
+                logger.error(f"Failed to get {field} for customer {customer_id}: {errors[field]}")
+                response[field] = None if field == 'customer' else []
+            elif field == 'customer':
+                response[field] = to_plain(result)
+            else:
+                response[field] = to_plain(result.data)
+        
+        if len(errors) == len(fetches):
             return {
                 'success': False,
-                'error': str(e)
+                'error': errors['customer'],
+                'errors': errors
             }
+        
+        response['errors'] = errors
+        return response
     
     def get_pricing_plans(self) -> Dict[str, Any]:
         """Get all available pricing plans"""
@@ -537,13 +653,19 @@ class StripeService:
                     continue
                 
                 # Create product
-                product = stripe.Product.create(
+                product = await self._write(
+                    stripe.Product.create,
+                    'create-product',
+                    None,
                     name=f"AffiliateFlow {plan.name}",
                     description=f"AffiliateFlow {plan.name} subscription tier"
                 )
                 
                 # Create monthly price
-                monthly_price = stripe.Price.create(
+                monthly_price = await self._write(
+                    stripe.Price.create,
+                    'create-price',
+                    None,
                     product=product.id,
                     unit_amount=plan.price_monthly,
                     currency='usd',
@@ -552,7 +674,10 @@ class StripeService:
                 )
                 
                 # Create yearly price
-                yearly_price = stripe.Price.create(
+                yearly_price = await self._write(
+                    stripe.Price.create,
+                    'create-price',
+                    None,
                     product=product.id,
                     unit_amount=plan.price_yearly,
                     currency='usd',
@@ -0,0 +1,107 @@
+"""
+Tenant Context for AffiliateFlow SaaS Platform
+Loads a user's subscription and compiled tier limits once per request, backed by a
+short-TTL process cache that is invalidated whenever a subscription changes.
+"""
+
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping, Optional
+
+from flask import g, has_app_context
+from sqlalchemy import event
+
+from src.models.subscription import Subscription, SubscriptionTier
+from src.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Other processes only see a subscription change once their entry expires
+TENANT_CACHE_TTL = 60
+
+_MISSING = object()
+
+_tier_limits: Dict[SubscriptionTier, Mapping] = {}
+
+def tier_limits(tier: SubscriptionTier) -> Mapping:
+    """Read-only limits of a tier, compiled once from the model's get_limits()"""
+    limits = _tier_limits.get(tier)
+    if limits is None:
+        limits = _tier_limits[tier] = MappingProxyType(dict(Subscription(tier=tier).get_limits()))
+    return limits
+
+@dataclass(frozen=True)
+class TenantContext:
+    """A subscription's slowly-changing fields; usage counters are deliberately left out"""
+    user_id: str
+    subscription_id: int
+    tier: SubscriptionTier
+    status: str
+    limits: Mapping
+    allowed_platforms: FrozenSet[str]
+    stripe_customer_id: Optional[str] = None
+
+    @classmethod
+    def from_subscription(cls, subscription: Subscription) -> 'TenantContext':
+        tier = subscription.tier or SubscriptionTier.FREE
+        limits = tier_limits(tier)
+        return cls(
+            user_id=subscription.user_id,
+            subscription_id=subscription.id,
+            tier=tier,
+            status=subscription.status,
+            limits=limits,
+            allowed_platforms=frozenset(limits.get('platforms', ())),
+            stripe_customer_id=subscription.stripe_customer_id
+        )
+
+class TenantCache:
+    """Process-local TTL cache of tenant contexts, including known-missing tenants"""
+
+    def __init__(self, ttl: float = TENANT_CACHE_TTL, maxsize: int = 10000):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def load(self, user_id: str) -> Optional[TenantContext]:
+        """Tenant context from the cache, or from the database on a miss"""
+        context = self._cache.get(user_id, _MISSING)
+        if context is _MISSING:
+            subscription = Subscription.query.filter_by(user_id=user_id).first()
+            context = TenantContext.from_subscription(subscription) if subscription else None
+            self._cache.set(user_id, context)
+        return context
+
+    def invalidate(self, user_id: str = None):
+        """Drop one tenant, or every tenant when no user_id is given"""
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id)
+
+# Global cache instance
+tenant_cache = TenantCache()
+
+def current_tenant(user_id: str) -> Optional[TenantContext]:
+    """The request's tenant context, kept on flask.g so it is loaded at most once per request"""
+    if not has_app_context():
+        return tenant_cache.load(user_id)
+
+    context = g.get('tenant_context')
+    if context is None or context.user_id != user_id:
+        context = tenant_cache.load(user_id)
+        g.tenant_context = context
+    return context
+
+def invalidate_tenant(user_id: str = None):
+    """Forget a tenant's cached context after its subscription changed"""
+    tenant_cache.invalidate(user_id)
+    if has_app_context() and g.get('tenant_context') is not None:
+        if user_id is None or g.tenant_context.user_id == user_id:
+            g.pop('tenant_context', None)
+
+@event.listens_for(Subscription, 'after_insert')
+@event.listens_for(Subscription, 'after_update')
+@event.listens_for(Subscription, 'after_delete')
+def _subscription_changed(mapper, connection, subscription):
+    # Any ORM write (upgrade, cancel, webhook) drops the cached context in this process
+    invalidate_tenant(subscription.user_id)
@@ -0,0 +1,222 @@
+"""
+Trending Hashtag Index for AffiliateFlow SaaS Platform
+Ranks hashtags per niche and platform by time-decayed engagement, using
+count-min sketches so memory stays bounded however many posts are ingested.
+"""
+
+import hashlib
+import heapq
+import json
+import logging
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.models.content import db, GeneratedContent, SocialMediaPost
+from src.services.hashtags import NICHE_HASHTAGS
+from src.services.jobs import PeriodicJob
+from src.services.platform_rules import PLATFORM_RULES
+
+logger = logging.getLogger(__name__)
+
+# Engagement keeps moving for a while after publishing, so posts only enter the
+# index once they are this old. That makes every post count exactly once.
+SETTLE_PERIOD = timedelta(hours=24)
+
+# A hashtag's score halves every HALF_LIFE without new engagement
+HALF_LIFE = timedelta(days=7)
+
+# Engagement per post, weighted by how strong a signal each action is
+ENGAGEMENT_WEIGHTS = {'likes': 1.0, 'comments': 2.0, 'shares': 3.0, 'clicks': 1.0}
+
+DEFAULT_NICHE = 'general'
+
+class CountMinSketch:
+    """Approximate per-key score sums in a fixed depth x width table
+
+    Estimates never undercount; with the default 4 x 2048 table, overcounting
+    is at most ~0.1% of the total score with probability above 98%.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width))
+        self._rows = np.arange(depth)
+
+    def _indexes(self, keys: List[str]) -> np.ndarray:
+        # One digest per key, split into a 32-bit hash per row
+        digests = b''.join(hashlib.blake2b(key.encode('utf-8'), digest_size=4 * self.depth).digest() for key in keys)
+        return np.frombuffer(digests, dtype='<u4').reshape(len(keys), self.depth) % self.width
+
+    def add(self, keys: List[str], scores: np.ndarray):
+        if not keys:
+            return
+        columns = self._indexes(keys)
+        rows = np.broadcast_to(self._rows, columns.shape)
+        np.add.at(self.table, (rows, columns), np.asarray(scores, dtype=float)[:, None])
+
+    def estimate(self, keys: List[str]) -> np.ndarray:
+        if not keys:
+            return np.zeros(0)
+        return self.table[self._rows, self._indexes(keys)].min(axis=1)
+
+    def decay(self, factor: float):
+        self.table *= factor
+
+class TrendingHashtagIndex:
+    """Top hashtags per (niche, platform), learned from published post engagement
+
+    Each (niche, platform) pair gets a count-min sketch of decayed scores and a
+    bounded set of candidate heavy hitters. Scores are kept as of the latest
+    ingestion cutoff: older posts enter pre-decayed, and the whole table is
+    decayed when the cutoff moves. Readers only see snapshots that are
+    replaced wholesale after each update.
+    """
+
+    def __init__(self, half_life: timedelta = HALF_LIFE, top_k: int = 20, max_candidates: int = 200,
+                 width: int = 2048, depth: int = 4):
+        self.decay_seconds = half_life.total_seconds() / math.log(2)
+        self.top_k = top_k
+        self.max_candidates = max_candidates
+        self.width = width
+        self.depth = depth
+
+        self._sketches: Dict[Tuple[str, str], CountMinSketch] = {}
+        self._candidates: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._watermark: Optional[datetime] = None
+        self._update_lock = threading.Lock()
+
+        # Served snapshots, replaced wholesale after each update
+        self._ranked: Dict[Tuple[str, str], List[Dict]] = {}
+        self._hashtags: Dict[Tuple[str, str], List[str]] = {}
+
+    def top(self, niche: str, platform: str, k: Optional[int] = None) -> List[Dict]:
+        """Best-performing hashtags with their decayed engagement scores"""
+        ranked = self._ranked.get((_normalize_niche(niche), platform), [])
+        return ranked if k is None else ranked[:k]
+
+    def hashtags(self, niche: str, platform: str) -> List[str]:
+        """Best-performing hashtags, best first"""
+        return self._hashtags.get((_normalize_niche(niche), platform), [])
+
+    def update(self, now: datetime = None) -> int:
+        """Decay the index and fold in posts that settled since the last run; returns posts added"""
+        with self._update_lock:
+            cutoff = (now or datetime.utcnow()) - SETTLE_PERIOD
+            if self._watermark is not None:
+                factor = math.exp(-(cutoff - self._watermark).total_seconds() / self.decay_seconds)
+                for sketch in self._sketches.values():
+                    sketch.decay(factor)
+                for candidates in self._candidates.values():
+                    for hashtag in candidates:
+                        candidates[hashtag] *= factor
+
+            added = self._ingest(self._watermark, cutoff)
+            self._watermark = cutoff
+            self._rebuild_snapshots()
+
+        if added:
+            logger.info(f"Trending hashtags: added {added} posts, {len(self._sketches)} niche/platform rankings")
+        return added
+
+    def _ingest(self, after: Optional[datetime], until: datetime) -> int:
+        query = db.session.query(
+            SocialMediaPost.platform,
+            SocialMediaPost.hashtags,
+            SocialMediaPost.published_time,
+            SocialMediaPost.likes,
+            SocialMediaPost.comments,
+            SocialMediaPost.shares,
+            SocialMediaPost.clicks,
+            GeneratedContent.niche
+        ).outerjoin(
+            GeneratedContent, GeneratedContent.id == SocialMediaPost.content_id
+        ).filter(
+            SocialMediaPost.status == 'published',
+            SocialMediaPost.hashtags.isnot(None),
+            SocialMediaPost.published_time <= until
+        )
+        if after is not None:
+            query = query.filter(SocialMediaPost.published_time > after)
+
+        batches: Dict[Tuple[str, str], Tuple[List[str], List[float]]] = {}
+        added = 0
+        for platform, hashtags, published_time, likes, comments, shares, clicks, niche in query.yield_per(10000):
+            if platform not in PLATFORM_RULES:
+                continue
+            tags = _parse_hashtags(hashtags)
+            if not tags:
+                continue
+
+            engagement = (
+                ENGAGEMENT_WEIGHTS['likes'] * (likes or 0)
+                + ENGAGEMENT_WEIGHTS['comments'] * (comments or 0)
+                + ENGAGEMENT_WEIGHTS['shares'] * (shares or 0)
+                + ENGAGEMENT_WEIGHTS['clicks'] * (clicks or 0)
+            )
+            added += 1
+            if engagement <= 0:
+                continue
+
+            score = engagement * math.exp(-(until - published_time).total_seconds() / self.decay_seconds)
+            keys, scores = batches.setdefault((_normalize_niche(niche), platform), ([], []))
+            keys.extend(tags)
+            scores.extend([score] * len(tags))
+
+        for key, (tags, scores) in batches.items():
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = CountMinSketch(self.width, self.depth)
+            sketch.add(tags, np.asarray(scores))
+            self._refresh_candidates(key, sketch, tags)
+
+        return added
+
+    def _refresh_candidates(self, key: Tuple[str, str], sketch: CountMinSketch, new_tags: Iterable[str]):
+        """Re-estimate tracked and newly seen hashtags, keeping the max_candidates best"""
+        tags = list(set(self._candidates.get(key, ())).union(new_tags))
+        estimates = sketch.estimate(tags)
+        best = heapq.nlargest(self.max_candidates, zip(estimates.tolist(), tags))
+        self._candidates[key] = {tag: score for score, tag in best}
+
+    def _rebuild_snapshots(self):
+        ranked = {}
+        for key, candidates in self._candidates.items():
+            best = heapq.nlargest(self.top_k, candidates.items(), key=lambda item: item[1])
+            ranked[key] = [{'hashtag': tag, 'score': round(score, 2)} for tag, score in best if score > 0]
+
+        self._ranked = ranked
+        self._hashtags = {key: [entry['hashtag'] for entry in entries] for key, entries in ranked.items()}
+
+def _normalize_niche(niche: Optional[str]) -> str:
+    # Unknown niches share the default ranking, so the number of sketches stays bounded
+    niche = (niche or '').lower()
+    return niche if niche in NICHE_HASHTAGS else DEFAULT_NICHE
+
+def _parse_hashtags(raw: str) -> List[str]:
+    try:
+        values = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(values, list):
+        return []
+
+    tags = []
+    for value in values:
+        if isinstance(value, str):
+            tag = value.strip().lower()
+            if tag and tag != '#':
+                tags.append(tag if tag.startswith('#') else '#' + tag)
+    # A hashtag repeated in one post counts once
+    return list(dict.fromkeys(tags))
+
+# Global index instance, refreshed by the background job
+trending_hashtags = TrendingHashtagIndex()
+
+def start_trending_hashtags(app, interval_seconds: int = 900) -> PeriodicJob:
+    """Start a background job that decays the index and folds in newly settled posts"""
+    return PeriodicJob('trending-hashtags', interval_seconds, trending_hashtags.update, app=app).start()
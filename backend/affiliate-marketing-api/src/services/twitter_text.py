@@ -0,0 +1,152 @@
+"""
+Twitter Text Utilities for AffiliateFlow SaaS Platform
+Weighted tweet length (as counted by Twitter) and linear-time thread building.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List
+
+MAX_TWEET_WEIGHT = 280
+
+# Every URL is shortened to a t.co link of this length, however long it is
+TRANSFORMED_URL_LENGTH = 23
+
+# Weight budget of one thread chunk; the rest is left for the "12/34 " numbering
+THREAD_CHUNK_BUDGET = 270
+
+# Code point ranges Twitter counts as 1; everything else (CJK, most symbols) counts as 2
+_LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+_URL_PATTERN = re.compile(
+    r'(?:https?://|www\.)[^\s<>"]+[^\s<>".,:;!?)\]\'}]'
+    r'|\b[a-z0-9][a-z0-9-]*(?:\.[a-z0-9-]+)*\.(?:com|org|net|io|co|ly|me|app|dev|info|biz|us|uk|ca|de)\b(?:/[^\s<>"]*[^\s<>".,:;!?)\]\'}])?',
+    re.IGNORECASE
+)
+
+def _is_light(code_point: int) -> bool:
+    for start, end in _LIGHT_RANGES:
+        if start <= code_point <= end:
+            return True
+    return False
+
+def _is_emoji(code_point: int) -> bool:
+    return 0x1F000 <= code_point <= 0x1FAFF or 0x2600 <= code_point <= 0x27BF or 0x2B00 <= code_point <= 0x2BFF
+
+def _is_emoji_modifier(code_point: int) -> bool:
+    # Variation selectors, skin tones and tag characters (subdivision flags)
+    return code_point in (0xFE0E, 0xFE0F) or 0x1F3FB <= code_point <= 0x1F3FF or 0xE0020 <= code_point <= 0xE007F
+
+def _text_weight(text: str) -> int:
+    """Weighted length of URL-free text; a whole emoji sequence counts as 2"""
+    if text.isascii():
+        return len(text)
+
+    weight = 0
+    index = 0
+    length = len(text)
+    while index < length:
+        code_point = ord(text[index])
+        index += 1
+
+        if _is_emoji(code_point):
+            weight += 2
+            is_flag = 0x1F1E6 <= code_point <= 0x1F1FF
+            # Absorb the rest of the sequence: modifiers, ZWJ-joined emoji, second flag letter
+            while index < length:
+                following = ord(text[index])
+                if _is_emoji_modifier(following):
+                    index += 1
+                elif following == 0x200D and index + 1 < length and _is_emoji(ord(text[index + 1])):
+                    index += 2
+                elif is_flag and 0x1F1E6 <= following <= 0x1F1FF:
+                    index += 1
+                    is_flag = False
+                else:
+                    break
+            continue
+
+        weight += 1 if _is_light(code_point) else 2
+
+    return weight
+
+@lru_cache(maxsize=65536)
+def token_weight(token: str) -> int:
+    """Weighted length of a whitespace-free token, with any URL counted as a t.co link"""
+    # Natural-language text repeats words heavily, so weights are memoized
+    if '.' not in token:
+        return _text_weight(token)
+
+    weight = 0
+    position = 0
+    for match in _URL_PATTERN.finditer(token):
+        weight += _text_weight(token[position:match.start()]) + TRANSFORMED_URL_LENGTH
+        position = match.end()
+    return weight + _text_weight(token[position:])
+
+def weighted_length(text: str) -> int:
+    """Tweet length as Twitter counts it (NFC-normalized, URLs 23, CJK/emoji 2)"""
+    text = unicodedata.normalize('NFC', text)
+    weight = 0
+    position = 0
+    for match in _URL_PATTERN.finditer(text):
+        weight += _text_weight(text[position:match.start()]) + TRANSFORMED_URL_LENGTH
+        position = match.end()
+    return weight + _text_weight(text[position:])
+
+def _split_long_token(token: str, budget: int) -> List[str]:
+    """Hard-split a single token that does not fit in one chunk"""
+    pieces = []
+    start = 0
+    weight = 0
+    for index, char in enumerate(token):
+        char_weight = _text_weight(char)
+        if weight + char_weight > budget:
+            pieces.append(token[start:index])
+            start = index
+            weight = 0
+        weight += char_weight
+    pieces.append(token[start:])
+    return pieces
+
+def build_thread(text: str, budget: int = THREAD_CHUNK_BUDGET) -> List[str]:
+    """Split text into numbered tweets in a single pass over its words"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_weight = 0
+
+    for token in unicodedata.normalize('NFC', text).split():
+        weight = len(token) if token.isascii() and '.' not in token else token_weight(token)
+
+        if weight > budget:
+            if current:
+                chunks.append(' '.join(current))
+            pieces = _split_long_token(token, budget)
+            chunks.extend(pieces[:-1])
+            current = [pieces[-1]]
+            current_weight = _text_weight(pieces[-1])
+            continue
+
+        added = weight + 1 if current else weight
+        if current_weight + added <= budget:
+            current.append(token)
+            current_weight += added
+        else:
+            chunks.append(' '.join(current))
+            current = [token]
+            current_weight = weight
+
+    if current:
+        chunks.append(' '.join(current))
+
+    # Add thread numbering
+    if len(chunks) > 1:
+        total = len(chunks)
+        chunks = [f"{index}/{total} {chunk}" for index, chunk in enumerate(chunks, 1)]
+
+    return chunks
+
+def build_threads(texts: Iterable[str], budget: int = THREAD_CHUNK_BUDGET) -> List[List[str]]:
+    """Build threads for many articles in one call"""
+    return [build_thread(text, budget) for text in texts]
@@ -0,0 +1,104 @@
+"""
+Usage Reservations for AffiliateFlow SaaS Platform
+Race-free subscription usage counting: check the tier limit and increment in one UPDATE.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import case, func, or_, update
+
+from src.models.content import db
+from src.models.subscription import Subscription, SubscriptionTier
+from src.services.tenant_context import tier_limits
+
+logger = logging.getLogger(__name__)
+
+UNLIMITED = -1
+
+# Feature -> (usage counter column, key in Subscription.get_limits())
+USAGE_FEATURES: Dict[str, Tuple[str, str]] = {
+    'content_generated': ('content_generated_count', 'content_per_month'),
+    'social_posts': ('social_posts_count', 'social_posts_per_month'),
+    'emails_sent': ('emails_sent_count', 'emails_per_month'),
+    'affiliate_links': ('affiliate_links_count', 'affiliate_links')
+}
+
+class UsageLimitExceeded(Exception):
+    """The subscription is missing or the reservation would go over its tier limit"""
+
+def _limits_by_tier(limit_key: str) -> Dict[SubscriptionTier, int]:
+    """Per-tier limit of one feature"""
+    limits = {}
+    for tier in SubscriptionTier:
+        limit = tier_limits(tier).get(limit_key, 0)
+        limits[tier] = limit if isinstance(limit, int) else UNLIMITED
+    return limits
+
+def reserve_statement(user_id: str, feature: str, amount: int = 1):
+    """UPDATE that adds amount to the user's counter only if it stays within the tier limit
+
+    RETURNING gives the new count and the limit; no row comes back when the
+    subscription is missing or the limit would be exceeded.
+    """
+    count_column, limit_key = USAGE_FEATURES[feature]
+    column = getattr(Subscription, count_column)
+    limit = case(*[(Subscription.tier == tier, tier_limit) for tier, tier_limit in _limits_by_tier(limit_key).items()], else_=0)
+    new_count = func.coalesce(column, 0) + amount
+
+    return (
+        update(Subscription)
+        .where(Subscription.user_id == user_id, or_(limit == UNLIMITED, new_count <= limit))
+        .values({count_column: new_count})
+        .returning(column, limit)
+        .execution_options(synchronize_session=False)
+    )
+
+class UsageReservation:
+    """Usage already counted against a subscription, to be released if the work fails"""
+
+    def __init__(self, user_id: str, feature: str, amount: int, used: int, limit: int):
+        self.user_id = user_id
+        self.feature = feature
+        self.amount = amount
+        self.used = used
+        self.limit = limit
+        self.released = False
+
+    @property
+    def remaining(self) -> int:
+        return UNLIMITED if self.limit == UNLIMITED else self.limit - self.used
+
+    def release(self):
+        """Give the reserved usage back (compensation for work that did not happen)"""
+        if self.released:
+            return
+        count_column, _ = USAGE_FEATURES[self.feature]
+        released = func.coalesce(getattr(Subscription, count_column), 0) - self.amount
+        try:
+            db.session.rollback()
+            db.session.execute(
+                update(Subscription)
+                .where(Subscription.user_id == self.user_id)
+                .values({count_column: case((released < 0, 0), else_=released)})
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            self.released = True
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to release {self.amount} {self.feature} for user {self.user_id}: {str(e)}")
+
+def reserve_usage(user_id: str, feature: str, amount: int = 1) -> Optional[UsageReservation]:
+    """Count amount of a feature against the user's limit up front, in one round trip
+
+    Returns None when the subscription is missing or the limit would be
+    exceeded. The reservation is committed right away so concurrent requests
+    see it; call release() on it if the work then fails.
+    """
+    row = db.session.execute(reserve_statement(user_id, feature, amount)).first()
+    db.session.commit()
+    if row is None:
+        return None
+    used, limit = row
+    return UsageReservation(user_id, feature, amount, used, limit)
@@ -0,0 +1,129 @@
+"""
+Login Throughput Benchmark for AffiliateFlow SaaS Platform
+Runs a login storm of concurrent password checks, inline in the request
+threads as before and through the bcrypt process pool, and reports logins per
+second per core together with the latency of a light request served meanwhile.
+Also times JWT verification with and without the token cache.
+
+Usage:
+    python tests/benchmarks/bench_login.py [--rounds 10] [--clients 16] [--logins 128] [--workers N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'affiliate-marketing-api'))
+
+import bcrypt
+import jwt
+
+from src.services.auth import AuthBusy, PasswordHasher, TokenVerifier
+
+PASSWORD = 'correct horse battery staple'
+
+def light_request():
+    # Stand-in for a cheap route: a little pure-Python work
+    return sum(index * index for index in range(2000))
+
+def storm(check, clients, logins):
+    """Run logins password checks from clients threads, retrying busy ones; returns (seconds, retries, probe latencies)"""
+    remaining = [logins]
+    rejected = [0]
+    lock = threading.Lock()
+    done = threading.Event()
+    probes = []
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            while True:
+                try:
+                    check()
+                    break
+                except AuthBusy:
+                    with lock:
+                        rejected[0] += 1
+                    time.sleep(0.05)
+
+    def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            light_request()
+            probes.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    probe_thread = threading.Thread(target=probe)
+    start = time.perf_counter()
+    probe_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    done.set()
+    probe_thread.join()
+    return seconds, rejected[0], probes
+
+def report(label, logins, seconds, rejected, probes, cores):
+    per_second = logins / seconds
+    probes_ms = sorted(probe * 1000 for probe in probes) or [0.0]
+    p99 = probes_ms[min(len(probes_ms) - 1, int(len(probes_ms) * 0.99))]
+    print(f"  {label:<22} {per_second:7.1f} logins/s, {per_second / cores:6.1f} per core "
+          f"({cores} core{'s' if cores != 1 else ''}), {rejected} busy retries; "
+          f"light request p50 {statistics.median(probes_ms):.2f} ms, p99 {p99:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=128)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(args.rounds))
+    print(f"{args.logins} logins from {args.clients} concurrent clients, bcrypt cost {args.rounds}, {cores} CPU core(s)")
+
+    idle = []
+    for _ in range(200):
+        start = time.perf_counter()
+        light_request()
+        idle.append((time.perf_counter() - start) * 1000)
+    print(f"  light request when idle: p50 {statistics.median(idle):.2f} ms")
+
+    seconds, rejected, probes = storm(
+        lambda: bcrypt.checkpw(PASSWORD.encode('utf-8'), password_hash), args.clients, args.logins)
+    report('inline (before)', args.logins, seconds, rejected, probes, cores)
+
+    hasher = PasswordHasher(workers=args.workers, rounds=args.rounds)
+    hasher.verify(PASSWORD, password_hash.decode('utf-8'))  # start the workers outside the timing
+    seconds, rejected, probes = storm(
+        lambda: hasher.verify(PASSWORD, password_hash.decode('utf-8')), args.clients, args.logins)
+    report(f'process pool ({args.workers})', args.logins, seconds, rejected, probes, min(args.workers, cores))
+    hasher.shutdown()
+
+    secret = 'benchmark-secret-that-is-at-least-32-bytes'
+    token = jwt.encode({'user_id': 'u1', 'exp': datetime.utcnow() + timedelta(days=7)}, secret, algorithm='HS256')
+    verifier = TokenVerifier(secret)
+    iterations = 20000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        jwt.decode(token, secret, algorithms=['HS256'])
+    uncached = (time.perf_counter() - start) / iterations
+    start = time.perf_counter()
+    for _ in range(iterations):
+        verifier.decode(token)
+    cached = (time.perf_counter() - start) / iterations
+    print(f"JWT verification: jwt.decode {uncached * 1e6:.1f} us, cached {cached * 1e6:.1f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Platform Fan-out Benchmark for AffiliateFlow SaaS Platform
+Compares the previous per-platform optimization loop (plain slicing, no
+tone rules, limits not respected once calls to action are appended) with the
+one-pass optimize_for_platforms on long posts fanned out to all 7 platforms.
+
+Usage:
+    python tests/benchmarks/bench_platform_fanout.py [--words 2000] [--posts 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'affiliate-marketing-api'))
+
+from src.services.platform_rules import CALLS_TO_ACTION, FACEBOOK_LEAD, FACEBOOK_LEAD_EMOJIS, PLATFORM_CONFIGS, optimize_for_platforms
+from src.services.twitter_text import weighted_length
+
+PLATFORMS = list(PLATFORM_CONFIGS)
+
+VOCABULARY = [
+    'affiliate', 'marketing', 'content', 'audience', 'engagement', 'the', 'a', 'to', 'and', 'growth',
+    'of', 'for', 'with', 'your', 'product', 'review', 'best', 'guide', 'this', 'is', 'awesome',
+    'https://affiliateflow.example.com/products/summer-sale?ref=abc123', '旅行', '🚀', 'café', '#productivity'
+]
+
+HASHTAGS = [f'#tag{index}' for index in range(40)]
+
+def legacy_optimize(content, platform, hashtags):
+    """The previous implementation: one call per platform, plain len() and a hard cut"""
+    platform_config = PLATFORM_CONFIGS.get(platform, {})
+    max_length = platform_config.get('max_length', 1000)
+    hashtag_limit = platform_config.get('hashtag_limit', 10)
+
+    if len(content) > max_length:
+        content = content[:max_length-3] + "..."
+
+    hashtags = hashtags[:hashtag_limit]
+
+    if platform == 'facebook':
+        if not content.startswith(FACEBOOK_LEAD_EMOJIS):
+            content = FACEBOOK_LEAD + content
+    else:
+        content += CALLS_TO_ACTION.get(platform, '')
+
+    return {
+        'content': content,
+        'hashtags': hashtags
+    }
+
+def legacy_fanout(posts):
+    return [{platform: legacy_optimize(post, platform, HASHTAGS) for platform in PLATFORMS} for post in posts]
+
+def batched_fanout(posts):
+    return [optimize_for_platforms({'text': post, 'hashtags': HASHTAGS}, PLATFORMS,
+                                   call_to_action=True, twitter_threads=False) for post in posts]
+
+def per_platform_fanout(posts):
+    return [
+        {
+            platform: optimize_for_platforms({'text': post, 'hashtags': HASHTAGS}, [platform],
+                                             call_to_action=True, twitter_threads=False)[platform]
+            for platform in PLATFORMS
+        }
+        for post in posts
+    ]
+
+def make_post(words, rng):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def over_limit(variants, text_key):
+    count = 0
+    for platforms in variants:
+        for platform, variant in platforms.items():
+            text = variant[text_key]
+            length = weighted_length(text) if platform == 'twitter' else len(text)
+            if length > PLATFORM_CONFIGS[platform]['max_length']:
+                count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    posts = [make_post(args.words, rng) for _ in range(args.posts)]
+
+    legacy_seconds, legacy_variants = timed(legacy_fanout, posts)
+    batched_seconds, batched_variants = timed(batched_fanout, posts)
+    looped_seconds, _ = timed(per_platform_fanout, posts)
+    variants = args.posts * len(PLATFORMS)
+
+    print(f"{args.posts} x {args.words}-word posts to {len(PLATFORMS)} platforms ({variants} variants)")
+    print(f"  legacy:       {legacy_seconds * 1000:9.1f} ms, "
+          f"{over_limit(legacy_variants, 'content')} variants over their platform limit")
+    print(f"  one-pass:     {batched_seconds * 1000:9.1f} ms, "
+          f"{over_limit(batched_variants, 'text')} variants over their platform limit "
+          f"(includes LinkedIn tone rules)")
+    print(f"  same rules, one call per platform: {looped_seconds * 1000:.1f} ms")
+    threads_seconds, _ = timed(lambda: [optimize_for_platforms({'text': post}, PLATFORMS) for post in posts])
+    print(f"  one-pass, with Twitter threads as ContentOptimizer builds them: {threads_seconds * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Slot Allocator Benchmark for AffiliateFlow SaaS Platform
+Allocates a burst of posts aimed at a handful of target times, on an empty
+in-memory database, and reports the allocation rate. Verifies that no
+platform bucket or account hour exceeds its capacity, and that posts whose
+time the user picked (allow_earlier=False) are never scheduled before it,
+including when the target falls mid-bucket.
+
+Usage:
+    python tests/benchmarks/bench_slot_allocator.py [--posts 20000] [--users 500] [--seed 1]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'affiliate-marketing-api'))
+
+from flask import Flask
+
+from src.models.content import db
+from src.services.slot_allocator import (
+    ACCOUNT_HOURLY_LIMITS, DEFAULT_ACCOUNT_HOURLY_LIMIT, DEFAULT_BUCKET_CAPACITY, PLATFORM_BUCKET_CAPACITY,
+    SlotAllocator, SlotRequest
+)
+
+PLATFORMS = ['twitter', 'facebook', 'instagram', 'linkedin']
+
+def make_requests(posts, users, now, rng):
+    # A few popular targets, most of them off the bucket boundaries
+    targets = [now + timedelta(hours=hours, minutes=rng.randrange(60), seconds=rng.randrange(60)) for hours in (2, 5, 9, 20)]
+    return [
+        SlotRequest(
+            key=index,
+            user_id=f'user-{rng.randrange(users)}',
+            platform=rng.choice(PLATFORMS),
+            target=rng.choice(targets),
+            allow_earlier=rng.random() < 0.5
+        )
+        for index in range(posts)
+    ]
+
+def verify(allocator, requests, assignments, now):
+    problems = []
+    platform_load = Counter()
+    account_load = Counter()
+    for request in requests:
+        moment = assignments[request.key]
+        if moment <= now:
+            problems.append(f'{request.key} scheduled in the past')
+        if not request.allow_earlier and moment < request.target:
+            problems.append(f'{request.key} moved {request.target - moment} before its fixed time')
+        bucket = allocator._bucket(moment)
+        platform_load[(request.platform, bucket)] += 1
+        account_load[(request.user_id, request.platform, allocator._hour(bucket))] += 1
+
+    for (platform, bucket), count in platform_load.items():
+        if count > PLATFORM_BUCKET_CAPACITY.get(platform, DEFAULT_BUCKET_CAPACITY):
+            problems.append(f'{platform} bucket {bucket} holds {count} posts')
+    for (user_id, platform, hour), count in account_load.items():
+        if count > ACCOUNT_HOURLY_LIMITS.get(platform, DEFAULT_ACCOUNT_HOURLY_LIMIT):
+            problems.append(f'{user_id} has {count} {platform} posts in hour {hour}')
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    rng = random.Random(args.seed)
+    now = datetime(2026, 1, 5, 8, 0, 0)
+    requests = make_requests(args.posts, args.users, now, rng)
+    allocator = SlotAllocator(rng=random.Random(args.seed))
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        assignments = allocator.allocate(requests, now=now)
+        seconds = time.perf_counter() - start
+
+        # A fixed time in the middle of a bucket with room, allocated over and over: the jitter must stay after it
+        target = now + timedelta(hours=30, minutes=2, seconds=30)
+        fixed = [SlotRequest(('fixed', index), 'fixed-user', 'youtube', target, allow_earlier=False) for index in range(200)]
+        fixed_allocator = SlotAllocator(rng=random.Random(args.seed))
+        fixed_assignments = {}
+        for request in fixed:
+            fixed_assignments.update(fixed_allocator.allocate([request], now=now))
+
+    print(f"{args.posts} posts from {args.users} accounts allocated in {seconds:.3f}s, {args.posts / seconds:,.0f} posts/s")
+    spread = Counter(assignments[request.key].replace(second=0, microsecond=0) for request in requests)
+    print(f"  distinct minutes used: {len(spread)}, busiest minute: {max(spread.values())} posts")
+
+    problems = verify(allocator, requests, assignments, now)
+    earliest = min(fixed_assignments.values())
+    if earliest < target:
+        problems.append(f'fixed time {target.time()} jittered back to {earliest.time()}')
+    print(f"  fixed time {target.time()} mid-bucket: earliest of {len(fixed)} jittered times {earliest.time()}")
+    for problem in problems[:5]:
+        print(f"    {problem}")
+    print(f"  {'OK' if not problems else f'{len(problems)} PROBLEMS'}")
+    sys.exit(1 if problems else 0)
+
+if __name__ == '__main__':
+    main()
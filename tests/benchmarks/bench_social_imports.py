@@ -0,0 +1,98 @@
+"""
+Import-Time Benchmark for AffiliateFlow SaaS Platform
+Measures cold-start time and peak memory of loading the social media service
+with lazily loaded posters, against eagerly loading every poster and SDK as
+the service used to.
+
+Usage:
+    python tests/benchmarks/bench_social_imports.py [--runs 5] [--app-root PATH]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_APP_ROOT = os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'affiliate-marketing-api')
+
+# SDKs the service module used to import at load time
+EAGER_SDKS = ['tweepy', 'facebook', 'instagram_basic_display', 'linkedin_api', 'aiohttp']
+
+SCENARIOS = {
+    'lazy (service only)': '''
+svc = SocialMediaService()
+''',
+    'lazy + first twitter post': '''
+svc = SocialMediaService()
+poster = svc.platforms['twitter']
+from src.services.social_posters import _sdk
+try:
+    _sdk('tweepy')
+except ImportError:
+    missing.append('tweepy')
+''',
+    'eager (all posters and SDKs)': '''
+svc = SocialMediaService()
+for platform in svc.platforms:
+    svc.platforms[platform]
+for name in EAGER_SDKS:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        missing.append(name)
+''',
+}
+
+CHILD_TEMPLATE = '''
+import importlib, json, resource, sys, time
+sys.path.insert(0, {app_root!r})
+EAGER_SDKS = {eager_sdks!r}
+missing = []
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+from src.services.social_media_service import SocialMediaService
+{scenario}
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': elapsed, 'rss_mb': peak_kb / 1024, 'rss_delta_mb': (peak_kb - baseline_kb) / 1024, 'missing': missing}}))
+'''
+
+def run_scenario(app_root: str, scenario: str) -> dict:
+    code = CHILD_TEMPLATE.format(app_root=app_root, eager_sdks=EAGER_SDKS, scenario=scenario)
+    # -X importtime is not used: we want wall time of a cold process, bytecode cache warm
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--app-root', default=DEFAULT_APP_ROOT)
+    args = parser.parse_args()
+    app_root = os.path.abspath(args.app_root)
+
+    # Warm the bytecode cache so every measured run starts from the same state
+    run_scenario(app_root, SCENARIOS['eager (all posters and SDKs)'])
+
+    print(f"{'scenario':<32} {'import ms':>10} {'peak RSS MB':>12} {'RSS delta MB':>13}")
+    results = {}
+    for name, scenario in SCENARIOS.items():
+        runs = [run_scenario(app_root, scenario) for _ in range(args.runs)]
+        results[name] = {
+            'ms': statistics.median(run['seconds'] for run in runs) * 1000,
+            'rss': statistics.median(run['rss_mb'] for run in runs),
+            'delta': statistics.median(run['rss_delta_mb'] for run in runs),
+            'missing': runs[0]['missing']
+        }
+        result = results[name]
+        print(f"{name:<32} {result['ms']:>10.1f} {result['rss']:>12.1f} {result['delta']:>13.1f}")
+
+    lazy = results['lazy (service only)']
+    eager = results['eager (all posters and SDKs)']
+    print(f"\nCold start saved: {eager['ms'] - lazy['ms']:.1f} ms, peak RSS saved: {eager['rss'] - lazy['rss']:.1f} MB")
+    if eager['missing']:
+        print(f"Not installed (excluded from the eager numbers): {', '.join(eager['missing'])}")
+
+if __name__ == '__main__':
+    main()
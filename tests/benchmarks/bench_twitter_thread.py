@@ -0,0 +1,85 @@
+"""
+Twitter Thread Builder Benchmark for AffiliateFlow SaaS Platform
+Compares the previous concatenation-based thread builder with the single-pass
+builder on 50k-word articles, and measures batch mode throughput.
+
+Usage:
+    python tests/benchmarks/bench_twitter_thread.py [--words 50000] [--articles 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'affiliate-marketing-api'))
+
+from src.services.twitter_text import build_thread, build_threads, weighted_length
+
+VOCABULARY = [
+    'affiliate', 'marketing', 'content', 'audience', 'engagement', 'the', 'a', 'to', 'and', 'growth',
+    'https://affiliateflow.example.com/products/summer-sale?ref=abc123', 'www.example.org/guide',
+    '旅行', '生産性', '🚀', '👍🏽', '🇺🇸', 'café', 'naïve', '#productivity', '@affiliateflow'
+]
+
+def legacy_thread(text):
+    """The previous implementation: string concatenation and plain len()"""
+    words = text.split()
+    threads = []
+    current_thread = ""
+
+    for word in words:
+        if len(current_thread + " " + word) <= 270:
+            current_thread += " " + word if current_thread else word
+        else:
+            threads.append(current_thread)
+            current_thread = word
+
+    if current_thread:
+        threads.append(current_thread)
+
+    if len(threads) > 1:
+        for i, thread in enumerate(threads):
+            threads[i] = f"{i+1}/{len(threads)} {thread}"
+
+    return threads
+
+def make_article(words, rng):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--words', type=int, default=50000)
+    parser.add_argument('--articles', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    article = make_article(args.words, rng)
+
+    legacy_seconds, legacy_chunks = timed(legacy_thread, article)
+    new_seconds, new_chunks = timed(build_thread, article)
+    over_limit = sum(1 for chunk in legacy_chunks if weighted_length(chunk) > 280)
+
+    print(f"{args.words}-word article")
+    print(f"  legacy:      {legacy_seconds * 1000:9.1f} ms, {len(legacy_chunks)} tweets, {over_limit} over Twitter's weighted limit")
+    print(f"  single-pass: {new_seconds * 1000:9.1f} ms, {len(new_chunks)} tweets, "
+          f"max weight {max(weighted_length(chunk) for chunk in new_chunks)}")
+    print(f"  speedup:     {legacy_seconds / new_seconds:9.1f}x")
+
+    articles = [make_article(2000, rng) for _ in range(args.articles)]
+    batch_seconds, threads = timed(build_threads, articles)
+    total_words = 2000 * args.articles
+    print(f"\nBatch: {args.articles} x 2000-word articles in {batch_seconds * 1000:.1f} ms "
+          f"({total_words / batch_seconds / 1e6:.2f}M words/s, {sum(len(t) for t in threads)} tweets)")
+
+if __name__ == '__main__':
+    main()
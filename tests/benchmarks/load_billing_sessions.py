@@ -0,0 +1,135 @@
+"""
+Billing Session Load Test for AffiliateFlow SaaS Platform
+Drives one BillingService from many threads, the way a threaded WSGI server
+does: every simulated request records and checks usage, reads analytics and
+validates an API key, then removes its session as the app teardown would.
+Verifies that no request failed and that the usage counters match the raw
+usage log exactly. --shared-session replays the load on one plain session
+shared by all threads, as the service used to work.
+
+Usage:
+    python tests/benchmarks/load_billing_sessions.py [--threads 16] [--requests 50] [--database-url URL] [--shared-session]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'affiliate-marketing-api'))
+
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('ENABLE_BACKGROUND_JOBS', 'False')
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from src.services.billing_service import BillingService, Subscription, UsageCounter, UsageRecord, User
+
+RESOURCES = ['monthly_content', 'monthly_social_posts', 'monthly_emails']
+
+def seed(service, users):
+    user_ids = []
+    for index in range(users):
+        user = User(email=f'load-{index}-{time.time_ns()}@example.com', password_hash='x', name=f'Load {index}')
+        service.session.add(user)
+        service.session.flush()
+        service.session.add(Subscription(
+            user_id=user.id,
+            plan_id='enterprise',
+            status='active',
+            monthly_content_limit=-1,
+            monthly_social_posts_limit=-1,
+            monthly_emails_limit=-1
+        ))
+        user_ids.append(user.id)
+    service.session.commit()
+    keys = {user_id: service.create_api_key(user_id, 'load test')['key'] for user_id in user_ids}
+    service.session.remove()
+    return user_ids, keys
+
+def run(service, user_ids, keys, threads, requests):
+    outcomes = Counter()
+    errors = []
+    lock = threading.Lock()
+
+    def request(worker, number):
+        user_id = user_ids[(worker + number) % len(user_ids)]
+        resource = RESOURCES[number % len(RESOURCES)]
+        recorded = service.record_usage(user_id, resource, quantity=1 + number % 3)
+        service.check_usage_limits(user_id, resource)
+        service.get_usage_analytics(user_id)
+        if service.validate_api_key(keys[user_id]) != user_id:
+            raise AssertionError('API key did not validate')
+        return recorded, 1 + number % 3
+
+    def worker(index):
+        for number in range(requests):
+            try:
+                recorded, quantity = request(index, number)
+                with lock:
+                    outcomes['recorded' if recorded else 'refused'] += 1
+                    if recorded:
+                        outcomes['quantity'] += quantity
+            except Exception as e:
+                with lock:
+                    outcomes['errors'] += 1
+                    if len(errors) < 3:
+                        errors.append(''.join(traceback.format_exception_only(type(e), e)).strip())
+            finally:
+                # What BillingService.init_app() does at the end of each request
+                service.session.remove()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, outcomes, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--database-url')
+    parser.add_argument('--shared-session', action='store_true')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    service = BillingService(database_url)
+    user_ids, keys = seed(service, args.users)
+
+    if args.shared_session:
+        # The old layout: one session used by every thread at once
+        shared = sessionmaker(bind=service.engine)()
+        shared.remove = lambda: None
+        service.session = shared
+
+    seconds, outcomes, errors = run(service, user_ids, keys, args.threads, args.requests)
+    total = args.threads * args.requests
+    print(f"{total} requests from {args.threads} threads on {service.engine.dialect.name} "
+          f"({'shared session' if args.shared_session else 'scoped sessions'}) in {seconds:.2f}s, {total / seconds:.0f} req/s")
+    print(f"  usage recorded: {outcomes['recorded']}, refused: {outcomes['refused']}, errors: {outcomes['errors']}")
+    for error in errors:
+        print(f"    {error.splitlines()[-1]}")
+
+    checker = sessionmaker(bind=service.engine)()
+    logged = checker.query(func.coalesce(func.sum(UsageRecord.quantity), 0)).filter(UsageRecord.user_id.in_(user_ids)).scalar()
+    counted = checker.query(func.coalesce(func.sum(UsageCounter.quantity), 0)).filter(UsageCounter.user_id.in_(user_ids)).scalar()
+    checker.close()
+    consistent = logged == counted == outcomes['quantity']
+    print(f"  units recorded: {outcomes['quantity']}, usage log: {logged}, counters: {counted} -> "
+          f"{'consistent' if consistent else 'INCONSISTENT'}")
+    pool = service.engine.pool
+    print(f"  pool: {pool.__class__.__name__}, {pool.status()}")
+
+    sys.exit(0 if consistent and not outcomes['errors'] else 1)
+
+if __name__ == '__main__':
+    main()
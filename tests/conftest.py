@@ -0,0 +1,27 @@
+"""
+Test Fixtures for AffiliateFlow SaaS Platform
+Service-level tests run against a Flask app on a fresh SQLite database file.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend', 'affiliate-marketing-api'))
+
+os.environ.setdefault('ENABLE_BACKGROUND_JOBS', 'False')
+
+import pytest
+from flask import Flask
+
+from src.models.content import db
+
+@pytest.fixture
+def app(tmp_path):
+    """An app context on its own database; a file, so worker threads share it"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,116 @@
+"""
+Idempotency Store Tests for AffiliateFlow SaaS Platform
+Claims, concurrent duplicates, lease takeover, lease fencing and replays of publish attempts.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from src.models.content import db
+from src.services.idempotency import (
+    STATE_COMPLETE, STATE_IN_PROGRESS, IdempotencyStore, PublishAttempt, PublishInProgressError
+)
+
+KEY = 'post:1:twitter'
+
+def expire_lease(key: str):
+    """As if the worker holding the attempt stopped renewing it long ago"""
+    db.session.execute(
+        update(PublishAttempt)
+        .where(PublishAttempt.idempotency_key == key)
+        .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.session.commit()
+
+def attempt(key: str) -> PublishAttempt:
+    db.session.expire_all()
+    return PublishAttempt.query.filter_by(idempotency_key=key).one()
+
+@pytest.fixture
+def store():
+    return IdempotencyStore()
+
+def test_first_claim_runs_and_records_the_result(app, store):
+    calls = []
+
+    def publish():
+        calls.append(1)
+        return {'success': True, 'post_id': 'tw-1'}
+
+    result, replayed = store.run(KEY, 'twitter', publish, post_id=1)
+
+    assert (result, replayed) == ({'success': True, 'post_id': 'tw-1'}, False)
+    assert calls == [1]
+    recorded = attempt(KEY)
+    assert recorded.state == STATE_COMPLETE
+    assert recorded.attempts == 1
+    assert recorded.lease_token is None
+    assert recorded.get_result() == {'success': True, 'post_id': 'tw-1'}
+
+def test_concurrent_duplicate_raises_in_progress(app, store):
+    started, release = threading.Event(), threading.Event()
+    outcome = {}
+
+    def slow_publish():
+        started.set()
+        release.wait(10)
+        return {'success': True, 'post_id': 'tw-1'}
+
+    def first_worker():
+        with app.app_context():
+            outcome['first'] = store.run(KEY, 'twitter', slow_publish)
+            db.session.remove()
+
+    worker = threading.Thread(target=first_worker)
+    worker.start()
+    try:
+        assert started.wait(10)
+        with pytest.raises(PublishInProgressError):
+            store.run(KEY, 'twitter', lambda: pytest.fail('duplicate publish ran'))
+    finally:
+        release.set()
+        worker.join(10)
+
+    assert outcome['first'] == ({'success': True, 'post_id': 'tw-1'}, False)
+    assert attempt(KEY).attempts == 1
+
+def test_expired_lease_is_taken_over(app, store):
+    token, _ = store._claim(KEY, 'twitter', 1)
+    assert token is not None
+    expire_lease(KEY)
+
+    result, replayed = store.run(KEY, 'twitter', lambda: {'success': True, 'post_id': 'tw-2'})
+
+    assert (result, replayed) == ({'success': True, 'post_id': 'tw-2'}, False)
+    recorded = attempt(KEY)
+    assert recorded.state == STATE_COMPLETE
+    assert recorded.attempts == 2
+
+def test_stale_lease_token_cannot_finish_the_attempt(app, store):
+    stale_token, _ = store._claim(KEY, 'twitter', 1)
+    expire_lease(KEY)
+    current_token, _ = store._claim(KEY, 'twitter', 1)
+
+    # The first worker wakes up after the takeover and tries to record its outcome
+    store._complete(KEY, stale_token, {'success': True, 'post_id': 'stale'})
+
+    recorded = attempt(KEY)
+    assert recorded.state == STATE_IN_PROGRESS
+    assert recorded.lease_token == current_token
+    assert recorded.result is None
+
+    store._complete(KEY, current_token, {'success': True, 'post_id': 'current'})
+    recorded = attempt(KEY)
+    assert recorded.state == STATE_COMPLETE
+    assert recorded.get_result() == {'success': True, 'post_id': 'current'}
+
+def test_completed_attempt_is_replayed(app, store):
+    store.run(KEY, 'twitter', lambda: {'success': True, 'post_id': 'tw-1'})
+
+    result, replayed = store.run(KEY, 'twitter', lambda: pytest.fail('completed publish ran again'))
+
+    assert (result, replayed) == ({'success': True, 'post_id': 'tw-1'}, True)
+    assert attempt(KEY).attempts == 1
@@ -0,0 +1,99 @@
+"""
+Publish Dispatcher Tests for AffiliateFlow SaaS Platform
+Posts left in flight by a crashed worker are published once its lease runs out.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.content import db, SocialMediaPost
+from src.services.idempotency import STATE_IN_PROGRESS, PublishAttempt, publish_key
+from src.services.publish_dispatcher import PublishDispatcher
+
+def make_post(status: str) -> SocialMediaPost:
+    post = SocialMediaPost(user_id='user-1', platform='twitter', content='Hello', status=status)
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+def abandon_attempt(post: SocialMediaPost, lease_seconds: float):
+    """The attempt a worker held when it died, its lease still running"""
+    db.session.add(PublishAttempt(
+        idempotency_key=publish_key(post.id, post.platform),
+        post_id=post.id,
+        platform=post.platform,
+        state=STATE_IN_PROGRESS,
+        lease_token='dead-worker',
+        lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds)
+    ))
+    db.session.commit()
+
+def wait_for_status(post_id: int, status: str, timeout: float = 15) -> str:
+    deadline = time.monotonic() + timeout
+    current = None
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        current = db.session.get(SocialMediaPost, post_id).status
+        if current == status:
+            break
+        time.sleep(0.1)
+    return current
+
+@pytest.fixture
+def published():
+    calls = []
+
+    async def publish(post):
+        calls.append(post.id)
+        post.status = 'published'
+        post.published_time = datetime.utcnow()
+        post.platform_post_id = f'tw-{post.id}'
+        return {'success': True, 'platform_post_id': post.platform_post_id}
+
+    publish.calls = calls
+    return publish
+
+def test_restart_publishes_post_once_dead_workers_lease_expires(app, published):
+    post = make_post('publishing')
+    abandon_attempt(post, lease_seconds=1)
+
+    dispatcher = PublishDispatcher(published, workers=1)
+    events = dispatcher.broker.subscribe('user-1')
+    dispatcher.start(app)
+    try:
+        assert wait_for_status(post.id, 'published') == 'published'
+    finally:
+        dispatcher.stop()
+
+    assert published.calls == [post.id]
+    statuses = []
+    while not events.empty():
+        statuses.append(events.get_nowait()['status'])
+    # Picked up, found held by the dead worker, queued until its lease ran out, then published
+    assert statuses[-3:] == ['queued', 'publishing', 'published']
+    attempt = PublishAttempt.query.filter_by(post_id=post.id).one()
+    assert attempt.attempts == 2
+
+def test_held_post_waits_instead_of_staying_publishing(app, published):
+    post = make_post('publishing')
+    abandon_attempt(post, lease_seconds=60)
+
+    dispatcher = PublishDispatcher(published, workers=1)
+    dispatcher.start(app)
+    try:
+        assert wait_for_status(post.id, 'queued', timeout=5) == 'queued'
+        assert published.calls == []
+    finally:
+        dispatcher.stop()
+
+def test_held_post_without_workers_can_be_published_again(app, published):
+    post = make_post('queued')
+    abandon_attempt(post, lease_seconds=60)
+
+    PublishDispatcher(published)._process(post.id)
+
+    db.session.expire_all()
+    assert db.session.get(SocialMediaPost, post.id).status == 'failed'
+    assert published.calls == []